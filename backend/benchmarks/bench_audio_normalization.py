@@ -0,0 +1,69 @@
+"""
+Bytes sent for transcription before and after local audio normalization.
+
+Synthetic stereo 44.1 kHz recordings with silent lead-in and tail are normalized
+to mono 16 kHz WAV; the table shows the size reduction and the CPU time spent.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_audio_normalization.py --minutes 1 5 10
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from utils.audio_processing import AudioNormalizer  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+RATE = 44100
+
+
+def synthetic_recording(minutes: float, lead_seconds: float, seed: int = 0) -> io.BytesIO:
+    """Stereo noise bursts ("phrases") between short pauses, with silence at both ends."""
+    rng = np.random.default_rng(seed)
+    parts = [np.zeros(int(lead_seconds * RATE))]
+    total = 0
+    while total < minutes * 60 * RATE:
+        phrase = rng.normal(0, 3000, int(rng.uniform(2, 8) * RATE))
+        pause = rng.normal(0, 30, int(rng.uniform(0.2, 1.2) * RATE))
+        parts += [phrase, pause]
+        total += len(phrase) + len(pause)
+    parts.append(np.zeros(int(lead_seconds * RATE)))
+    mono = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(np.repeat(mono[:, None], 2, axis=1).tobytes())
+    out.seek(0)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--lead-seconds", type=float, default=3.0, help="Silence before and after the speech")
+    args = parser.parse_args()
+
+    print(f"{'minutes':>7}  {'MB in':>7}  {'MB sent':>7}  {'ratio':>6}  {'time':>6}")
+    for minutes in args.minutes:
+        normalizer = AudioNormalizer()
+        audio = synthetic_recording(minutes, args.lead_seconds)
+        start = time.perf_counter()
+        normalizer.normalize(audio, "wav")
+        elapsed = time.perf_counter() - start
+        stats = normalizer.stats()
+        print(f"{minutes:>7.0f}  {stats['bytes_in'] / 1e6:>7.1f}  {stats['bytes_sent'] / 1e6:>7.1f}  "
+              f"{stats['bytes_in'] / stats['bytes_sent']:>5.1f}x  {elapsed:>5.2f}s")
+
+if __name__ == "__main__":
+    main()
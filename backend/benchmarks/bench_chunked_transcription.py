@@ -0,0 +1,87 @@
+"""
+Chunked, concurrent transcription versus one serial request on synthetic long audio.
+
+A local stub transcriber takes a fixed overhead plus time proportional to the
+audio length, like a hosted speech-to-text API, so no network access is needed.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_chunked_transcription.py --minutes 10 30 --concurrency 4
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from utils.transcription import transcribe_in_segments  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+RATE = 16000
+
+
+def synthetic_speech(minutes: float, seed: int = 0) -> bytes:
+    """Noise bursts of 2-8 s ("phrases") separated by 0.2-1.2 s pauses."""
+    rng = np.random.default_rng(seed)
+    parts, total = [], 0
+    while total < minutes * 60 * RATE:
+        phrase = rng.normal(0, 3000, int(rng.uniform(2, 8) * RATE))
+        pause = rng.normal(0, 30, int(rng.uniform(0.2, 1.2) * RATE))
+        parts += [phrase, pause]
+        total += len(phrase) + len(pause)
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.tobytes())
+    return out.getvalue()
+
+def make_stub(overhead: float, realtime_factor: float):
+    async def transcribe(audio, filename: str) -> dict:
+        with wave.open(io.BytesIO(audio) if isinstance(audio, bytes) else audio, "rb") as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        await asyncio.sleep(overhead + seconds * realtime_factor)
+        return {"text": "words", "words": [], "duration": seconds}
+    return transcribe
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 30])
+    parser.add_argument("--segment-seconds", type=float, default=120)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--overhead", type=float, default=0.3, help="Fixed seconds per request")
+    parser.add_argument("--realtime-factor", type=float, default=0.004, help="Seconds of processing per second of audio")
+    args = parser.parse_args()
+
+    stub = make_stub(args.overhead, args.realtime_factor)
+    print(f"{'minutes':>7}  {'MB':>6}  {'serial':>8}  {'chunked':>8}  {'segments':>8}  {'speedup':>7}")
+    for minutes in args.minutes:
+        audio = synthetic_speech(minutes)
+        start = time.perf_counter()
+        asyncio.run(transcribe_in_segments(audio, stub, max_segment_seconds=minutes * 60 + 1))
+        serial = time.perf_counter() - start
+
+        segments = []
+
+        async def counting_stub(segment, filename):
+            segments.append(1)
+            return await stub(segment, filename)
+
+        start = time.perf_counter()
+        asyncio.run(transcribe_in_segments(audio, counting_stub, max_segment_seconds=args.segment_seconds,
+                                           max_concurrency=args.concurrency))
+        chunked = time.perf_counter() - start
+        print(f"{minutes:>7.0f}  {len(audio) / 1e6:>6.1f}  {serial:>7.2f}s  {chunked:>7.2f}s  {len(segments):>8}  {serial / chunked:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
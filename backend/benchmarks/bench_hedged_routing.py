@@ -0,0 +1,78 @@
+"""
+Tail latency of model="auto" routing, with and without hedging, versus pinning one provider.
+
+Uses two local stand-in providers: "spiky" is usually the faster of the two but
+stalls on a small share of requests, "steady" is a little slower with a short
+tail. No network access is needed.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_hedged_routing.py --requests 400 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from utils.router import Router  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def make_backends(rng: random.Random, stall_rate: float):
+    def latency(model: str) -> float:
+        if model == "spiky":
+            return rng.lognormvariate(-3.0, 0.3) + (rng.uniform(0.5, 1.0) if rng.random() < stall_rate else 0.0)
+        return rng.lognormvariate(-2.6, 0.2)
+
+    async def call(model: str) -> str:
+        await asyncio.sleep(latency(model))
+        return model
+    return call
+
+async def run(requests: int, concurrency: int, call, router: Router = None, model: str = None) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await (router.call(call) if router else call(model))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--stall-rate", type=float, default=0.08, help="Share of spiky requests that stall")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("pinned: spiky", None, "spiky"),
+        ("pinned: steady", None, "steady"),
+        ("auto, no hedging", Router(["spiky", "steady"], hedge=False, hedge_min_delay=0.01), None),
+        ("auto, hedged", Router(["spiky", "steady"], hedge=True, hedge_min_delay=0.01), None),
+    ]
+    print(f"{'routing':<18}  {'p50':>7}  {'p95':>7}  {'p99':>7}  {'extra calls':>11}")
+    for name, router, model in scenarios:
+        call = make_backends(random.Random(args.seed), args.stall_rate)
+        latencies = asyncio.run(run(args.requests, args.concurrency, call, router, model))
+        extra = sum(backend["hedges"] for backend in router.stats().values()) if router else 0
+        p50, p95, p99 = (percentile(latencies, q) for q in (0.5, 0.95, 0.99))
+        print(f"{name:<18}  {p50:>6.3f}s  {p95:>6.3f}s  {p99:>6.3f}s  {extra:>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-request logging overhead on the request thread, before and after the move to
+lazy, queued logging.
+
+Each simulated request makes the log calls a /voice/ request makes: the request
+line, the transcript, the prompt and input, the token budget, the completion
+request and the response. "before" is the old setup, with DEBUG on by default,
+eager f-strings and a handler writing on the calling thread. "after" uses the
+current calls and configure_logging(), once at the default INFO level and once
+with DEBUG enabled and sampled, and once with DEBUG enabled in full. Output goes
+to a temporary file; --write-latency-us makes each write block, as writes to a
+busy pipe or log collector do.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_logging.py --requests 2000
+    python benchmarks/bench_logging.py --requests 2000 --write-latency-us 200
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from prompts.prompt_templates import PROMPTS  # noqa: E402
+from utils.logs import configure_logging, flush_logs  # noqa: E402
+
+logger = logging.getLogger("verbal_trainer")
+
+TRANSCRIPT = " ".join(["so um today I want to talk about why practice matters"] * 200)
+RESPONSE = "Your pacing was steady and your main points were clear. " * 30
+PAYLOAD = {"message": TRANSCRIPT, "role": "speech_coach", "model": "openai", "no_cache": False}
+
+
+def request_before():
+    logger.info(f"Received chat request for model: {PAYLOAD['model']}")
+    logger.debug(f"ChatRequest payload: {PAYLOAD}")
+    logger.debug(f"Transcribed text: {TRANSCRIPT}")
+    logger.debug(f"Using prompt: {PROMPTS['speech_coach']} for input: {TRANSCRIPT}")
+    logger.info(f"Token budget for gpt-4o-mini/speech_coach: prompt {412} + input {2400} tokens (limit {6000}), max_tokens {800}")
+    logger.debug(f"Requesting chat completion from model: {'gpt-4o-mini'}")
+    logger.debug(f"Received ai_response: {RESPONSE}")
+    logger.debug(f"Voice AI Response: {RESPONSE}")
+
+def request_after():
+    logger.info("Received chat request for model: %s", PAYLOAD["model"])
+    logger.debug("ChatRequest payload: %s", PAYLOAD)
+    logger.debug("Transcribed text: %s", TRANSCRIPT)
+    logger.debug("Using prompt %s for input: %s", "speech_coach", TRANSCRIPT)
+    logger.info(
+        "Token budget for %s/%s: prompt %s + input %s tokens (limit %s), max_tokens %s%s",
+        "gpt-4o-mini", "speech_coach", 412, 2400, 6000, 800, ""
+    )
+    logger.debug("Requesting chat completion from model: %s", "gpt-4o-mini")
+    logger.debug("Received ai_response: %s", RESPONSE)
+    logger.debug("Voice AI Response: %s", RESPONSE)
+
+class SlowStream:
+    """A file whose writes block for a while, like a full pipe or a slow log collector."""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def configure_before(stream):
+    """The old config.py: DEBUG, every record written in full on the calling thread."""
+    configure_logging(logging.DEBUG, stream, sample_rate=1, max_field_chars=sys.maxsize, queued=False)
+    # configure_logging() turns these off; the old setup had them on
+    logging._srcfile = os.path.normcase(logging.Logger.findCaller.__code__.co_filename)
+    logging.logProcesses = True
+    logging.logMultiprocessing = True
+
+def measure(request, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        request()
+    return (time.perf_counter() - start) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--write-latency-us", type=float, default=0, help="Time each write to the log blocks for")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("before: DEBUG, eager, sync", lambda stream: configure_before(stream), request_before),
+        ("after: INFO (default)", lambda stream: configure_logging(logging.INFO, stream), request_after),
+        ("after: DEBUG, 1 in 10", lambda stream: configure_logging(logging.DEBUG, stream, sample_rate=0.1), request_after),
+        ("after: DEBUG, all", lambda stream: configure_logging(logging.DEBUG, stream, sample_rate=1), request_after),
+    ]
+    print(f"{'logging':<28}  {'per request':>12}  {'log bytes/request':>17}")
+    for name, configure, request in scenarios:
+        with tempfile.TemporaryFile("w+") as file:
+            stream = SlowStream(file, args.write_latency_us / 1e6) if args.write_latency_us else file
+            configure(stream)
+            seconds = measure(request, args.requests)
+            flush_logs()  # Let the listener finish writing before the file is measured
+            size = file.tell()
+        print(f"{name:<28}  {seconds * 1e6:>10.1f}us  {size / args.requests:>17.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Append throughput of the progress store at different history sizes.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_progress_store.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from utils import database  # noqa: E402
+
+logging.getLogger("verbal_trainer").setLevel(logging.WARNING)
+
+
+def prefill(size: int):
+    """Bulk-load `size` synthetic records so appends run against a realistic history."""
+    conn = database.get_connection()
+    now = time.time()
+    rows = (
+        (now + i, "training", "impromptu", f"input {i}", "feedback " * 20)
+        for i in range(size)
+    )
+    with conn:
+        conn.executemany(
+            "INSERT INTO progress (created_at, type, module, input, feedback) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+
+def bench_sqlite(size: int, writes: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "progress.db")
+        prefill(size)
+        start = time.perf_counter()
+        for i in range(writes):
+            database.save_user_progress(f"bench {i}", "feedback " * 20, "impromptu")
+        elapsed = time.perf_counter() - start
+        database.get_connection().close()
+        database._local.connections.clear()
+    return writes / elapsed
+
+def bench_legacy_json(size: int, writes: int) -> float:
+    """The previous load-append-rewrite approach, for comparison."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "progress.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"module": "impromptu", "input": f"input {i}", "feedback": "feedback " * 20} for i in range(size)], f, indent=4)
+        start = time.perf_counter()
+        for i in range(writes):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            data.append({"module": "impromptu", "input": f"bench {i}", "feedback": "feedback " * 20})
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+        elapsed = time.perf_counter() - start
+    return writes / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--writes", type=int, default=2000, help="Timed appends per size")
+    parser.add_argument("--legacy-writes", type=int, default=20, help="Timed appends for the JSON baseline (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"{'records':>10}  {'sqlite writes/s':>16}  {'legacy json writes/s':>21}")
+    for size in args.sizes:
+        sqlite_rate = bench_sqlite(size, args.writes)
+        legacy_rate = f"{bench_legacy_json(size, args.legacy_writes):.1f}" if args.legacy_writes else "-"
+        print(f"{size:>10}  {sqlite_rate:>16.0f}  {legacy_rate:>21}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Time-to-first-byte of streamed, sentence-chunked TTS versus single-shot synthesis.
+
+Uses a local stub synthesizer whose latency grows with the text length, so no
+network access is needed.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_tts_stream.py --paragraphs 1 4 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(backend_dir)
+
+from utils.tts_stream import stream_speech  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+PARAGRAPH = (
+    "Your opening grabbed attention with a clear question. "
+    "The pacing in the middle section was rushed, so slow down when you introduce data. "
+    "You used the filler word 'basically' several times; replace it with a short pause. "
+    "Close by restating your main point and a concrete call to action.\n\n"
+)
+
+
+def make_stub(base_latency: float, per_char: float):
+    def synthesize(text: str) -> bytes:
+        time.sleep(base_latency + per_char * len(text))
+        return b"\xff\xfb" + text.encode()
+    return synthesize
+
+async def time_streamed(text: str, synthesize) -> tuple:
+    start = time.perf_counter()
+    first = None
+    async for _ in stream_speech(text, synthesize=synthesize):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--base-latency", type=float, default=0.15, help="Fixed seconds per synthesis call")
+    parser.add_argument("--per-char", type=float, default=0.002, help="Seconds per synthesized character")
+    args = parser.parse_args()
+
+    synthesize = make_stub(args.base_latency, args.per_char)
+    print(f"{'chars':>6}  {'single-shot ttfb':>16}  {'streamed ttfb':>13}  {'streamed total':>14}")
+    for paragraphs in args.paragraphs:
+        text = PARAGRAPH * paragraphs
+        start = time.perf_counter()
+        synthesize(text)
+        single = time.perf_counter() - start
+        first, total = asyncio.run(time_streamed(text, synthesize))
+        print(f"{len(text):>6}  {single:>15.3f}s  {first:>12.3f}s  {total:>13.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Peak server memory while ingesting audio uploads of growing size and concurrency.
+
+Each scenario starts a fresh uvicorn server running the real app, posts WAV
+uploads to /assess/voice/?mode=metrics and reports the server's peak RSS
+(VmHWM from /proc, so Linux only). The transcriber is replaced by a stub that
+reads the file it is given in 64 KB blocks, the way the HTTP client streams it
+to the provider. `--legacy` adds the old handling for comparison: the upload
+read whole with `await audio.read()` and copied into a BytesIO.
+
+Usage (from the backend/ directory):
+    python benchmarks/bench_upload_memory.py --sizes 1 10 50 --concurrency 1 8 --legacy
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import httpx
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SERVER = """
+import io, logging, sys
+import uvicorn
+import main
+from utils import voice_pipeline
+
+logging.getLogger().setLevel(logging.WARNING)
+
+async def transcribe(audio, filename):
+    for _ in iter(lambda: audio.read(65536), b""):
+        pass
+    return {"text": "stub", "words": [], "duration": 1.0}
+
+voice_pipeline.transcribe_audio_with_timestamps = transcribe
+
+@main.app.post("/legacy/")
+async def legacy(audio: main.UploadFile = main.File(...)):
+    audio_bytes = await audio.read()
+    await transcribe(io.BytesIO(audio_bytes), "audio.wav")
+    return {"transcript": "stub"}
+
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def write_wav(path: str, megabytes: float, rate: int = 16000):
+    frames = int(megabytes * 1024 * 1024 / 2)
+    block = b"\x00\x10" * rate
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        for _ in range(frames // rate):
+            wav.writeframes(block)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def start_server(port: int):
+    env = dict(os.environ, MAX_UPLOAD_BYTES=str(4 * 1024 ** 3), OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"))
+    process = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=backend_dir, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+async def post_all(url: str, path: str, concurrency: int):
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def post():
+            with open(path, "rb") as f:
+                response = await client.post(url, files={"audio": ("speech.wav", f, "audio/wav")})
+            response.raise_for_status()
+        await asyncio.gather(*(post() for _ in range(concurrency)))
+
+def run_scenario(route: str, path: str, concurrency: int) -> tuple:
+    port = free_port()
+    process = start_server(port)
+    try:
+        baseline = peak_rss_mb(process.pid)
+        start = time.perf_counter()
+        asyncio.run(post_all(f"http://127.0.0.1:{port}{route}", path, concurrency))
+        elapsed = time.perf_counter() - start
+        return baseline, peak_rss_mb(process.pid), elapsed
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50], help="Upload sizes in MB")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--legacy", action="store_true", help="Also measure the read-everything handling")
+    args = parser.parse_args()
+
+    routes = [("spooled", "/assess/voice/?mode=metrics")]
+    if args.legacy:
+        routes.append(("legacy", "/legacy/"))
+
+    print(f"{'handling':>8}  {'MB':>5}  {'conc':>4}  {'idle RSS':>9}  {'peak RSS':>9}  {'growth':>8}  {'time':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"speech_{size}.wav")
+            write_wav(path, size)
+            for concurrency in args.concurrency:
+                for name, route in routes:
+                    baseline, peak, elapsed = run_scenario(route, path, concurrency)
+                    print(f"{name:>8}  {size:>5.0f}  {concurrency:>4}  {baseline:>7.1f}MB  {peak:>7.1f}MB  "
+                          f"{peak - baseline:>6.1f}MB  {elapsed:>5.2f}s")
+
+if __name__ == "__main__":
+    main()
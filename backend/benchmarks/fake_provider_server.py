@@ -0,0 +1,244 @@
+"""
+Local stand-in for the OpenAI and xAI APIs, for benchmarks and load tests
+without network access or spend.
+
+Serves the surfaces the backend uses: chat completions (plain, streamed and
+schema-constrained evaluations, single or packed), audio transcriptions (text
+and verbose_json with word timings) and speech (/audio/speech, used when
+TTS_BASE_URL is set).
+Every surface has its own latency distribution. Responses carry x-ratelimit-*
+headers computed over a sliding minute. Requests over the configured limits are
+answered with 429, and 429s can also be injected at random.
+
+Latency specs: "fixed:SECONDS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA".
+
+Usage (from the backend/ directory):
+    python benchmarks/fake_provider_server.py --port 8100 --chat-latency lognormal:0.4:0.3 --error-rate 0.02
+Then point the backend at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 XAI_BASE_URL=http://127.0.0.1:8100/v1 TTS_BASE_URL=http://127.0.0.1:8100/v1
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import math
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+WORDS = (
+    "so today I want to talk about why practice matters um the first point is that confidence comes from "
+    "repetition and the second point is that feedback uh helps you notice habits you cannot hear yourself"
+).split()
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz): about 26 ms of audio
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+WORDS_PER_SECOND = 2.5
+
+
+class LatencyModel:
+    """A latency distribution parsed from "fixed:S", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA"."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class SlidingLimit:
+    """Requests or tokens used over the last minute, against a per-minute limit."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.events = collections.deque()  # (time, amount)
+        self.used = 0
+
+    def remaining(self, now: float) -> int:
+        while self.events and self.events[0][0] <= now - 60:
+            self.used -= self.events.popleft()[1]
+        return max(self.limit - self.used, 0)
+
+    def add(self, now: float, amount: int):
+        self.events.append((now, amount))
+        self.used += amount
+
+
+def create_app(chat_latency: str = "lognormal:0.4:0.3", transcription_latency: str = "lognormal:0.8:0.3",
+               speech_latency: str = "lognormal:0.3:0.3", token_interval: float = 0.01, reply_words: int = 60,
+               error_rate: float = 0.0, retry_after: float = 1.0, rpm_limit: int = 100000, tpm_limit: int = 50000000,
+               seed: int = None) -> FastAPI:
+    app = FastAPI(title="Fake provider")
+    rng = random.Random(seed)
+    latency = {
+        "chat": LatencyModel(chat_latency, rng),
+        "transcription": LatencyModel(transcription_latency, rng),
+        "speech": LatencyModel(speech_latency, rng),
+    }
+    requests_limit, tokens_limit = SlidingLimit(rpm_limit), SlidingLimit(tpm_limit)
+    counter = itertools.count(1)
+    stats = collections.Counter()
+
+    def rate_limit_headers(now: float) -> dict:
+        return {
+            "x-ratelimit-limit-requests": str(requests_limit.limit),
+            "x-ratelimit-remaining-requests": str(requests_limit.remaining(now)),
+            "x-ratelimit-limit-tokens": str(tokens_limit.limit),
+            "x-ratelimit-remaining-tokens": str(tokens_limit.remaining(now)),
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-reset-tokens": "1s",
+        }
+
+    async def admit(surface: str, tokens: int = 0):
+        """Wait out the surface's latency and return a 429 response if the request is refused, else None."""
+        stats[f"{surface}_requests"] += 1
+        now = time.monotonic()
+        over_limit = requests_limit.remaining(now) < 1 or tokens_limit.remaining(now) < tokens
+        if over_limit or rng.random() < error_rate:
+            stats["rate_limited"] += 1
+            headers = dict(rate_limit_headers(now), **{"retry-after": f"{retry_after:g}"})
+            return JSONResponse(status_code=429, headers=headers, content={"error": {
+                "message": "Rate limit reached (fake provider)", "type": "requests", "code": "rate_limit_exceeded",
+            }})
+        requests_limit.add(now, 1)
+        tokens_limit.add(now, tokens)
+        await asyncio.sleep(latency[surface].sample())
+        return None
+
+    def sentence(words: list) -> str:
+        text = " ".join(words)
+        return text[:1].upper() + text[1:] + "."
+
+    def reply_text(n: int) -> str:
+        words = [WORDS[(n + i) % len(WORDS)] for i in range(reply_words)]
+        sentences = [sentence(words[i:i + 12]) for i in range(0, len(words), 12)]
+        return f"Feedback {n}. " + " ".join(sentences)
+
+    def evaluation(n: int) -> dict:
+        return {
+            "structure_score": 5 + n % 5, "delivery_score": 4 + n % 6, "content_score": 6 + n % 4,
+            "full_report": reply_text(n),
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body["messages"]) // 4
+        refused = await admit("chat", prompt_tokens + (body.get("max_tokens") or 0))
+        if refused is not None:
+            return refused
+        n = next(counter)
+        response_format = body.get("response_format") or {}
+        if response_format.get("json_schema", {}).get("name") == "presentation_evaluations":
+            # A packed batch evaluation: one entry per presentation id
+            presentations = json.loads(body["messages"][-1]["content"].split("\n", 1)[1])
+            ids = [presentation["id"] for presentation in presentations]
+            content = json.dumps({"evaluations": [dict(evaluation(n + i), id=id_) for i, id_ in enumerate(ids)]})
+        elif response_format.get("type") == "json_schema":
+            content = json.dumps(evaluation(n))
+        else:
+            content = reply_text(n)
+        headers = rate_limit_headers(time.monotonic())
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(body["model"], content), media_type="text/event-stream", headers=headers)
+        completion_tokens = len(content) // 4
+        return JSONResponse(headers=headers, content={
+            "id": f"chatcmpl-fake-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens, "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    async def stream_chunks(model: str, content: str):
+        def chunk(delta: dict, finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": "chatcmpl-fake-stream", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for token in content.split(" "):
+            yield chunk({"content": token + " "})
+            await asyncio.sleep(token_interval)
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        audio = await form["file"].read()
+        refused = await admit("transcription")
+        if refused is not None:
+            return refused
+        duration = max(len(audio) / 32000, 1.0)  # 16 kHz 16-bit mono
+        count = max(1, int(duration * WORDS_PER_SECOND))
+        words = [WORDS[i % len(WORDS)] for i in range(count)]
+        text = sentence(words)
+        if form.get("response_format") != "verbose_json":
+            return PlainTextResponse(text)
+        step = duration / count
+        return {
+            "task": "transcribe", "language": "english", "duration": duration, "text": text,
+            "words": [{"word": word, "start": round(i * step, 3), "end": round(i * step + step * 0.8, 3)} for i, word in enumerate(words)],
+        }
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        refused = await admit("speech")
+        if refused is not None:
+            return refused
+        seconds = len(body["input"].split()) / WORDS_PER_SECOND
+        return Response(MP3_FRAME * max(1, int(seconds / 0.026)), media_type="audio/mpeg")
+
+    @app.get("/stats")
+    async def fake_stats():
+        return dict(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-latency", default="lognormal:0.4:0.3", help="Time to the first byte of a completion")
+    parser.add_argument("--transcription-latency", default="lognormal:0.8:0.3")
+    parser.add_argument("--speech-latency", default="lognormal:0.3:0.3")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="Seconds between streamed tokens")
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s, in seconds")
+    parser.add_argument("--rpm-limit", type=int, default=100000)
+    parser.add_argument("--tpm-limit", type=int, default=50000000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(
+        args.chat_latency, args.transcription_latency, args.speech_latency, args.token_interval, args.reply_words,
+        args.error_rate, args.retry_after, args.rpm_limit, args.tpm_limit, args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Offline load test of the backend against the local fake provider.
+
+Starts benchmarks/fake_provider_server.py and the backend (uvicorn main:app) as
+subprocesses. Runtime files go to a temporary directory. The backend's OpenAI,
+xAI and speech endpoints all point at the fake. Each scenario is then driven
+at each concurrency level: that many clients send requests back to back until
+--requests have completed. Throughput and p50/p95/p99 latency per scenario and
+concurrency are printed and written to a JSON results file. --compare prints
+the change against an earlier results file.
+
+assess_batch sends BATCH_SIZE short submissions per request, so its items per
+second are BATCH_SIZE times its requests per second.
+
+Inputs differ per request so the response, transcription and speech caches do
+not hide provider latency; pass --repeat-inputs to measure cached performance.
+
+Usage (from the backend/ directory):
+    python benchmarks/load_test.py --concurrency 1 8 32 --requests 200 --output results/today.json
+    python benchmarks/load_test.py --scenarios chat voice --compare results/today.json
+    python benchmarks/load_test.py --chat-latency lognormal:1.0:0.5 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import httpx
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(benchmarks_dir, ".."))
+
+SCENARIOS = ("chat", "train", "assess_text", "assess_batch", "assess_voice", "voice")
+BATCH_SIZE = 20  # Submissions per assess_batch request
+SENTENCE = "Today I want to explain why regular practice builds confident speakers, and how feedback speeds that up. "
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def tone_wav(seconds: float, marker: int, rate: int = 16000) -> bytes:
+    """A 220 Hz tone; `marker` changes its last sample so every recording has a different digest."""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        frames += int(8000 * math.sin(2 * math.pi * 220 * i / rate)).to_bytes(2, "little", signed=True)
+    frames[-2:] = (marker % 30000).to_bytes(2, "little", signed=True)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return out.getvalue()
+
+def build_request(scenario: str, i: int, audio: bytes, repeat: bool) -> dict:
+    """httpx.request keyword arguments for request number `i` of a scenario."""
+    n = 0 if repeat else i
+    text = f"Take {n}. " + SENTENCE * 8
+    if scenario == "chat":
+        return {"method": "POST", "url": "/chat/", "json": {"message": text, "role": "speech_coach", "model": "openai"}}
+    if scenario == "train":
+        return {"method": "POST", "url": "/train/", "json": {"user_input": text, "module": "impromptu", "model": "openai"}}
+    if scenario == "assess_text":
+        return {"method": "POST", "url": "/assess/text/", "data": {"text": text}}
+    if scenario == "assess_batch":
+        items = [{"id": j, "text": f"Take {n}.{j}. " + SENTENCE * 2} for j in range(BATCH_SIZE)]
+        return {"method": "POST", "url": "/assess/batch/", "json": {"items": items}}
+    recording = audio if repeat else audio[:-2] + (n % 30000).to_bytes(2, "little", signed=True)
+    url = "/assess/voice/" if scenario == "assess_voice" else "/voice/"
+    return {"method": "POST", "url": url, "files": {"audio": ("talk.wav", recording, "audio/wav")}}
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+async def drive(base_url: str, scenario: str, concurrency: int, requests: int, audio: bytes, repeat: bool, offset: int) -> dict:
+    latencies, statuses = [], {}
+    next_index = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        async def worker():
+            for i in next_index:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(**build_request(scenario, offset + i, audio, repeat))
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ok = statuses.get("200", 0)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2),
+        "p50": round(percentile(latencies, 0.50), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "p99": round(percentile(latencies, 0.99), 4),
+        "mean": round(sum(latencies) / len(latencies), 4),
+    }
+
+def start_process(command: list, env: dict, cwd: str, health_url: str, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, env=env, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[2]} exited early; see {log_path}")
+        try:
+            if httpx.get(health_url, timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[2]} did not start; see {log_path}")
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'scenario':<14} {'conc':>5}  {'throughput':>12}  {'p50':>9}  {'p95':>9}  {'p99':>9}")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        change = {key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0 for key in ("throughput_rps", "p50", "p95", "p99")}
+        print(f"{result['scenario']:<14} {result['concurrency']:>5}  {change['throughput_rps']:>+11.1f}%  "
+              f"{change['p50']:>+8.1f}%  {change['p95']:>+8.1f}%  {change['p99']:>+8.1f}%")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario and concurrency level")
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--repeat-inputs", action="store_true", help="Send identical inputs, so caches answer")
+    parser.add_argument("--output", default=os.path.join(benchmarks_dir, "results", time.strftime("load_%Y%m%d_%H%M%S.json")))
+    parser.add_argument("--compare", help="An earlier results file to compare against")
+    parser.add_argument("--chat-latency", default="lognormal:0.4:0.3")
+    parser.add_argument("--transcription-latency", default="lognormal:0.8:0.3")
+    parser.add_argument("--speech-latency", default="lognormal:0.3:0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of provider requests answered with 429")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    args = parser.parse_args()
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}/v1"
+    fake_args = ["--port", str(fake_port), "--chat-latency", args.chat_latency,
+                 "--transcription-latency", args.transcription_latency, "--speech-latency", args.speech_latency,
+                 "--error-rate", str(args.error_rate), "--seed", "1"]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ, OPENAI_API_KEY="fake-key", XAI_API_KEY="fake-key", OPENAI_BASE_URL=fake_url, XAI_BASE_URL=fake_url,
+            TTS_BASE_URL=fake_url, DATABASE_FILE=os.path.join(workdir, "progress.db"), LOG_LEVEL="WARNING",
+        )
+        processes = []
+        try:
+            processes.append(start_process(
+                [sys.executable, os.path.join(benchmarks_dir, "fake_provider_server.py"), *fake_args],
+                env, workdir, f"{fake_url[:-3]}/stats", os.path.join(workdir, "fake.log")
+            ))
+            processes.append(start_process(
+                [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", backend_dir, "--port", str(app_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                env, workdir, f"http://127.0.0.1:{app_port}/", os.path.join(workdir, "app.log")
+            ))
+
+            audio = tone_wav(args.audio_seconds, 0)
+            results = []
+            print(f"{'scenario':<14} {'conc':>5}  {'ok/sent':>9}  {'req/s':>8}  {'p50':>8}  {'p95':>8}  {'p99':>8}")
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(drive(
+                        f"http://127.0.0.1:{app_port}", scenario, concurrency, args.requests, audio,
+                        args.repeat_inputs, offset=len(results) * args.requests
+                    ))
+                    results.append(result)
+                    print(f"{scenario:<14} {concurrency:>5}  {result['ok']:>4}/{args.requests:<4}  "
+                          f"{result['throughput_rps']:>8.2f}  {result['p50']:>7.3f}s  {result['p95']:>7.3f}s  {result['p99']:>7.3f}s")
+            fake_stats = httpx.get(f"{fake_url[:-3]}/stats").json()
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(10)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "args": vars(args), "fake_provider": fake_stats},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 import logging
 import os
+from utils.logs import configure_logging, parse_level
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if os.getenv("DEBUG", "true").lower() == "true" else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging: INFO unless DEBUG=true or LOG_LEVEL says otherwise. Records
+# are handed to a background thread for formatting and output (see utils/logs.py).
+level_name = os.getenv("LOG_LEVEL")
+LOG_LEVEL = parse_level(level_name) if level_name else None
+if LOG_LEVEL is None:  # Unset, or a name logging does not know (warned about below)
+    LOG_LEVEL = logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO
+configure_logging(LOG_LEVEL)
 
-logger = logging.getLogger("verbal_trainer")
\ No newline at end of file
+logger = logging.getLogger("verbal_trainer")
+if level_name and parse_level(level_name) is None:
+    logger.warning("Unknown LOG_LEVEL %r; using %s", level_name, logging.getLevelName(LOG_LEVEL))
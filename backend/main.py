@@ -1,26 +1,59 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from typing import Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from typing import List, Optional, Union
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import RateLimitError, AuthenticationError, BadRequestError, OpenAIError
+import asyncio
+import json
 import os
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import time
 import re
 
 # User Defined functions
-from utils.model_generation import get_ai_response, transcribe_audio
-from utils.helper_functions import evaluate_presentation, safe_api_call, text_to_speech
+from utils.transcription import TranscriptionFailed
+from utils.model_generation import get_ai_response, get_session_response, stream_ai_response, transcribe_audio
+from utils.helper_functions import evaluate_presentation, safe_api_call, stream_evaluation, voice_feedback_prompt
+from utils.evaluation import parser as evaluation_parser
+from utils import providers
+from utils.progress_writer import writer as progress_writer
+from utils.tts_cache import tts_cache
+from utils.tts_stream import speech_streams, stream_speech
+from utils.voice_pipeline import TRANSCRIPTION_FAILED_REPLY, assess_voice, run_voice_pipeline, voice_feedback
+from utils.uploads import UploadLimitMiddleware, spool_upload
+from utils.audio_processing import normalizer
+from utils.response_cache import response_cache
+from utils.single_flight import flight_stats
+from utils.token_budget import load_tokenizers, token_budget
+from utils.router import router
+from utils.sessions import session_store
+from utils.errors import http_error
+from utils.jobs import FINISHED, JobQueueFull, job_queue
+from utils.batch import batch_assessor, parse_jsonl
+from utils import metrics
+from prompts.assembly import prompt_usage
 from config import logger
-from utils.constants import TRAINING_MODULES, MODEL_NAME, XAI_MODELS
+from utils.constants import TRAINING_MODULES, MODEL_NAME, XAI_MODELS, ROUTER_MODEL, JOB_DEFAULT_PRIORITY, JOB_MAX_PRIORITY, JOB_POLL_INTERVAL, BATCH_MAX_ITEMS, BATCH_CONCURRENCY
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 XAI_API_KEY = os.getenv("XAI_API_KEY")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    progress_writer.start()
+    # Tokenizers may download their BPE files on first use; do that now, off the event loop
+    await asyncio.to_thread(load_tokenizers)
+    await job_queue.start()
+    yield
+    # Stop job workers, close pooled provider connections and drain queued progress on shutdown
+    await job_queue.stop()
+    await providers.registry.aclose()
+    await asyncio.to_thread(progress_writer.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -30,6 +63,9 @@ origins = [
     # Add other origins as needed
 ]
 
+# Refuse oversized audio uploads before they are parsed
+app.add_middleware(UploadLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,182 +74,394 @@ app.add_middleware(
     allow_headers=["*"],  
 )
 
+# Outermost, so request latency includes every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 class ChatRequest(BaseModel):
     message: str
     role: str
     model: str = "openai"
+    no_cache: bool = False  # Skip the response cache lookup for this request
 
 class TrainingRequest(BaseModel):
     user_input: str
     module: str
     model: str = "openai"
+    no_cache: bool = False  # Skip the response cache lookup for this request
+
+class SessionRequest(BaseModel):
+    role: str
+    model: str = "openai"
+
+class SessionMessage(BaseModel):
+    message: str
+
+class BatchItem(BaseModel):
+    text: str
+    id: Optional[Union[str, int]] = None  # Echoed back with the item's result
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = []
+    texts: List[str] = []  # Shorthand for items without ids
+    no_cache: bool = False
+    concurrency: Optional[int] = None  # Provider calls in flight for this batch, up to BATCH_CONCURRENCY
+
+def select_model(model: str):
+    """Return the API key and model name for the requested provider."""
+    if model == "openai":
+        return OPENAI_API_KEY, MODEL_NAME
+    if model == "xai":
+        return XAI_API_KEY, XAI_MODELS[0]
+    if model == ROUTER_MODEL:
+        return None, ROUTER_MODEL
+    raise HTTPException(status_code=400, detail="Invalid model selected.")
+
+def api_error(e: Exception) -> HTTPException:
+    """Log an endpoint's error and return the HTTPException to answer it with (see utils/errors.py)."""
+    error = http_error(e)
+    if error is not e:
+        log = logger.warning if error.status_code in (413, 503) else logger.error  # Over budget or busy: the client can retry
+        log(f"{type(e).__name__} answered with {error.status_code}: {e}")
+    return error
+
+async def sse_events(deltas):
+    """Relay text deltas as server-sent events, ending with a done or error event."""
+    try:
+        async for delta in deltas:
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        logger.error(f"Error while streaming response: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': 'The response stream was interrupted. Please try again.'})}\n\n"
+
+ANALYSIS_MODES = ("full", "metrics")
+
+async def submit_job(kind: str, audio: UploadFile, audio_file, request: Request, params: dict, user: Optional[str], priority: int):
+    """Queue a voice request as a background job and answer 202 with where to follow it."""
+    if not 0 <= priority <= JOB_MAX_PRIORITY:
+        raise HTTPException(status_code=400, detail=f"Priority must be between 0 and {JOB_MAX_PRIORITY}.")
+    user = user or (request.client.host if request.client else "anonymous")
+    try:
+        job = await job_queue.submit(kind, audio_file, audio.audio_format, params, user, priority)
+    except JobQueueFull as e:
+        logger.warning(f"Job queue full: {e}")
+        raise HTTPException(status_code=503, detail="Too many jobs are waiting. Please try again shortly.")
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events"
+    })
+
+async def job_events(job_id: str):
+    """Server-sent status events whenever a job's status or stage changes, ending with done."""
+    last = None
+    while True:
+        view = await job_queue.get(job_id)
+        if view is None:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Job not found'})}\n\n"
+            return
+        if view["status"] in FINISHED:
+            yield f"event: done\ndata: {json.dumps(view)}\n\n"
+            return
+        snapshot = json.dumps([view["status"], view["stage"], view["stages"]])
+        if snapshot != last:
+            yield f"event: status\ndata: {json.dumps(view)}\n\n"
+            last = snapshot
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+async def ndjson_events(events):
+    """Serialise pipeline events as newline-delimited JSON."""
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 @app.get("/")
 async def onboarding():
     return {"message": "Welcome to the Verbal Skills Trainer! Use /chat, /voice, /assess, and /train endpoints."}
 
+@app.get("/stats/")
+async def stats():
+    """Runtime counters for provider connection pools, rate limits and routing, prompt caching and token budgets, sessions, background jobs, batch assessments, evaluation parsing, the progress writer, caches, request coalescing and audio normalization."""
+    return {
+        "connections": providers.registry.stats(),
+        "rate_limits": providers.rate_limiter.stats(),
+        "router": router.stats(),
+        "prompt_cache": prompt_usage.stats(),
+        "token_budget": token_budget.stats(),
+        "sessions": session_store.stats(),
+        "jobs": job_queue.stats(),
+        "batches": batch_assessor.stats(),
+        "evaluation_parser": evaluation_parser.stats(),
+        "progress_writer": progress_writer.stats(),
+        "tts_cache": tts_cache.stats(),
+        "audio_normalization": normalizer.stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": flight_stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus text format: request, stage and provider latency histograms, retry
+    and token counters, and every numeric /stats/ value as a gauge.
+    """
+    return Response(metrics.registry.render(await stats()), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/chat/")
 async def chat(request: ChatRequest):
-    logger.info(f"Received chat request for model: {request.model}")
-    logger.debug(f"ChatRequest payload: {request.model_dump()}")
+    logger.info("Received chat request for model: %s", request.model)
+    logger.debug("ChatRequest payload: %s", request.model_dump())
     
     try:
         if request.model == "openai":
-            ai_response = safe_api_call(get_ai_response, request.message, request.role, OPENAI_API_KEY, MODEL_NAME)
+            ai_response = await safe_api_call(get_ai_response, request.message, request.role, OPENAI_API_KEY, MODEL_NAME, use_cache=not request.no_cache)
         elif request.model == "xai":
-            ai_response = safe_api_call(get_ai_response, request.message, request.role, XAI_API_KEY, XAI_MODELS[0])
+            ai_response = await safe_api_call(get_ai_response, request.message, request.role, XAI_API_KEY, XAI_MODELS[0], use_cache=not request.no_cache)
+        elif request.model == ROUTER_MODEL:
+            ai_response = await safe_api_call(get_ai_response, request.message, request.role, None, ROUTER_MODEL, use_cache=not request.no_cache)
         else:
             raise HTTPException(status_code=400, detail="Invalid model selected.")
         
-        logger.debug(f"AI Response: {ai_response}")
+        logger.debug("AI Response: %s", ai_response)
         return {"response": ai_response}
 
-    except RateLimitError as e:
-        logger.error(f"Rate limit error: {e}")
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    except AuthenticationError as e:
-        logger.error(f"Authentication error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error. Please check your API key.")
-    except BadRequestError as e:
-        logger.error(f"Bad request error: {e}")
-        raise HTTPException(status_code=400, detail="Bad request. Please check your input.")
-    except OpenAIError as e:
-        logger.error(f"OpenAI error: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred with the OpenAI service. Please try again later.")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
+        raise api_error(e)
+
+@app.post("/chat/stream/")
+async def chat_stream(request: ChatRequest):
+    """Stream the chat response as server-sent events while the provider generates it."""
+    logger.info("Received streaming chat request for model: %s", request.model)
+    api_key, model_name = select_model(request.model)
+
+    try:
+        deltas = await safe_api_call(stream_ai_response, request.message, request.role, api_key, model_name, use_cache=not request.no_cache)
+        return StreamingResponse(sse_events(deltas), media_type="text/event-stream", headers=SSE_HEADERS)
+    except Exception as e:
+        raise api_error(e)
+
+def find_session(session_id: str):
+    """The live session for an id, or a 400/404 HTTPException."""
+    if not re.match(r"^[a-f0-9]{32}$", session_id):
+        raise HTTPException(status_code=400, detail="Invalid session id")
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+@app.post("/sessions/")
+async def create_session(request: SessionRequest):
+    """Start a multi-turn session, such as a mock interview or a debate, with a role."""
+    select_model(request.model)  # Refuse an unknown model now rather than on the first message
+    session = session_store.create(request.role, request.model)
+    logger.info("Created session %s for role: %s", session.id, request.role)
+    return {"session_id": session.id, "role": session.role, "model": session.model}
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """The session's rolling summary and the exchanges not yet folded into it."""
+    session = find_session(session_id)
+    return {
+        "session_id": session.id,
+        "role": session.role,
+        "model": session.model,
+        "summary": session.summary,
+        "recent_turns": [{"user": user, "assistant": assistant} for user, assistant in session.turns],
+        "total_turns": session.total_turns,
+    }
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    find_session(session_id)
+    session_store.delete(session_id)
+    return {"deleted": session_id}
+
+@app.post("/sessions/{session_id}/messages")
+async def session_message(session_id: str, request: SessionMessage):
+    """Send the next message of a session and receive the reply in context."""
+    session = find_session(session_id)
+    if session.busy:
+        raise HTTPException(status_code=409, detail="The previous message in this session is still being answered.")
+    api_key, model_name = select_model(session.model)
+    session.busy = True
+    try:
+        ai_response = await safe_api_call(get_session_response, session, request.message, api_key, model_name)
+        return {"response": ai_response, "turn": session.total_turns}
+    except Exception as e:
+        raise api_error(e)
+    finally:
+        session.busy = False
 
 @app.post("/voice/")
-async def voice_input(audio: UploadFile = File(...)):
+async def voice_input(request: Request, audio: UploadFile = File(...), stream_audio: bool = False, mode: str = "full",
+                      job: bool = False, priority: int = JOB_DEFAULT_PRIORITY, user: Optional[str] = None):
     logger.info("Received voice input")
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="Invalid analysis mode.")
+    # Validated and passed on as the spooled file; the upload is never read into memory whole
+    audio_file = await spool_upload(audio)
+    if job:
+        # Answered at once; the response and its speech are fetched from /jobs/{job_id}
+        return await submit_job("voice", audio, audio_file, request, {"mode": mode}, user, priority)
     try:
-        audio_bytes = await audio.read()
-        transcript = safe_api_call(transcribe_audio, audio_bytes)
-        logger.debug(f"Transcribed text: {transcript}")
+        return await voice_feedback(audio_file, audio.audio_format, mode, stream_audio=stream_audio)
+    except Exception as e:
+        raise api_error(e)
 
-        # Check if transcription was successful
-        if transcript == "Could not transcribe audio. Please try again later.":
+@app.post("/voice/stream/")
+async def voice_stream(audio: UploadFile = File(...)):
+    """
+    Pipelined voice feedback: sentences go to speech synthesis while the response
+    is still being generated. Streams newline-delimited JSON events of type
+    transcript, delta, audio (base64 mp3 per sentence, in order), then done or error.
+    """
+    logger.info("Received streaming voice input")
+    audio_file = await spool_upload(audio)
+    try:
+        audio_file, filename = await asyncio.to_thread(normalizer.normalize, audio_file, audio.audio_format)
+        try:
+            transcript = await safe_api_call(transcribe_audio, audio_file, filename)
+        except TranscriptionFailed as e:
             logger.error("Transcription failed.")
-            return {"transcript": transcript, "response": "Transcription failed. Please try again."}
-
-        # Modified prompt to include vocal delivery analysis
-        prompt = f"Analyze this speech transcription:\n{transcript}\nProvide feedback on vocal delivery, including pacing, filler words, and clarity. Also provide general feedback on the content."
-        ai_response = safe_api_call(get_ai_response, prompt, "speech_coach", OPENAI_API_KEY, MODEL_NAME) 
-        logger.debug(f"Voice AI Response: {ai_response}")
-        speech_file = text_to_speech(ai_response)
-        return {"transcript": transcript, "response": ai_response, "audio_feedback": speech_file}
-        # return {"transcript": transcript, "response": ai_response}
-
-    except RateLimitError as e:
-        logger.error(f"Rate limit error: {e}")
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    except AuthenticationError as e:
-        logger.error(f"Authentication error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error. Please check your API key.")
-    except BadRequestError as e:
-        logger.error(f"Bad request error: {e}")
-        raise HTTPException(status_code=400, detail="Bad request. Please check your input.")
-    except OpenAIError as e:
-        logger.error(f"OpenAI error: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred with the OpenAI service. Please try again later.")
+            return {"transcript": str(e), "response": TRANSCRIPTION_FAILED_REPLY}
+        logger.debug("Transcribed text: %s", transcript)
+
+        deltas = await safe_api_call(stream_ai_response, voice_feedback_prompt(transcript), "speech_coach", OPENAI_API_KEY, MODEL_NAME)
+        return StreamingResponse(ndjson_events(run_voice_pipeline(transcript, deltas)), media_type="application/x-ndjson")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
+        raise api_error(e)
 
 @app.post("/train/")
 async def train(request: TrainingRequest):
-    logger.info(f"Received training request: {request.module}")
+    logger.info("Received training request: %s", request.module)
     if request.module not in TRAINING_MODULES:
         raise HTTPException(status_code=400, detail="Invalid training module.")
     
     try:
         if request.model == "openai":
-            feedback = safe_api_call(get_ai_response, request.user_input, request.module, OPENAI_API_KEY, MODEL_NAME)
+            feedback = await safe_api_call(get_ai_response, request.user_input, request.module, OPENAI_API_KEY, MODEL_NAME, use_cache=not request.no_cache)
         elif request.model == "xai":
-            feedback = safe_api_call(get_ai_response, request.user_input, request.module, XAI_API_KEY, XAI_MODELS[0])
+            feedback = await safe_api_call(get_ai_response, request.user_input, request.module, XAI_API_KEY, XAI_MODELS[0], use_cache=not request.no_cache)
+        elif request.model == ROUTER_MODEL:
+            feedback = await safe_api_call(get_ai_response, request.user_input, request.module, None, ROUTER_MODEL, use_cache=not request.no_cache)
         else:
             raise HTTPException(status_code=400, detail="Invalid model selected.")
             
-        logger.debug(f"Training feedback: {feedback}")
+        logger.debug("Training feedback: %s", feedback)
         return {"feedback": feedback, "message": f"Feedback for {request.module} training."}
-    except RateLimitError as e:
-        logger.error(f"Rate limit error: {e}")
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    except AuthenticationError as e:
-        logger.error(f"Authentication error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error. Please check your API key.")
-    except BadRequestError as e:
-        logger.error(f"Bad request error: {e}")
-        raise HTTPException(status_code=400, detail="Bad request. Please check your input.")
-    except OpenAIError as e:
-        logger.error(f"OpenAI error: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred with the OpenAI service. Please try again later.")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
+        raise api_error(e)
+    
+@app.post("/train/stream/")
+async def train_stream(request: TrainingRequest):
+    """Stream training feedback as server-sent events while the provider generates it."""
+    logger.info("Received streaming training request: %s", request.module)
+    if request.module not in TRAINING_MODULES:
+        raise HTTPException(status_code=400, detail="Invalid training module.")
+    api_key, model_name = select_model(request.model)
+
+    try:
+        deltas = await safe_api_call(stream_ai_response, request.user_input, request.module, api_key, model_name, use_cache=not request.no_cache)
+        return StreamingResponse(sse_events(deltas), media_type="text/event-stream", headers=SSE_HEADERS)
+    except Exception as e:
+        raise api_error(e)
     
 @app.post("/assess/text/")
-async def assess_presentation_text(text: str = Form(...)):
+async def assess_presentation_text(text: str = Form(...), no_cache: bool = Form(False)):
     logger.info("Received text presentation assessment request")
     try:
         presentation_text = text
         method = "text"
         logger.debug("Processing text presentation")
 
-        feedback = safe_api_call(evaluate_presentation, presentation_text, method)
+        feedback = await safe_api_call(evaluate_presentation, presentation_text, method, use_cache=not no_cache)
         logger.info("Presentation evaluation completed")
-        logger.debug(f"Evaluation feedback: {feedback}")
+        logger.debug("Evaluation feedback: %s", feedback)
         return {"feedback": feedback}
-    except RateLimitError as e:
-        logger.error(f"Rate limit error: {e}")
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    except AuthenticationError as e:
-        logger.error(f"Authentication error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error. Please check your API key.")
-    except BadRequestError as e:
-        logger.error(f"Bad request error: {e}")
-        raise HTTPException(status_code=400, detail="Bad request. Please check your input.")
-    except OpenAIError as e:
-        logger.error(f"OpenAI error: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred with the OpenAI service. Please try again later.")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
+        raise api_error(e)
+
+@app.post("/assess/text/stream/")
+async def assess_presentation_text_stream(text: str = Form(...), no_cache: bool = Form(False)):
+    """
+    Stream a text presentation assessment as newline-delimited JSON: a score event
+    as soon as each score is generated, then done with the full feedback, or error.
+    """
+    logger.info("Received streaming text presentation assessment request")
+    try:
+        events = await safe_api_call(stream_evaluation, text, "text", use_cache=not no_cache)
+        return StreamingResponse(ndjson_events(events), media_type="application/x-ndjson")
+    except Exception as e:
+        raise api_error(e)
+
+def batch_response(items: list, no_cache: bool, concurrency: Optional[int]) -> StreamingResponse:
+    if not items:
+        raise HTTPException(status_code=400, detail="The batch is empty.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"The batch has {len(items)} submissions; the limit is {BATCH_MAX_ITEMS}.")
+    if concurrency is not None and not 1 <= concurrency <= BATCH_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"Concurrency must be between 1 and {BATCH_CONCURRENCY}.")
+    events = batch_assessor.run(items, use_cache=not no_cache, concurrency=concurrency)
+    return StreamingResponse(ndjson_events(events), media_type="application/x-ndjson")
+
+@app.post("/assess/batch/")
+async def assess_presentation_batch(request: BatchRequest):
+    """
+    Assess many text presentations in one request, streamed as newline-delimited
+    JSON: a result or error event per submission as soon as it is assessed (with
+    its index and id), then a summary with the batch's throughput.
+    """
+    items = [item.model_dump() for item in request.items] + [{"id": None, "text": text} for text in request.texts]
+    logger.info("Received batch assessment request with %s submissions", len(items))
+    return batch_response(items, request.no_cache, request.concurrency)
+
+@app.post("/assess/batch/jsonl/")
+async def assess_presentation_batch_jsonl(file: UploadFile = File(...), no_cache: bool = Form(False), concurrency: Optional[int] = Form(None)):
+    """The same as /assess/batch/, for a JSONL upload with one {"id": ..., "text": ...} object per line."""
+    try:
+        # Parsed line by line from the spooled upload, off the event loop
+        await file.seek(0)
+        items = await asyncio.to_thread(parse_jsonl, file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info("Received JSONL batch assessment request with %s submissions", len(items))
+    return batch_response(items, no_cache, concurrency)
 
 @app.post("/assess/voice/")
-async def assess_presentation_voice(audio: UploadFile = File(...)):
+async def assess_presentation_voice(request: Request, audio: UploadFile = File(...), mode: str = "full",
+                                    job: bool = False, priority: int = JOB_DEFAULT_PRIORITY, user: Optional[str] = None):
     logger.info("Received voice presentation assessment request")
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="Invalid analysis mode.")
+    # Validated and passed on as the spooled file; the upload is never read into memory whole
+    audio_file = await spool_upload(audio)
+    if job:
+        # Answered at once; the assessment is fetched from /jobs/{job_id}
+        return await submit_job("assess_voice", audio, audio_file, request, {"mode": mode}, user, priority)
     try:
-        audio_bytes = await audio.read()
-        presentation_text = safe_api_call(transcribe_audio, audio_bytes)
-        method = "voice"
-        logger.debug("Processing voice presentation")
+        return await assess_voice(audio_file, audio.audio_format, mode)
+    except Exception as e:
+        raise api_error(e)
 
-        # Check if transcription was successful
-        if presentation_text == "Could not transcribe audio. Please try again later.":
-            logger.error("Transcription failed.")
-            return {"feedback": "Transcription failed. Please try again."}
+def check_job_id(job_id: str):
+    if not re.match(r"^[a-f0-9]{32}$", job_id):
+        raise HTTPException(status_code=400, detail="Invalid job id")
 
-        feedback = safe_api_call(evaluate_presentation, presentation_text, method)
-        logger.info("Presentation evaluation completed")
-        logger.debug(f"Evaluation feedback: {feedback}")
-        return {"feedback": feedback}
-    except RateLimitError as e:
-        logger.error(f"Rate limit error: {e}")
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    except AuthenticationError as e:
-        logger.error(f"Authentication error: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error. Please check your API key.")
-    except BadRequestError as e:
-        logger.error(f"Bad request error: {e}")
-        raise HTTPException(status_code=400, detail="Bad request. Please check your input.")
-    except OpenAIError as e:
-        logger.error(f"OpenAI error: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred with the OpenAI service. Please try again later.")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a background job: its stages so far, then its result or error."""
+    check_job_id(job_id)
+    view = await job_queue.get(job_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return view
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """Follow a background job as server-sent events until it finishes."""
+    check_job_id(job_id)
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(job_events(job_id), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.get("/audio/{filename}")
 async def get_audio(filename: str):
@@ -226,4 +474,15 @@ async def get_audio(filename: str):
     if os.path.exists(file_path):
         return FileResponse(file_path)
     else:
-        raise HTTPException(status_code=404, detail="Audio file not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Audio file not found")
+
+@app.get("/audio/stream/{stream_id}")
+async def get_audio_stream(stream_id: str):
+    """Stream synthesized feedback audio sentence by sentence, in order."""
+    if not re.match(r"^[a-f0-9]{32}$", stream_id):
+        raise HTTPException(status_code=400, detail="Invalid stream id")
+
+    text = speech_streams.get(stream_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Audio stream not found")
+    return StreamingResponse(stream_speech(text), media_type="audio/mpeg")
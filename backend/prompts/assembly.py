@@ -0,0 +1,68 @@
+import hashlib
+import textwrap
+import threading
+from prompts.prompt_templates import PROMPTS, EVALUATION_PROMPT, BATCH_EVALUATION_PROMPT, SUMMARY_PROMPT
+
+# Bump when the way messages are laid out changes, so cache keys built under the old layout are retired
+ASSEMBLY_VERSION = 2
+DEFAULT_PROMPT = "speech_coach"
+
+
+class CompiledPrompt:
+    """
+    A template compiled once into a fixed system message. Requests add only the
+    user's input as a separate message, so every request for the same prompt
+    starts with byte-identical tokens and providers can serve that prefix from
+    their prompt cache.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self.system = textwrap.dedent(template).strip()
+        digest = hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+        self.version = f"v{ASSEMBLY_VERSION}-{digest}"
+        self._system_message = {"role": "system", "content": self.system}
+
+    def messages(self, user_input: str, history: list = ()) -> list:
+        """The system message, any earlier conversation, then the new input."""
+        return [self._system_message, *history, {"role": "user", "content": user_input}]
+
+
+class PromptUsage:
+    """Prompt and provider-cached prompt token counts per compiled prompt, from the completions' usage data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, prompt: CompiledPrompt, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        with self._lock:
+            stats = self._stats.setdefault(prompt.name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            stats["calls"] += 1
+            stats["prompt_tokens"] += usage.prompt_tokens or 0
+            stats["cached_tokens"] += cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: dict(stats, cached_ratio=round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0)
+                for name, stats in self._stats.items()
+            }
+
+
+# Compiled at import, i.e. once at startup
+COMPILED_PROMPTS = {name: CompiledPrompt(name, template) for name, template in PROMPTS.items()}
+EVALUATION = CompiledPrompt("evaluation", EVALUATION_PROMPT)
+BATCH_EVALUATION = CompiledPrompt("batch_evaluation", BATCH_EVALUATION_PROMPT)
+SUMMARY = CompiledPrompt("summary", SUMMARY_PROMPT)
+
+prompt_usage = PromptUsage()
+
+def get_prompt(role: str) -> CompiledPrompt:
+    """The compiled prompt for a role or training module, defaulting to the speech coach."""
+    return COMPILED_PROMPTS.get(role, COMPILED_PROMPTS[DEFAULT_PROMPT])
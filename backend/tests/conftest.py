@@ -0,0 +1,129 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import wave
+
+import httpx
+import pytest
+
+# Get the absolute path to the 'backend' directory
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add the 'backend' directory to sys.path
+sys.path.append(backend_dir)
+
+
+def silent_wav(seconds: float = 0.5, rate: int = 8000) -> bytes:
+    """A short silent PCM WAV, enough to pass upload validation."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return out.getvalue()
+
+
+SAMPLE_WAV = silent_wav()
+
+
+class FakeProvider:
+    """In-process stand-in for the OpenAI-compatible API with a fixed latency."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.rate_limited = set()
+        self.reply_tokens = ["Fake", " feed", "back."]
+        self.token_latency = 0.01
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if request.url.path.endswith("/audio/transcriptions"):
+                if b"verbose_json" in await request.aread():
+                    return httpx.Response(200, json=self.verbose_transcript())
+                return httpx.Response(200, text="This is a fake transcript.")
+
+            body = json.loads(request.content)
+            content = body["messages"][-1]["content"]
+            for marker in list(self.rate_limited):
+                if marker in content:
+                    self.rate_limited.discard(marker)
+                    return httpx.Response(429, json={"error": {"message": "Rate limit reached", "type": "requests"}})
+            if body.get("stream"):
+                return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                      content=self.stream_chunks(body["model"]))
+            return httpx.Response(200, json={
+                "id": f"chatcmpl-{self.calls}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(self.reply_tokens)},
+                    "finish_reason": "stop",
+                }],
+            })
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def verbose_transcript():
+        words = "This is a fake transcript.".split()
+        return {
+            "task": "transcribe",
+            "language": "english",
+            "duration": 2.5,
+            "text": "This is a fake transcript.",
+            "words": [{"word": w, "start": i * 0.5, "end": i * 0.5 + 0.4} for i, w in enumerate(words)],
+        }
+
+    async def stream_chunks(self, model):
+        for token in self.reply_tokens:
+            chunk = {
+                "id": "chatcmpl-stream",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+            await asyncio.sleep(self.token_latency)
+        yield b"data: [DONE]\n\n"
+
+    def registry(self):
+        from utils.providers import ClientRegistry
+
+        providers = {
+            "openai": {"base_url": "http://fake-openai/v1", "api_key": "test-key"},
+            "xai": {"base_url": "http://fake-xai/v1", "api_key": "test-key"},
+        }
+        return ClientRegistry(providers, transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture
+def fake_provider(monkeypatch, tmp_path):
+    """Route every provider call to a FakeProvider and keep progress out of the repo."""
+    from utils import database, providers
+    from utils.progress_writer import writer
+    from utils.rate_limiter import RateLimiter
+    from utils.response_cache import response_cache
+    from utils.router import router
+
+    provider = FakeProvider()
+    response_cache.clear()  # Every test starts cold, so provider call counts are predictable
+    router.reset()
+    monkeypatch.setattr(providers, "registry", provider.registry())
+    monkeypatch.setattr(providers, "rate_limiter", RateLimiter())
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "progress.db"))
+    yield provider
+    # Write queued records while DB_FILE still points at tmp_path
+    writer.flush()
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from main import app
+from utils import voice_pipeline
+from conftest import silent_wav
+
+CONCURRENCY = 10
+
+
+# Every request carries a distinct input, so none are coalesced or served from the cache.
+def post_chat(client, i):
+    return client.post("/chat/", json={"message": f"Hello {i}", "role": "speech_coach", "model": "openai"})
+
+def post_train(client, i):
+    return client.post("/train/", json={"user_input": f"Explain teamwork, take {i}.", "module": "impromptu", "model": "openai"})
+
+def post_assess_text(client, i):
+    return client.post("/assess/text/", data={"text": f"This is test presentation {i}."})
+
+def post_assess_voice(client, i):
+    return client.post("/assess/voice/", files={"audio": ("test.wav", silent_wav(0.5 + i / 100), "audio/wav")})
+
+def post_voice(client, i):
+    return client.post("/voice/", files={"audio": ("test.wav", silent_wav(0.5 + i / 100), "audio/wav")})
+
+
+async def run_concurrently(send, count):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(send(client, i) for i in range(count)))
+        return responses, time.perf_counter() - start
+
+
+@pytest.mark.parametrize("send, provider_calls", [
+    (post_chat, 1),
+    (post_train, 1),
+    (post_assess_text, 1),
+    (post_assess_voice, 2),
+    (post_voice, 2),
+])
+def test_concurrent_requests_overlap(fake_provider, monkeypatch, send, provider_calls):
+    monkeypatch.setattr(voice_pipeline, "text_to_speech", lambda text: "fake.mp3")
+
+    responses, elapsed = asyncio.run(run_concurrently(send, CONCURRENCY))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert fake_provider.max_in_flight == CONCURRENCY
+    # Serialised handling would take CONCURRENCY * provider_calls * latency.
+    serial_time = CONCURRENCY * provider_calls * fake_provider.latency
+    assert elapsed < serial_time / 3
+
+def test_rate_limit_backoff_does_not_block_other_requests(fake_provider):
+    fake_provider.rate_limited.add("slow down")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            finished = []
+
+            async def send(message):
+                response = await client.post("/chat/", json={"message": message, "role": "speech_coach", "model": "openai"})
+                finished.append(message)
+                return response
+
+            responses = await asyncio.gather(send("slow down"), send("Hello"))
+            return responses, finished
+
+    responses, finished = asyncio.run(scenario())
+
+    assert all(response.status_code == 200 for response in responses)
+    # The retried request sleeps for its backoff while the other one completes.
+    assert finished == ["Hello", "slow down"]
@@ -0,0 +1,116 @@
+import io
+import wave
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from utils import voice_pipeline
+from utils.audio_processing import AudioNormalizer, Resampler, speech_bounds
+
+
+def make_wav(pattern, rate=44100, channels=2, frequency=440.0):
+    """Build a 16-bit WAV from (seconds, loud) pairs: loud sections are a tone, quiet ones near-silence."""
+    parts = []
+    for seconds, loud in pattern:
+        t = np.arange(int(seconds * rate)) / rate
+        parts.append(np.sin(2 * np.pi * frequency * t) * 0.5 if loud else np.zeros_like(t))
+    samples = (np.concatenate(parts) * 32767).astype(np.int16)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat(samples[:, None], channels, axis=1).tobytes())
+    out.seek(0)
+    return out
+
+def read_wav(audio_file):
+    with wave.open(audio_file, "rb") as wav:
+        params = wav.getparams()
+        samples = np.frombuffer(wav.readframes(params.nframes), dtype=np.int16) / 32767
+    return params, samples
+
+def dominant_frequency(samples, rate):
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[np.argmax(spectrum)]
+
+
+def test_stereo_wav_is_downmixed_resampled_and_trimmed():
+    normalizer = AudioNormalizer(target_rate=16000, padding_seconds=0.2)
+    upload = make_wav([(2, False), (3, True), (2, False)])
+
+    audio_file, filename = normalizer.normalize(upload, "wav")
+    params, samples = read_wav(audio_file)
+
+    assert filename == "audio.wav"
+    assert (params.nchannels, params.sampwidth, params.framerate) == (1, 2, 16000)
+    assert 3.3 <= params.nframes / 16000 <= 3.5  # Speech plus padding on both sides
+    assert abs(dominant_frequency(samples, 16000) - 440) < 2
+    stats = normalizer.stats()
+    assert stats["requests"] == 1 and stats["normalized"] == 1
+    assert stats["bytes_in"] == len(upload.getvalue())
+    assert stats["bytes_in"] / stats["bytes_sent"] > 10
+
+def test_resampler_removes_content_above_new_nyquist():
+    rate = 44100
+    t = np.arange(rate) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) + np.sin(2 * np.pi * 12000 * t)).astype(np.float32) * 0.4
+
+    out = Resampler(rate, 16000).process(tone)
+
+    spectrum = np.abs(np.fft.rfft(out[1000:-1000]))
+    freqs = np.fft.rfftfreq(len(out) - 2000, 1 / 16000)
+    kept = spectrum[np.argmin(np.abs(freqs - 440))]
+    alias = spectrum[np.argmin(np.abs(freqs - 4000))]  # Where 12 kHz folds to without filtering
+    assert alias < kept / 50
+
+def test_resampling_in_blocks_matches_one_pass():
+    samples = np.random.default_rng(0).normal(0, 0.1, 44100 * 3).astype(np.float32)
+
+    whole = Resampler(44100, 16000).process(samples)
+    blocked = Resampler(44100, 16000)
+    parts = np.concatenate([blocked.process(block) for block in np.array_split(samples, 7)])
+
+    assert len(parts) == len(whole)
+    assert np.allclose(parts, whole, atol=1e-5)
+
+def test_non_wav_is_passed_through_with_its_real_name():
+    normalizer = AudioNormalizer()
+    upload = io.BytesIO(b"ID3" + b"\x00" * 1000)
+
+    audio_file, filename = normalizer.normalize(upload, "mp3")
+
+    assert audio_file is upload and filename == "audio.mp3"
+    assert normalizer.stats()["bytes_in"] == normalizer.stats()["bytes_sent"] == 1003
+
+def test_compact_wav_is_not_rewritten():
+    normalizer = AudioNormalizer(target_rate=16000)
+    upload = make_wav([(2, True)], rate=16000, channels=1)
+
+    audio_file, filename = normalizer.normalize(upload, "wav")
+
+    assert audio_file is upload and filename == "audio.wav"
+    assert normalizer.stats()["normalized"] == 0
+
+def test_silent_recording_is_kept_whole():
+    energy = np.zeros(100)
+
+    assert speech_bounds(energy, padding_frames=5) == (0, 100)
+
+def test_voice_upload_is_normalized_before_transcription(monkeypatch):
+    received = []
+
+    async def transcribe(audio, filename):
+        received.append((filename, read_wav(audio)[0]))
+        return {"text": "Hello there.", "words": [], "duration": 1.0}
+
+    monkeypatch.setattr(voice_pipeline, "transcribe_audio_with_timestamps", transcribe)
+    upload = make_wav([(1, False), (2, True), (1, False)]).getvalue()
+
+    response = TestClient(main.app).post("/assess/voice/?mode=metrics", files={"audio": ("talk.wav", upload, "audio/wav")})
+
+    assert response.status_code == 200
+    filename, params = received[0]
+    assert filename == "audio.wav"
+    assert (params.nchannels, params.framerate) == (1, 16000)
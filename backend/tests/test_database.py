@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from utils import database
+
+
+@pytest.fixture
+def db_file(monkeypatch, tmp_path):
+    path = tmp_path / "progress.db"
+    monkeypatch.setattr(database, "DB_FILE", str(path))
+    return path
+
+
+def test_save_and_load_progress(db_file):
+    database.save_user_progress("Once upon a time...", "Nice arc.", "storytelling")
+    database.save_presentation_feedback("My talk", "Good structure.")
+
+    records = database.load_progress()
+
+    assert [record.get("module") for record in records] == ["storytelling", None]
+    assert records[0]["input"] == "Once upon a time..."
+    assert records[1]["type"] == "presentation"
+    assert records[1]["feedback"] == "Good structure."
+
+def test_query_progress_by_module_type_and_time(db_file):
+    database.save_user_progress("a", "fa", "impromptu")
+    database.save_user_progress("b", "fb", "storytelling")
+    database.save_presentation_feedback("c", "fc")
+
+    assert [r["input"] for r in database.query_progress(module="storytelling")] == ["b"]
+    assert [r["input"] for r in database.query_progress(record_type="presentation")] == ["c"]
+    first = database.load_progress()[0]["timestamp"]
+    assert database.query_progress(until=first) == []
+    assert len(database.query_progress(since=first, limit=2)) == 2
+
+def test_legacy_json_is_migrated_once(db_file):
+    legacy = [
+        {"module": "impromptu", "input": "x", "feedback": "y"},
+        {"type": "presentation", "input": "p", "feedback": "q"},
+    ]
+    (db_file.parent / "progress.json").write_text(json.dumps(legacy, indent=4))
+
+    records = database.load_progress()
+    assert [(r.get("module"), r.get("type"), r["input"]) for r in records] == [
+        ("impromptu", None, "x"),
+        (None, "presentation", "p"),
+    ]
+
+    # A fresh connection must not import the legacy file a second time.
+    database.migrate_legacy_json(database.get_connection())
+    assert len(database.load_progress()) == 2
+
+def test_corrupt_legacy_json_is_retried_once_fixed(db_file):
+    legacy_file = db_file.parent / "progress.json"
+    legacy_file.write_text('[{"module": "impromptu", "input": "x", "feedback": "y"},')
+
+    assert database.load_progress() == []
+
+    legacy_file.write_text(json.dumps([{"module": "impromptu", "input": "x", "feedback": "y"}]))
+    database.migrate_legacy_json(database.get_connection())
+    assert [r["input"] for r in database.load_progress()] == ["x"]
+
+def test_concurrent_writers_do_not_lose_records(db_file):
+    def write(worker):
+        for i in range(50):
+            database.save_user_progress(f"{worker}-{i}", "ok", "impromptu")
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(database.load_progress()) == 200
+
+def test_existing_database_gains_scores_column(db_file):
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE progress (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, type TEXT NOT NULL, module TEXT, input TEXT, feedback TEXT)")
+    conn.execute("INSERT INTO progress (created_at, type, input, feedback) VALUES (1.0, 'presentation', 'old', 'fine')")
+    conn.commit()
+    conn.close()
+
+    database.save_presentation_feedback("new", "Good.", {"structure_score": 8})
+
+    records = database.query_progress(record_type="presentation")
+    assert "scores" not in records[0]
+    assert records[1]["scores"] == {"structure_score": 8}
@@ -0,0 +1,14 @@
+from fastapi import HTTPException
+
+from utils.errors import error_detail, http_error
+from utils.rate_limiter import RateLimitQueueFull
+from utils.token_budget import InputTooLong
+
+
+def test_errors_map_to_the_same_answers_for_endpoints_and_jobs():
+    busy = http_error(RateLimitQueueFull(2.2))
+    assert (busy.status_code, busy.headers) == (503, {"Retry-After": "3"})
+    assert http_error(InputTooLong(900, 500)).status_code == 413
+    assert http_error(KeyError("words")).status_code == 500
+    refused = HTTPException(status_code=400, detail="Invalid model selected.")
+    assert http_error(refused) is refused and error_detail(refused) == "Invalid model selected."
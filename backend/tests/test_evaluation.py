@@ -0,0 +1,107 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+from utils import database
+from utils.evaluation import SCORE_FIELDS, EvaluationParser, ScoreStreamParser
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "evaluation_outputs.json")
+REPLY = {"structure_score": 8, "delivery_score": 6, "content_score": 7, "full_report": "Clear opening."}
+
+
+def load_corpus():
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def scores(feedback: dict) -> dict:
+    return {field: feedback[field] for field in SCORE_FIELDS if field in feedback}
+
+def legacy_parse(raw: str) -> dict:
+    """What evaluate_presentation did before: json.loads or the raw text as the report."""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return {"full_report": raw}
+
+def failure_rate(parse, corpus) -> float:
+    failures = sum(1 for entry in corpus if len(scores(parse(entry["raw"]))) < len(SCORE_FIELDS))
+    return failures / len(corpus)
+
+
+def test_recorded_outputs_parse_to_the_expected_scores():
+    parser = EvaluationParser()
+
+    for entry in load_corpus():
+        feedback = parser.parse(entry["raw"])
+        if entry["scores"]:
+            assert scores(feedback) == entry["scores"], entry["raw"]
+        else:
+            assert len(scores(feedback)) < len(SCORE_FIELDS), entry["raw"]
+        assert feedback["full_report"]
+
+def test_parse_failure_rate_on_recorded_outputs():
+    corpus = load_corpus()
+    parser = EvaluationParser()
+    unscoreable = sum(1 for entry in corpus if entry["scores"] is None) / len(corpus)
+
+    assert failure_rate(parser.parse, corpus) == unscoreable
+    assert failure_rate(legacy_parse, corpus) > 2 * unscoreable
+    assert parser.stats()["failure_rate"] == round(unscoreable, 3)
+
+def test_schema_constrained_outputs_never_fail():
+    parser = EvaluationParser()
+    constrained = [entry for entry in load_corpus() if entry["raw"].lstrip().startswith('{"structure_score"') and entry["scores"]]
+
+    assert failure_rate(parser.parse, constrained) == 0
+
+def test_stream_parser_emits_each_score_once_it_is_complete():
+    raw = json.dumps(REPLY)
+    parser = ScoreStreamParser()
+    seen = []
+    for i in range(0, len(raw), 3):
+        for field, score in parser.feed(raw[i:i + 3]).items():
+            seen.append((field, score, i + 3))
+
+    assert [(field, score) for field, score, _ in seen] == [("structure_score", 8), ("delivery_score", 6), ("content_score", 7)]
+    assert all(position < raw.index("full_report") + 3 for _, _, position in seen)
+
+def test_stream_parser_waits_for_multi_digit_scores():
+    parser = ScoreStreamParser()
+
+    assert parser.feed('{"structure_score": 1') == {}
+    assert parser.feed('0, "delivery_score"') == {"structure_score": 10}
+
+def test_streamed_assessment_sends_scores_before_the_report(fake_provider):
+    raw = json.dumps(REPLY)
+    fake_provider.reply_tokens = [raw[i:i + 8] for i in range(0, len(raw), 8)]
+    client = TestClient(main.app)
+
+    response = client.post("/assess/text/stream/", data={"text": "Our quarterly results."})
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["score", "score", "score", "done"]
+    assert events[-1]["feedback"] == REPLY
+
+def test_scores_are_requested_with_a_schema_and_persisted(fake_provider, monkeypatch):
+    handler = fake_provider.handler
+    bodies = []
+
+    async def capture(request):
+        bodies.append(json.loads(request.content))
+        return await handler(request)
+
+    fake_provider.handler = capture
+    fake_provider.reply_tokens = [json.dumps(REPLY)]
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    client = TestClient(main.app)
+
+    response = client.post("/assess/text/", data={"text": "Our quarterly results."})
+    main.progress_writer.flush()
+
+    assert response.json()["feedback"] == REPLY
+    assert bodies[0]["response_format"]["json_schema"]["strict"] is True
+    record = database.query_progress(record_type="presentation")[-1]
+    assert record["scores"] == {"structure_score": 8, "delivery_score": 6, "content_score": 7}
+    assert record["feedback"] == "Clear opening."
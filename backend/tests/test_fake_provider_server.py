@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from conftest import SAMPLE_WAV, backend_dir
+from utils.evaluation import EvaluationParser, PresentationScores
+
+sys.path.append(os.path.join(backend_dir, "benchmarks"))
+
+from fake_provider_server import create_app  # noqa: E402
+from load_test import build_request, percentile  # noqa: E402
+
+
+def client_for(app) -> AsyncOpenAI:
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake")
+    return AsyncOpenAI(api_key="fake", base_url="http://fake/v1", http_client=http_client, max_retries=0)
+
+def instant_app(**kwargs):
+    latency = dict(chat_latency="fixed:0", transcription_latency="fixed:0", speech_latency="fixed:0", token_interval=0)
+    return create_app(**latency, **kwargs)
+
+def test_chat_completions_are_unique_and_report_usage():
+    client = client_for(instant_app())
+
+    async def chat():
+        return await client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hello there"}])
+
+    async def run():
+        return await chat(), await chat()
+
+    first, second = asyncio.run(run())
+    assert first.choices[0].message.content != second.choices[0].message.content
+    assert first.usage.completion_tokens > 0
+
+def test_streamed_completion_joins_to_the_full_reply():
+    client = client_for(instant_app(reply_words=12))
+
+    async def run():
+        stream = await client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}], stream=True)
+        return "".join([chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices])
+
+    assert asyncio.run(run()).startswith("Feedback 1. Today I want to talk")
+
+def test_schema_constrained_evaluation_parses():
+    client = client_for(instant_app())
+
+    async def run():
+        return await client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "Evaluate"}],
+            response_format={"type": "json_schema", "json_schema": {"name": "scores", "schema": PresentationScores.model_json_schema()}},
+        )
+
+    parser = EvaluationParser()
+    feedback = parser.parse(asyncio.run(run()).choices[0].message.content)
+    assert set(feedback) == {"structure_score", "delivery_score", "content_score", "full_report"}
+    assert parser.stats()["valid"] == 1
+
+def test_transcriptions_and_speech():
+    client = client_for(instant_app())
+
+    async def run():
+        text = await client.audio.transcriptions.create(model="whisper-1", file=("talk.wav", SAMPLE_WAV), response_format="text")
+        verbose = await client.audio.transcriptions.create(model="whisper-1", file=("talk.wav", SAMPLE_WAV), response_format="verbose_json")
+        speech = await client.audio.speech.create(model="tts-1", voice="alloy", input="Great pacing and clear points.")
+        return text, verbose, speech
+
+    text, verbose, speech = asyncio.run(run())
+    assert text.strip().startswith("So")
+    assert verbose.words[0].word == "so" and verbose.words[0].end > verbose.words[0].start
+    assert speech.content[:2] == b"\xff\xfb"
+
+def test_injected_and_limit_429s_carry_rate_limit_headers():
+    async def create(app):
+        return await client_for(app).chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}])
+
+    with pytest.raises(openai.RateLimitError) as error:
+        asyncio.run(create(instant_app(error_rate=1, retry_after=2)))
+    assert error.value.response.headers["retry-after"] == "2"
+
+    limited = instant_app(rpm_limit=1)
+
+    async def twice():
+        await create(limited)
+        await create(limited)
+
+    with pytest.raises(openai.RateLimitError) as error:
+        asyncio.run(twice())
+    assert error.value.response.headers["x-ratelimit-remaining-requests"] == "0"
+
+def test_load_test_requests_vary_unless_repeated():
+    audio = SAMPLE_WAV
+    assert build_request("chat", 1, audio, False)["json"] != build_request("chat", 2, audio, False)["json"]
+    first, second = (build_request("voice", i, audio, False)["files"]["audio"][1] for i in (1, 2))
+    assert first != second and len(first) == len(audio)
+    assert build_request("voice", 1, audio, True)["files"] == build_request("voice", 2, audio, True)["files"]
+    assert percentile([3, 1, 2, 4], 0.5) == 3
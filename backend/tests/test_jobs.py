@@ -0,0 +1,180 @@
+import asyncio
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import SAMPLE_WAV
+from utils import database, jobs, voice_pipeline
+from utils.jobs import FairQueue, Job, JobQueue, JobQueueFull
+
+
+def make_job(user: str, priority: int = 5, name: str = None) -> Job:
+    return Job("echo", user, priority, {"name": name or user}, ("echo",))
+
+def test_fair_queue_runs_higher_priorities_first_and_takes_turns_between_users():
+    queue = FairQueue()
+    for job in [make_job("a", name="a1"), make_job("a", name="a2"), make_job("a", name="a3"),
+                make_job("b", name="b1"), make_job("c", priority=9, name="c1"), make_job("b", name="b2")]:
+        queue.push(job)
+
+    order = []
+    while (job := queue.pop()) is not None:
+        order.append(job.params["name"])
+
+    assert order == ["c1", "a1", "b1", "a2", "b2", "a3"]
+    assert len(queue) == 0
+
+
+async def echo(job, stage):
+    async with stage("echo"):
+        await asyncio.sleep(0.01)
+    return {"name": job.params["name"]}
+
+async def wait_for(queue: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        view = await queue.get(job_id)
+        if view["status"] in jobs.FINISHED:
+            return view
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+@pytest.fixture
+def job_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "progress.db"))
+    return tmp_path
+
+def test_queued_jobs_survive_a_restart(job_db):
+    pipelines = {"echo": (("echo",), echo)}
+
+    async def submit_and_stop():
+        queue = JobQueue(workers=0, audio_dir=str(job_db / "audio"), pipelines=pipelines)  # Nothing runs before the "restart"
+        return [
+            (await queue.submit("echo", io.BytesIO(b"audio"), "wav", {"name": name})).id
+            for name in ("first", "second")
+        ]
+
+    async def restart(job_ids):
+        queue = JobQueue(workers=2, audio_dir=str(job_db / "audio"), pipelines=pipelines)
+        await queue.start()
+        try:
+            return [await wait_for(queue, job_id) for job_id in job_ids], queue.stats()
+        finally:
+            await queue.stop()
+
+    job_ids = asyncio.run(submit_and_stop())
+    assert [record["status"] for record in database.load_jobs(("queued",))] == ["queued", "queued"]
+
+    views, stats = asyncio.run(restart(job_ids))
+    assert [view["result"] for view in views] == [{"name": "first"}, {"name": "second"}]
+    assert all(view["stages"]["echo"]["status"] == "done" for view in views)
+    assert stats["recovered"] == 2
+    assert database.load_jobs(("queued", "running")) == []
+    assert not list((job_db / "audio").iterdir())  # Audio is removed once its job finishes
+
+def test_full_queue_refuses_jobs(job_db):
+    async def submit_three():
+        queue = JobQueue(workers=0, max_queued=2, audio_dir=str(job_db / "audio"), pipelines={"echo": (("echo",), echo)})
+        for _ in range(3):
+            await queue.submit("echo", io.BytesIO(b"audio"), "wav", {"name": "x"})
+
+    with pytest.raises(JobQueueFull):
+        asyncio.run(submit_three())
+
+def test_failed_stage_records_the_error(job_db):
+    async def fail(job, stage):
+        async with stage("echo"):
+            raise RuntimeError("boom")
+
+    async def run():
+        queue = JobQueue(workers=1, audio_dir=str(job_db / "audio"), pipelines={"echo": (("echo", "after"), fail)})
+        job = await queue.submit("echo", io.BytesIO(b"audio"), "wav")
+        try:
+            return await wait_for(queue, job.id)
+        finally:
+            await queue.stop()
+
+    view = asyncio.run(run())
+    assert view["status"] == "failed"
+    assert view["error"] == "An unexpected error occurred. Please try again later."
+    assert view["stages"]["echo"]["status"] == "failed"
+    assert view["stages"]["after"]["status"] == "skipped"
+
+def test_worker_survives_a_database_error_when_a_job_ends(job_db, monkeypatch):
+    save_job = database.save_job
+
+    def flaky_save(record):
+        if record["status"] == "done" and record["params"]["name"] == "first":
+            raise OSError("disk I/O error")
+        save_job(record)
+
+    monkeypatch.setattr(database, "save_job", flaky_save)
+
+    async def run():
+        queue = JobQueue(workers=1, audio_dir=str(job_db / "audio"), pipelines={"echo": (("echo",), echo)})
+        first = await queue.submit("echo", io.BytesIO(b"audio"), "wav", {"name": "first"})
+        second = await queue.submit("echo", io.BytesIO(b"audio"), "wav", {"name": "second"})
+        try:
+            return await wait_for(queue, second.id), queue.stats(), queue._tasks[0].done()
+        finally:
+            await queue.stop()
+
+    view, stats, worker_done = asyncio.run(run())
+    assert view["result"] == {"name": "second"}
+    assert stats["done"] == 2 and not worker_done
+
+
+@pytest.fixture
+def client(fake_provider, monkeypatch, tmp_path):
+    import main
+
+    monkeypatch.setattr(jobs.job_queue, "audio_dir", str(tmp_path / "job_audio"))
+    monkeypatch.setattr(voice_pipeline, "text_to_speech", lambda text: "fake.mp3")
+    with TestClient(main.app) as client:
+        yield client
+
+def poll(client, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        view = client.get(f"/jobs/{job_id}").json()
+        if view["status"] in jobs.FINISHED:
+            return view
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_voice_assessment_job_returns_at_once_and_can_be_polled(client):
+    response = client.post("/assess/voice/?job=true", files={"audio": ("talk.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    view = poll(client, job_id)
+    assert view["status"] == "done"
+    assert view["result"]["feedback"]["full_report"]
+    assert "metrics" in view["result"]
+    assert [stage["status"] for stage in view["stages"].values()] == ["done", "done", "done"]
+
+def test_voice_job_runs_speech_synthesis(client):
+    response = client.post("/voice/?job=true&user=alice&priority=9", files={"audio": ("talk.wav", SAMPLE_WAV, "audio/wav")})
+
+    view = poll(client, response.json()["job_id"])
+    assert view["kind"] == "voice"
+    assert view["result"]["response"] == "Fake feedback."
+    assert view["result"]["audio_feedback"] == "fake.mp3"
+    assert list(view["stages"]) == ["normalize", "transcribe", "respond", "speech"]
+
+def test_job_events_stream_stages_until_done(client):
+    job_id = client.post("/assess/voice/?job=true", files={"audio": ("talk.wav", SAMPLE_WAV, "audio/wav")}).json()["job_id"]
+
+    with client.stream("GET", f"/jobs/{job_id}/events") as response:
+        body = "".join(response.iter_text())
+
+    assert body.count("event: done") == 1
+    assert body.rstrip().splitlines()[-2] == "event: done"
+
+def test_unknown_and_invalid_jobs(client):
+    assert client.get(f"/jobs/{'0' * 32}").status_code == 404
+    assert client.get("/jobs/not-a-job").status_code == 400
+    response = client.post("/assess/voice/?job=true&priority=12", files={"audio": ("talk.wav", SAMPLE_WAV, "audio/wav")})
+    assert response.status_code == 400
@@ -0,0 +1,88 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from utils.logs import JsonFormatter, SamplingFilter, TruncatingFilter, configure_logging, flush_logs, parse_level
+
+
+def make_record(msg: str, *args, level: int = logging.DEBUG) -> logging.LogRecord:
+    return logging.LogRecord("verbal_trainer", level, __file__, 1, msg, args, None)
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    level = root.level
+    yield
+    configure_logging(level)
+
+def test_long_arguments_and_messages_are_truncated():
+    truncate = TruncatingFilter(limit=10)
+    record = make_record("Transcript: %s (%d words)", "word " * 100, 100)
+    truncate.filter(record)
+    assert record.getMessage() == "Transcript: word word ... [490 more chars] (100 words)"
+
+    record = make_record("x" * 25)
+    truncate.filter(record)
+    assert record.getMessage() == "xxxxxxxxxx... [15 more chars]"
+
+def test_non_string_arguments_keep_their_type():
+    numpy = pytest.importorskip("numpy")
+    record = make_record("%d pauses, %r, %.1f wpm", numpy.int64(3), {"key": "value"}, numpy.float32(141.5))
+    TruncatingFilter(limit=10).filter(record)
+    assert record.getMessage() == "3 pauses, {'key': 'value'}, 141.5 wpm"
+
+def test_level_names_and_numbers_are_parsed():
+    assert parse_level("warning") == logging.WARNING
+    assert parse_level(" 15 ") == 15
+    assert parse_level("LOUD") is None
+
+def test_debug_records_are_sampled_per_message():
+    sample = SamplingFilter(rate=0.25)
+    kept = [sample.filter(make_record("Cache hit: %s", i)) for i in range(8)]
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert sample.filter(make_record("Another message"))  # Counted separately
+    assert all(sample.filter(make_record("Request %s", i, level=logging.INFO)) for i in range(4))
+
+def test_json_formatter_includes_extra_fields():
+    record = make_record("Job %s done", "abc", level=logging.INFO)
+    record.job_id = "abc"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Job abc done"
+    assert entry["level"] == "INFO"
+    assert entry["job_id"] == "abc"
+
+def test_records_are_written_by_the_listener_thread(restore_logging):
+    writers = []
+
+    class RecordingStream(io.StringIO):
+        def write(self, text):
+            writers.append(threading.current_thread().name)
+            return super().write(text)
+
+    stream = RecordingStream()
+    configure_logging(logging.INFO, stream, max_field_chars=20)
+    logger = logging.getLogger("verbal_trainer")
+    logger.debug("Not written: %s", "payload")
+    logger.info("Response: %s", "a" * 100)
+    flush_logs()
+
+    output = stream.getvalue()
+    assert "Not written" not in output
+    assert "Response: " + "a" * 20 + "... [80 more chars]" in output
+    assert writers and threading.current_thread().name not in writers
+
+def test_disabled_debug_calls_never_format_their_arguments(restore_logging):
+    formatted = []
+
+    class Payload:
+        def __str__(self):
+            formatted.append(True)
+            return "payload"
+
+    configure_logging(logging.INFO, io.StringIO())
+    logging.getLogger("verbal_trainer").debug("Payload: %s", Payload())
+    flush_logs()
+    assert formatted == []
@@ -12,6 +12,8 @@ backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(backend_dir)
 
 from main import app  # Now the import should work
+from utils import voice_pipeline
+from conftest import silent_wav
 
 client = TestClient(app)
 
@@ -39,9 +41,10 @@ def test_chat_invalid_model():
     assert "detail" in response.json()
     assert response.json()["detail"] == "Invalid model selected."
 
-def test_voice_input():
-    # Create a dummy audio file
-    audio_file_path = create_dummy_audio_file()
+def test_voice_input(fake_provider, monkeypatch):
+    monkeypatch.setattr(voice_pipeline, "text_to_speech", lambda text: "fake.mp3")
+    # A real (silent) WAV; uploads are checked for an audio signature
+    audio_file_path = create_dummy_audio_file(content=silent_wav())
 
     with open(audio_file_path, "rb") as audio_file:
         files = {"audio": ("test.wav", audio_file, "audio/wav")}
@@ -55,6 +58,10 @@ def test_voice_input():
     assert "response" in response.json()
     assert "audio_feedback" in response.json()
 
+def test_voice_input_rejects_files_that_are_not_audio():
+    response = client.post("/voice/", files={"audio": ("test.wav", b"dummy audio data", "audio/wav")})
+    assert response.status_code == 415
+
 def test_assess_presentation_text():
     response = client.post("/assess/", params={"text": "This is a test presentation."})
     assert response.status_code == 200
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from utils import metrics
+from utils.helper_functions import safe_api_call
+from utils.metrics import Counter, Histogram, Registry, timed
+
+
+def sample(text: str, prefix: str) -> float:
+    """The value of the first exposition line starting with `prefix`."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample starting with {prefix}")
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1)))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, "a")
+
+    text = registry.render()
+
+    assert "# TYPE verbal_trainer_test_seconds histogram" in text
+    assert sample(text, 'verbal_trainer_test_seconds_bucket{stage="a",le="0.1"}') == 1
+    assert sample(text, 'verbal_trainer_test_seconds_bucket{stage="a",le="1"}') == 3
+    assert sample(text, 'verbal_trainer_test_seconds_bucket{stage="a",le="+Inf"}') == 4
+    assert sample(text, 'verbal_trainer_test_seconds_sum{stage="a"}') == pytest.approx(4.25)
+    assert sample(text, 'verbal_trainer_test_seconds_count{stage="a"}') == 4
+
+def test_stats_are_exported_as_gauges_with_escaped_labels():
+    registry = Registry()
+    counter = registry.register(Counter("things_total", "Things", ("name",)))
+    counter.inc('say "hi"', amount=2)
+
+    text = registry.render({"cache": {"hits": 3, "enabled": True, "name": "memory", "models": {"gpt-4o-mini": {"p50": 0.25}}}})
+
+    assert sample(text, 'verbal_trainer_things_total{name="say \\"hi\\""}') == 2
+    assert sample(text, 'verbal_trainer_stat{section="cache",key="hits"}') == 3
+    assert sample(text, 'verbal_trainer_stat{section="cache",key="enabled"}') == 1
+    assert sample(text, 'verbal_trainer_stat{section="cache",key="models.gpt-4o-mini.p50"}') == 0.25
+    assert 'key="name"' not in text
+
+def test_timed_records_sync_and_async_calls_with_their_outcome():
+    @timed("test_sync")
+    def double(x):
+        return x * 2
+
+    @timed("test_async")
+    async def fail():
+        raise ValueError("boom")
+
+    assert double(2) == 4
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+
+    text = metrics.registry.render()
+    assert sample(text, 'verbal_trainer_stage_duration_seconds_count{stage="test_sync",outcome="ok"}') >= 1
+    assert sample(text, 'verbal_trainer_stage_duration_seconds_count{stage="test_async",outcome="error"}') >= 1
+
+def test_retries_and_token_usage_are_counted():
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            response = httpx.Response(429, request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        return "ok"
+
+    before = metrics.provider_retries._values.get(("flaky",), 0)
+    assert asyncio.run(safe_api_call(flaky, initial_delay=0.001)) == "ok"
+    assert metrics.provider_retries._values[("flaky",)] - before == 2
+
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30, prompt_tokens_details=SimpleNamespace(cached_tokens=100))
+    metrics.record_usage("openai", "test-model", usage)
+    text = metrics.registry.render()
+    assert sample(text, 'verbal_trainer_tokens_total{provider="openai",model="test-model",kind="prompt"}') >= 120
+    assert sample(text, 'verbal_trainer_tokens_total{provider="openai",model="test-model",kind="cached"}') >= 100
+
+def test_metrics_endpoint_reports_request_stage_and_provider_latency(fake_provider):
+    import main
+
+    client = TestClient(main.app)
+    assert client.post("/chat/", json={"message": "Metrics please", "role": "speech_coach"}).status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert sample(text, 'verbal_trainer_http_request_duration_seconds_count{method="POST",route="/chat/",status="200"}') >= 1
+    assert sample(text, 'verbal_trainer_stage_duration_seconds_count{stage="respond",outcome="ok"}') >= 1
+    assert sample(text, 'verbal_trainer_provider_request_duration_seconds_count{provider="openai",model="gpt-4o-mini",operation="chat",outcome="ok"}') >= 1
+    assert 'verbal_trainer_stat{section="response_cache"' in text
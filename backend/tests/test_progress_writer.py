@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from utils import database
+from utils.progress_writer import ProgressWriter
+
+
+@pytest.fixture(autouse=True)
+def db_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "progress.db"))
+
+
+def record(i):
+    return {"module": "impromptu", "input": f"input {i}", "feedback": "ok"}
+
+
+def test_submit_does_not_wait_for_disk():
+    writer = ProgressWriter(batch_size=1000, flush_interval=5)
+    writer.start()
+
+    start = time.perf_counter()
+    for i in range(1000):
+        assert writer.submit(record(i))
+    per_record = (time.perf_counter() - start) / 1000
+
+    assert per_record < 0.001
+    assert writer.stats()["queue_depth"] > 0
+    writer.stop()
+    assert len(database.load_progress()) == 1000
+
+def test_flushes_in_batches_by_size():
+    writer = ProgressWriter(batch_size=10, flush_interval=60)
+    for i in range(25):
+        writer.submit(record(i))
+
+    writer.stop()
+
+    stats = writer.stats()
+    assert stats["written"] == 25
+    assert stats["batches"] == 3
+    assert stats["queue_depth"] == 0
+    assert [r["input"] for r in database.load_progress()] == [f"input {i}" for i in range(25)]
+
+def test_flushes_on_time_threshold():
+    writer = ProgressWriter(batch_size=1000, flush_interval=0.05)
+    writer.submit(record(0))
+
+    time.sleep(0.5)
+
+    assert writer.stats()["written"] == 1
+    assert writer.stats()["last_flush_ms"] > 0
+    writer.stop()
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    writer = ProgressWriter(batch_size=1, max_queue=1)
+    release = threading.Event()
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda batch: (release.wait(5), write(batch)))
+
+    results = [writer.submit(record(i)) for i in range(50)]
+
+    assert False in results
+    assert writer.stats()["dropped"] == results.count(False)
+    release.set()
+    writer.stop()
+    assert len(database.load_progress()) == results.count(True)
@@ -0,0 +1,52 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from prompts.assembly import EVALUATION, CompiledPrompt, get_prompt
+
+
+def test_role_prompt_is_a_fixed_system_prefix():
+    first = get_prompt("storytelling").messages("Once upon a time.")
+    second = get_prompt("storytelling").messages("It was a dark night.")
+
+    assert first[0] is second[0]
+    assert first[0]["role"] == "system" and first[0]["content"].startswith("You are a master storytelling coach")
+    assert first[1] == {"role": "user", "content": "Once upon a time."}
+
+def test_unknown_role_falls_back_to_speech_coach():
+    assert get_prompt("no_such_role") is get_prompt("speech_coach")
+
+def test_version_follows_template_content():
+    assert CompiledPrompt("a", "  Be brief.\n").version == CompiledPrompt("b", "Be brief.").version
+    assert CompiledPrompt("a", "Be brief.").version != CompiledPrompt("a", "Be thorough.").version
+
+def test_requests_send_instructions_as_system_message_and_count_cached_tokens(fake_provider, monkeypatch):
+    handler = fake_provider.handler
+    bodies = []
+
+    async def with_usage(request):
+        bodies.append(json.loads(request.content))
+        response = await handler(request)
+        payload = json.loads(response.content)
+        payload["usage"] = {"prompt_tokens": 1200, "completion_tokens": 10, "total_tokens": 1210,
+                            "prompt_tokens_details": {"cached_tokens": 1024}}
+        return httpx.Response(200, json=payload)
+
+    fake_provider.handler = with_usage
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    client = TestClient(main.app)
+    before = client.get("/stats/").json()["prompt_cache"].get("impromptu", {"calls": 0, "cached_tokens": 0})
+
+    client.post("/train/", json={"user_input": "My hometown.", "module": "impromptu"})
+    client.post("/assess/text/", data={"text": "Our quarterly results."})
+
+    assert [m["role"] for m in bodies[0]["messages"]] == ["system", "user"]
+    assert bodies[0]["messages"][1]["content"] == "My hometown."
+    assert bodies[1]["messages"][0] == {"role": "system", "content": EVALUATION.system}
+    assert "Our quarterly results." in bodies[1]["messages"][1]["content"]
+    after = client.get("/stats/").json()["prompt_cache"]
+    assert after["impromptu"]["calls"] - before["calls"] == 1
+    assert after["impromptu"]["cached_tokens"] - before["cached_tokens"] == 1024
+    assert after["evaluation"]["cached_ratio"] > 0.8
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.providers import ClientRegistry, provider_for_model
+
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def make_registry(base_url="http://localhost/v1"):
+    return ClientRegistry({
+        "openai": {"base_url": base_url, "api_key": "test-key"},
+        "xai": {"base_url": "https://api.x.ai/v1", "api_key": "xai-key"},
+    })
+
+
+def test_registry_reuses_clients_per_provider():
+    registry = make_registry()
+
+    assert registry.get("openai") is registry.get("openai")
+    assert registry.get("openai") is not registry.get("xai")
+    assert str(registry.get("xai").base_url).startswith("https://api.x.ai/v1")
+    # Different keys for one provider still share its connection pool.
+    assert registry.get("openai", "other-key")._client is registry.get("openai")._client
+
+def test_registry_rejects_unknown_provider():
+    with pytest.raises(ValueError):
+        make_registry().get("unknown")
+
+def test_provider_for_model():
+    assert provider_for_model("grok-2-latest") == "xai"
+    assert provider_for_model("gpt-4o-mini") == "openai"
+
+def test_connections_are_reused_under_steady_traffic(local_server):
+    registry = make_registry(local_server)
+
+    async def send_requests(count):
+        client = registry.get("openai")
+        for _ in range(count):
+            await client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+        stats = registry.stats()["openai"]
+        await registry.aclose()
+        return stats
+
+    stats = asyncio.run(send_requests(20))
+
+    assert stats["requests"] == 20
+    assert stats["connections_opened"] == 1
+    assert stats["reused_connections"] == 19
@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from main import app
+from utils import providers
+from utils.rate_limiter import (
+    RateLimiter, RateLimitQueueFull, backoff_delay, estimate_tokens, parse_duration, retry_after_seconds
+)
+from conftest import FakeProvider
+
+
+class QuotaProvider(FakeProvider):
+    """A fake provider that enforces a request quota the way a hosted API does."""
+
+    def __init__(self, limit: int, period: float = 1.0, latency: float = 0.02):
+        super().__init__(latency=latency)
+        self.limit = limit
+        self.rate = limit / period
+        self.level = float(limit)
+        self.updated = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+
+    def headers(self):
+        return {
+            "x-ratelimit-limit-requests": str(self.limit),
+            "x-ratelimit-remaining-requests": str(int(self.level)),
+            "x-ratelimit-limit-tokens": "1000000",
+            "x-ratelimit-remaining-tokens": "1000000",
+        }
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.level < 0.999:
+            self.rejected += 1
+            wait_ms = (1 - self.level) / self.rate * 1000
+            return httpx.Response(429, headers=dict(self.headers(), **{"retry-after-ms": f"{wait_ms:.0f}"}),
+                                  json={"error": {"message": "Rate limit reached", "type": "requests"}})
+        self.level -= 1
+        self.accepted += 1
+        response = await super().handler(request)
+        response.headers.update(self.headers())
+        return response
+
+
+def burst(path_payloads):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.post(path, json=payload) for path, payload in path_payloads))
+            return responses, time.perf_counter() - start
+    return asyncio.run(scenario())
+
+def chats(count):
+    return [("/chat/", {"message": f"Question {i}", "role": "speech_coach", "no_cache": True}) for i in range(count)]
+
+@pytest.fixture
+def quota_provider(fake_provider, monkeypatch):
+    provider = QuotaProvider(limit=10)
+    monkeypatch.setattr(providers, "registry", provider.registry())
+    return provider
+
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("soon") is None
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+
+def test_backoff_is_jittered_and_honours_retry_after():
+    delays = [backoff_delay(3, 1.0) for _ in range(200)]
+
+    assert all(0 <= d <= 4 for d in delays)
+    assert len({round(d, 3) for d in delays}) > 100
+    assert all(2.0 <= backoff_delay(1, 0.5, retry_after=2.0) <= 2.5 for _ in range(20))
+
+def test_token_budget_delays_large_requests():
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=1000, period=1.0, headroom=1.0)
+
+    async def scenario():
+        start = time.perf_counter()
+        await limiter.acquire("openai", "m", 800)
+        await limiter.acquire("openai", "m", 800)  # Needs 600 more tokens at 1000/s
+        return time.perf_counter() - start
+
+    assert 0.5 <= asyncio.run(scenario()) < 1.0
+    assert estimate_tokens([{"content": "x" * 400}], max_tokens=50) == 150
+
+def test_headers_update_the_budget():
+    limiter = RateLimiter(requests_per_minute=500, max_waiters=0, headroom=1.0)
+    limiter.observe("openai", "m", {"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0"})
+
+    assert limiter.stats()["openai/m"]["requests_per_minute"] == 60
+    with pytest.raises(RateLimitQueueFull):
+        asyncio.run(limiter.acquire("openai", "m"))
+
+def test_full_queue_is_refused_immediately():
+    limiter = RateLimiter(requests_per_minute=1, period=1.0, max_waiters=0, headroom=1.0)
+
+    async def scenario():
+        await limiter.acquire("openai", "m")
+        start = time.perf_counter()
+        with pytest.raises(RateLimitQueueFull) as error:
+            await limiter.acquire("openai", "m")
+        return error.value.retry_after, time.perf_counter() - start
+
+    retry_after, elapsed = asyncio.run(scenario())
+    assert 0.9 <= retry_after <= 1.0
+    assert elapsed < 0.05
+
+def test_simulated_burst_stays_within_provider_quota(quota_provider, monkeypatch):
+    monkeypatch.setattr(providers, "rate_limiter", RateLimiter(requests_per_minute=10, period=1.0))
+
+    responses, elapsed = burst(chats(25))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert quota_provider.rejected == 0
+    assert quota_provider.accepted == 25
+    assert elapsed >= 1.3  # 10 at once, then 10 per second
+
+def test_without_the_limiter_the_same_burst_hits_the_quota(quota_provider, monkeypatch):
+    monkeypatch.setattr(providers, "rate_limiter", RateLimiter(enabled=False))
+
+    responses, _ = burst(chats(25))
+
+    assert all(response.status_code == 200 for response in responses)  # Eventually, after retries
+    assert quota_provider.rejected > 0
+
+def test_overloaded_queue_returns_503_with_retry_after(quota_provider, monkeypatch):
+    monkeypatch.setattr(providers, "rate_limiter", RateLimiter(requests_per_minute=2, period=1.0, max_waiters=2, headroom=1.0))
+
+    responses, elapsed = burst(chats(8))
+
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] * 4 + [503] * 4
+    refused = [response for response in responses if response.status_code == 503]
+    assert all(int(response.headers["retry-after"]) >= 1 for response in refused)
+    assert quota_provider.rejected == 0
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from utils.errors import UNEXPECTED_ERROR
+from utils.response_cache import DiskTier, MemoryTier, ResponseCache
+
+
+def train(client, text, **extra):
+    return client.post("/train/", json={"user_input": text, "module": "impromptu", "model": "openai", **extra})
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(tiers=[MemoryTier(max_entries=2)])
+    cache.set("a", "first")
+    cache.set("b", "second")
+    cache.get("a")
+    cache.set("c", "third")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "first" and cache.get("c") == "third"
+    assert cache.stats()["evictions"]["memory"] == 1
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.response_cache.time.time", lambda: now[0])
+    cache = ResponseCache(tiers=[MemoryTier()], ttl=60)
+    cache.set("a", "feedback")
+
+    now[0] += 59
+    assert cache.get("a") == "feedback"
+    now[0] += 2
+    assert cache.get("a") is None
+
+def test_disk_tier_survives_restart_and_promotes_to_memory(tmp_path):
+    ResponseCache(tiers=[MemoryTier(), DiskTier(str(tmp_path))]).set("a", {"full_report": "Good."})
+
+    memory = MemoryTier()
+    cache = ResponseCache(tiers=[memory, DiskTier(str(tmp_path))])
+
+    assert cache.get("a") == {"full_report": "Good."}
+    assert len(memory) == 1
+    assert cache.stats()["tier_hits"] == {"memory": 0, "disk": 1}
+
+def test_async_access_uses_the_disk_tier_from_a_worker_thread(tmp_path):
+    threads = []
+
+    class RecordingDiskTier(DiskTier):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+        def set(self, key, value, expires_at):
+            threads.append(threading.current_thread())
+            super().set(key, value, expires_at)
+
+    async def run():
+        writer = ResponseCache(tiers=[MemoryTier(), RecordingDiskTier(str(tmp_path))])
+        await writer.aset("a", "feedback")
+        reader = ResponseCache(tiers=[MemoryTier(), RecordingDiskTier(str(tmp_path))])
+        first = await reader.aget("a")
+        second = await reader.aget("a")  # Now answered by the memory tier
+        return first, second, reader.stats()["tier_hits"]
+
+    first, second, tier_hits = asyncio.run(run())
+    assert first == second == "feedback"
+    assert tier_hits == {"memory": 1, "disk": 1}
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+def test_disk_tier_stays_within_byte_budget(tmp_path):
+    disk = DiskTier(str(tmp_path), max_bytes=1000)
+    cache = ResponseCache(tiers=[disk])
+    for i in range(20):
+        cache.set(f"key{i}", "x" * 100)
+
+    assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 1000
+    assert cache.get("key19") is not None and cache.get("key0") is None
+    assert disk.evictions > 0
+
+def test_error_strings_are_never_cached():
+    cache = ResponseCache(tiers=[MemoryTier()])
+    cache.set("a", UNEXPECTED_ERROR)
+    cache.set("b", {})
+    cache.set("c", "   ")
+    cache.set("d", 'Say "Could not transcribe audio" politely, and never "An unexpected error occurred".')
+
+    assert cache.get("a") is None and cache.get("b") is None and cache.get("c") is None
+    assert cache.get("d") is not None
+    assert cache.stats()["rejected"] == 3
+
+def test_keys_ignore_case_and_whitespace_but_not_model_or_version():
+    key = ResponseCache.key("response", "gpt", "v1", "Tell me  a story")
+
+    assert key == ResponseCache.key("response", "gpt", "v1", "  tell me a STORY\n")
+    assert key != ResponseCache.key("response", "grok", "v1", "Tell me a story")
+    assert key != ResponseCache.key("response", "gpt", "v2", "Tell me a story")
+
+def test_repeated_exercise_is_served_from_cache(fake_provider):
+    client = TestClient(main.app)
+    before = client.get("/stats/").json()["response_cache"]
+
+    first = train(client, "My favourite place is the library.")
+    second = train(client, "my favourite place is  the library.")
+
+    assert first.json()["feedback"] == second.json()["feedback"] == "Fake feedback."
+    assert fake_provider.calls == 1
+    after = client.get("/stats/").json()["response_cache"]
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1)
+
+def test_no_cache_flag_bypasses_lookup(fake_provider):
+    client = TestClient(main.app)
+
+    train(client, "Same text.")
+    train(client, "Same text.", no_cache=True)
+
+    assert fake_provider.calls == 2
+
+def test_streamed_response_replays_cached_text(fake_provider):
+    client = TestClient(main.app)
+    train(client, "Same text.")
+
+    response = client.post("/train/stream/", json={"user_input": "Same text.", "module": "impromptu"})
+
+    assert 'data: {"delta": "Fake feedback."}' in response.text
+    assert fake_provider.calls == 1
+
+def test_failed_response_is_not_cached(fake_provider, monkeypatch):
+    handler = fake_provider.handler
+    failures = [1]
+
+    async def failing_once(request):
+        if failures:
+            failures.pop()
+            return httpx.Response(400, json={"error": {"message": "Bad request", "type": "invalid_request_error"}})
+        return await handler(request)
+
+    fake_provider.handler = failing_once
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    client = TestClient(main.app)
+
+    assert "error" in train(client, "Same text.").json()["feedback"]
+    assert train(client, "Same text.").json()["feedback"] == "Fake feedback."
+
+def test_repeated_presentation_text_is_served_from_cache(fake_provider):
+    client = TestClient(main.app)
+
+    client.post("/assess/text/", data={"text": "This is a test presentation."})
+    response = client.post("/assess/text/", data={"text": "This is a test presentation."})
+
+    assert response.json()["feedback"] == {"full_report": "Fake feedback."}
+    assert fake_provider.calls == 1
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.router import Router, router
+
+
+class Backends:
+    """Stand-in backends with a fixed latency per model, optionally failing."""
+
+    def __init__(self, latencies: dict, failing=()):
+        self.latencies = dict(latencies)
+        self.failing = set(failing)
+        self.started = []
+        self.finished = []
+
+    async def __call__(self, model):
+        self.started.append(model)
+        await asyncio.sleep(self.latencies[model])
+        if model in self.failing:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://fake"))
+        self.finished.append(model)
+        return model
+
+
+def make_router(**kwargs):
+    kwargs.setdefault("hedge", False)
+    return Router(["slow", "fast"], min_samples=3, **kwargs)
+
+def warm_up(router, backends, calls=6):
+    async def scenario():
+        for _ in range(calls):
+            await router.call(backends)
+    asyncio.run(scenario())
+
+
+def test_unknown_backends_are_sampled_then_fastest_is_preferred():
+    router = make_router()
+    backends = Backends({"slow": 0.05, "fast": 0.01})
+    warm_up(router, backends)
+
+    assert {"slow", "fast"} <= set(backends.started)
+    assert router.ranked() == ["fast", "slow"]
+    assert backends.started[-1] == "fast"
+
+def test_failed_backend_fails_over_and_is_then_avoided():
+    router = make_router(cooldown=60)
+    backends = Backends({"slow": 0.01, "fast": 0.01}, failing={"slow"})
+
+    async def scenario():
+        return [await router.call(backends) for _ in range(4)]
+
+    assert asyncio.run(scenario()) == ["fast"] * 4
+    assert not router.stats()["slow"]["healthy"]
+    assert router.ranked() == ["fast"]
+
+def test_bad_requests_are_not_retried_elsewhere():
+    router = make_router()
+    calls = []
+
+    async def invalid(model):
+        calls.append(model)
+        raise openai.BadRequestError("Bad request", response=httpx.Response(400, request=httpx.Request("POST", "http://fake")), body=None)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(router.call(invalid))
+    assert len(calls) == 1
+    assert router.stats()[calls[0]]["error_rate"] == 0
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    router = make_router(hedge=True, hedge_min_delay=0.01)
+    backends = Backends({"slow": 0.02, "fast": 0.02})
+    warm_up(router, backends)  # Both answer in ~20 ms, so the hedge delay is ~20 ms
+    primary = router.ranked()[0]
+    other = "fast" if primary == "slow" else "slow"
+    backends.latencies[primary] = 0.5  # The primary stalls
+
+    start = time.perf_counter()
+    result = asyncio.run(router.call(backends))
+    elapsed = time.perf_counter() - start
+
+    assert result == other
+    assert elapsed < 0.2
+    assert router.stats()[primary]["cancelled"] == 1
+    assert router.stats()[other]["hedges"] == 1
+
+def test_all_backends_failing_raises_the_error():
+    router = make_router()
+    backends = Backends({"slow": 0.01, "fast": 0.01}, failing={"slow", "fast"})
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(router.call(backends))
+    assert sorted(backends.started) == ["fast", "slow"]
+
+def test_auto_model_routes_chat_through_both_providers(fake_provider):
+    client = TestClient(main.app)
+
+    for i in range(3):
+        response = client.post("/chat/", json={"message": f"Question {i}", "role": "speech_coach", "model": "auto"})
+        assert response.status_code == 200
+        assert response.json()["response"] == "Fake feedback."
+
+    streamed = client.post("/train/stream/", json={"user_input": "A story.", "module": "storytelling", "model": "auto"})
+    assert "event: done" in streamed.text
+    stats = client.get("/stats/").json()["router"]
+    assert sum(backend["wins"] for backend in stats.values()) == 4
+    assert set(stats) == set(router.models)
@@ -0,0 +1,91 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.sessions import SessionStore
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.sessions.time.monotonic", lambda: now[0])
+    store = SessionStore(idle_ttl=60)
+    session = store.create("job_interviewer", "openai")
+
+    now[0] += 59
+    assert store.get(session.id) is session
+    now[0] += 61
+    assert store.get(session.id) is None
+    assert store.stats()["expired"] == 1
+
+def test_least_recently_used_sessions_are_evicted_over_memory_budget():
+    store = SessionStore(max_bytes=5000)
+    first = store.create("debate_partner", "openai")
+    second = store.create("debate_partner", "openai")
+
+    store.add_turn(store.get(first.id), "x" * 1500, "y" * 1500)
+    store.add_turn(store.get(second.id), "x" * 1500, "y" * 1500)
+
+    assert store.get(first.id) is None and store.get(second.id) is second
+    assert store.stats()["evicted"] == 1
+    assert store.stats()["bytes"] <= 5000
+
+def test_folding_replaces_old_turns_with_the_summary():
+    store = SessionStore()
+    session = store.create("job_interviewer", "openai")
+    for i in range(8):
+        store.add_turn(session, f"answer {i}", f"question {i}")
+
+    older = session.turns_to_fold(recent=4, batch=4)
+    store.fold(session, "The candidate has answered eight questions.", len(older))
+
+    assert len(older) == 4
+    assert session.turns[0] == ("answer 4", "question 4")
+    assert session.history()[0]["content"].endswith("eight questions.")
+    assert session.total_turns == 8
+
+def test_interview_keeps_context_while_prompt_stays_bounded(fake_provider, monkeypatch):
+    handler = fake_provider.handler
+    bodies = []
+
+    async def capture(request):
+        bodies.append(json.loads(request.content))
+        return await handler(request)
+
+    fake_provider.handler = capture
+    fake_provider.latency = 0
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    client = TestClient(main.app)
+
+    session_id = client.post("/sessions/", json={"role": "job_interviewer"}).json()["session_id"]
+    for i in range(16):
+        response = client.post(f"/sessions/{session_id}/messages", json={"message": "I led the migration."})
+        assert response.status_code == 200
+        assert response.json()["turn"] == i + 1
+
+    replies = [body for body in bodies if body["messages"][0]["content"].startswith("You are a highly experienced job interviewer")]
+    summaries = [body for body in bodies if body not in replies]
+    assert len(replies) == 16  # Identical messages are not answered from the cache
+    assert replies[1]["messages"][1:] == [
+        {"role": "user", "content": "I led the migration."},
+        {"role": "assistant", "content": "Fake feedback."},
+        {"role": "user", "content": "I led the migration."},
+    ]
+    assert max(len(body["messages"]) for body in replies) <= 2 + 2 * 7 + 1
+    assert len(summaries) == 2  # Before the 9th and 13th messages
+    assert replies[-1]["messages"][1]["content"].startswith("Summary of the earlier conversation")
+
+    session = client.get(f"/sessions/{session_id}").json()
+    assert session["total_turns"] == 16 and session["summary"] == "Fake feedback."
+    assert len(session["recent_turns"]) <= 8
+
+def test_unknown_and_deleted_sessions(fake_provider):
+    client = TestClient(main.app)
+
+    assert client.post("/sessions/", json={"role": "debate_partner", "model": "nope"}).status_code == 400
+    assert client.post(f"/sessions/{'0' * 32}/messages", json={"message": "Hi"}).status_code == 404
+    assert client.get("/sessions/not-an-id").status_code == 400
+
+    session_id = client.post("/sessions/", json={"role": "debate_partner"}).json()["session_id"]
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.get(f"/sessions/{session_id}").status_code == 404
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from main import app
+from utils.single_flight import SingleFlight
+from utils.tts_cache import TTSCache
+
+
+class SlowUpstream:
+    def __init__(self, result="done", error=None, latency=0.05):
+        self.result = result
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test-share")
+    upstream = SlowUpstream()
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("key", upstream) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["done"] * 10
+    assert upstream.calls == 1
+    assert flight.stats() == {"originated": 1, "coalesced": 9, "in_flight": 0}
+
+def test_every_caller_receives_the_error():
+    flight = SingleFlight("test-error")
+    upstream = SlowUpstream(error=ValueError("upstream failed"))
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("key", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert upstream.calls == 1
+
+def test_different_keys_and_later_calls_are_not_merged():
+    flight = SingleFlight("test-keys")
+    upstream = SlowUpstream()
+
+    async def scenario():
+        await asyncio.gather(flight.run("a", upstream), flight.run("b", upstream))
+        await flight.run("a", upstream)
+
+    asyncio.run(scenario())
+    assert upstream.calls == 3
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test-cancel")
+    upstream = SlowUpstream(latency=0.1)
+
+    async def scenario():
+        first = asyncio.create_task(flight.run("key", upstream))
+        second = asyncio.create_task(flight.run("key", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+def test_blocking_callers_in_threads_share_one_call():
+    flight = SingleFlight("test-threads")
+    calls = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.1)
+        return "audio.mp3"
+
+    def worker():
+        barrier.wait()
+        results.append(flight.call("key", upstream))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["audio.mp3"] * 8
+    assert len(calls) == 1
+
+def test_concurrent_identical_speech_is_synthesized_once(tmp_path):
+    calls = []
+
+    def synthesize(text, path, **kwargs):
+        calls.append(text)
+        time.sleep(0.1)
+        with open(path, "wb") as f:
+            f.write(b"mp3")
+
+    cache = TTSCache(str(tmp_path), synthesize=synthesize)
+    barrier = threading.Barrier(6)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(cache.get_or_create("Well done."))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1
+    assert calls == ["Well done."]
+
+@pytest.mark.parametrize("path, payload", [
+    ("/train/", {"json": {"user_input": "Describe your hometown.", "module": "impromptu"}}),
+    ("/assess/text/", {"data": {"text": "Our quarterly results."}}),
+])
+def test_classroom_burst_reaches_the_provider_once(fake_provider, path, payload):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            return await asyncio.gather(*(client.post(path, **payload) for _ in range(10)))
+
+    responses = asyncio.run(scenario())
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+    assert fake_provider.calls == 1
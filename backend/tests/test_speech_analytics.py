@@ -0,0 +1,96 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.speech_analytics import analyze_delivery, analyze_text, filler_counts, normalize_tokens
+from conftest import SAMPLE_WAV
+
+
+def timed_words(text, spacing=0.5, length=0.3, gaps=None):
+    words, t = [], 0.0
+    for i, word in enumerate(text.split()):
+        t += (gaps or {}).get(i, 0.0)
+        words.append({"word": word, "start": t, "end": t + length})
+        t += spacing
+    return words
+
+
+def test_filler_words_include_multi_word_phrases():
+    tokens = normalize_tokens("Um, I mean, it's like, you know, basically fine. You know?".split())
+
+    counts = filler_counts(tokens, ["um", "like", "you know", "i mean", "basically", "uh"])
+
+    assert counts == {"um": 1, "like": 1, "you know": 2, "i mean": 1, "basically": 1, "uh": 0}
+
+def test_pacing_and_pauses():
+    # 120 words, one every 0.5s => 120 wpm, with a 2s pause before word 60
+    words = timed_words(" ".join(["word"] * 120), gaps={60: 2.0})
+
+    metrics = analyze_delivery(words)
+
+    assert metrics["word_count"] == 120
+    assert 110 < metrics["pacing"]["wpm"] < 120
+    assert metrics["pacing"]["wpm_windows"][0] == {"start": 0.0, "wpm": 120.0}
+    assert metrics["pacing"]["wpm_min"] < metrics["pacing"]["wpm_max"]
+    # Regular 0.2s gaps are below the pause threshold
+    assert metrics["pauses"]["count"] == 1
+    assert metrics["pauses"]["buckets"] == {"short": 0, "medium": 0, "long": 1}
+    assert metrics["pauses"]["max"] == 2.2
+
+def test_repetition_and_lexical_diversity():
+    metrics = analyze_text("I I think the plan is the plan")
+
+    assert metrics["repetition"] == {"immediate_repeats": 1, "repeated_bigrams": 1}
+    assert metrics["lexical_diversity"]["unique_words"] == 5
+    assert metrics["lexical_diversity"]["type_token_ratio"] == round(5 / 8, 4)
+
+def test_mattr_uses_sliding_windows():
+    varied = " ".join(f"w{i}" for i in range(200))
+    repetitive = " ".join(["same", "words"] * 100)
+
+    assert analyze_text(varied)["lexical_diversity"]["mattr"] == 1.0
+    assert analyze_text(repetitive)["lexical_diversity"]["mattr"] == 2 / 50
+
+def test_empty_transcript():
+    metrics = analyze_delivery([])
+
+    assert metrics["word_count"] == 0
+    assert metrics["pacing"]["wpm"] == 0.0
+    assert metrics["pauses"]["count"] == 0
+
+def test_metrics_only_mode_makes_no_completion(fake_provider):
+    client = TestClient(main.app)
+
+    response = client.post("/assess/voice/?mode=metrics", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["transcript"] == "This is a fake transcript."
+    assert body["metrics"]["word_count"] == 5
+    assert body["metrics"]["pacing"]["wpm"] == 120.0
+    assert fake_provider.calls == 1  # Transcription only
+
+def test_metrics_feed_the_evaluation(fake_provider, monkeypatch):
+    prompts = []
+    handler = fake_provider.handler
+
+    async def recording_handler(request):
+        if request.url.path.endswith("/chat/completions"):
+            prompts.append(json.loads(request.content)["messages"][-1]["content"])
+        return await handler(request)
+
+    fake_provider.handler = recording_handler
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    client = TestClient(main.app)
+
+    response = client.post("/assess/voice/", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 200
+    assert response.json()["metrics"]["word_count"] == 5
+    assert '"wpm": 120.0' in prompts[0]
+
+def test_invalid_mode():
+    response = TestClient(main.app).post("/voice/?mode=loud", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from utils import database
+from utils.progress_writer import writer
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event = {"event": "message"}
+        for line in block.splitlines():
+            field, _, value = line.partition(": ")
+            event[field] = value
+        event["data"] = json.loads(event["data"])
+        events.append(event)
+    return events
+
+
+def test_chat_stream_relays_tokens_and_saves_progress(fake_provider):
+    client = TestClient(main.app)
+
+    response = client.post("/chat/stream/", json={"message": "Hello", "role": "speech_coach", "model": "openai"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [e["data"]["delta"] for e in events if e["event"] == "message"] == ["Fake", " feed", "back."]
+    assert events[-1]["event"] == "done"
+
+    writer.flush()
+    records = database.load_progress()
+    assert records[-1]["module"] == "speech_coach"
+    assert records[-1]["input"] == "Hello"
+    assert records[-1]["feedback"] == "Fake feedback."
+
+def test_train_stream(fake_provider):
+    client = TestClient(main.app)
+
+    response = client.post("/train/stream/", json={"user_input": "Once upon a time...", "module": "storytelling", "model": "xai"})
+
+    assert response.status_code == 200
+    deltas = [e["data"]["delta"] for e in parse_sse(response.text) if e["event"] == "message"]
+    assert "".join(deltas) == "Fake feedback."
+
+def test_stream_validation_errors_are_plain_http_errors():
+    client = TestClient(main.app)
+
+    response = client.post("/chat/stream/", json={"message": "Hello", "role": "speech_coach", "model": "invalid"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid model selected."
+
+    response = client.post("/train/stream/", json={"user_input": "Test", "module": "invalid", "model": "openai"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid training module."
+
+def test_stream_rate_limit_is_retried_before_streaming(fake_provider, monkeypatch):
+    fake_provider.rate_limited.add("slow down")
+    client = TestClient(main.app)
+
+    response = client.post("/chat/stream/", json={"message": "slow down", "role": "speech_coach", "model": "openai"})
+
+    assert response.status_code == 200
+    assert parse_sse(response.text)[-1]["event"] == "done"
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils import helper_functions, model_generation, token_budget
+from utils.token_budget import InputTooLong, TokenBudget, condense, count_tokens, truncate
+
+SPEECH = " ".join(f"Sentence number {i} talks about the quarterly budget forecast." for i in range(400))
+
+
+def test_truncation_keeps_head_and_tail_within_limit():
+    text = "Opening line. " + "filler " * 2000 + "Closing line."
+
+    result = truncate(text, 100, "gpt-4o-mini")
+
+    assert count_tokens(result, "gpt-4o-mini") <= 100
+    assert result.startswith("Opening line.") and result.endswith("Closing line.")
+    assert "[...]" in result
+
+def test_condensation_keeps_first_and_last_sentences_in_order():
+    text = "We open with a story. " + "The budget forecast matters. Weather is nice. " * 50 + "We close with thanks."
+
+    result = condense(text, 60, "gpt-4o-mini")
+
+    assert count_tokens(result, "gpt-4o-mini") <= 60
+    assert result.startswith("We open with a story.") and result.endswith("We close with thanks.")
+    assert "budget forecast" in result
+
+def test_input_limit_follows_context_window_and_completion_allowance():
+    budget = TokenBudget("reject", input_limit=10 ** 6)
+
+    with pytest.raises(InputTooLong) as error:
+        budget.fit(SPEECH * 3, "Be helpful.", "gpt-4", "impromptu")
+    assert error.value.limit < 8192 - 800
+    budget.fit(SPEECH * 3, "Be helpful.", "gpt-4o-mini", "impromptu")
+
+def test_unavailable_tokenizer_falls_back_to_the_estimate(monkeypatch):
+    loads = []
+
+    class Offline:
+        @staticmethod
+        def encoding_for_model(model_name):
+            loads.append(model_name)
+            raise OSError("Could not download the BPE file")
+
+    monkeypatch.setattr(token_budget, "tiktoken", Offline)
+    token_budget._encoding.cache_clear()
+    try:
+        assert count_tokens("x" * 40, "offline-model") == 10
+        assert count_tokens("x" * 8, "offline-model") == 2
+    finally:
+        token_budget._encoding.cache_clear()
+    assert loads == ["offline-model"]  # Not retried per request
+
+def test_metrics_count_against_the_evaluation_budget(monkeypatch):
+    budget = TokenBudget("reject", input_limit=300)
+    monkeypatch.setattr(helper_functions, "token_budget", budget)
+    text = SPEECH[:900]
+
+    helper_functions.evaluation_messages(text, "text", None)
+    with pytest.raises(InputTooLong):
+        helper_functions.evaluation_messages(text, "voice", {"pauses": list(range(200))})
+
+def test_unknown_strategy_is_refused():
+    with pytest.raises(ValueError):
+        TokenBudget("summarize")
+
+def test_oversized_input_is_rejected_before_any_provider_call(fake_provider, monkeypatch):
+    monkeypatch.setattr(model_generation, "token_budget", TokenBudget("reject", input_limit=200))
+    monkeypatch.setattr(helper_functions, "token_budget", TokenBudget("reject", input_limit=200))
+    client = TestClient(main.app)
+
+    train = client.post("/train/", json={"user_input": SPEECH, "module": "impromptu"})
+    stream = client.post("/chat/stream/", json={"message": SPEECH, "role": "speech_coach"})
+    assess = client.post("/assess/text/", data={"text": SPEECH})
+
+    assert train.status_code == stream.status_code == assess.status_code == 413
+    assert "limit is" in train.json()["detail"]
+    assert fake_provider.calls == 0
+
+def test_truncated_input_and_role_max_tokens_reach_the_provider(fake_provider, monkeypatch):
+    handler = fake_provider.handler
+    bodies = []
+
+    async def capture(request):
+        bodies.append(json.loads(request.content))
+        return await handler(request)
+
+    fake_provider.handler = capture
+    monkeypatch.setattr("utils.providers.registry", fake_provider.registry())
+    monkeypatch.setattr(model_generation, "token_budget", TokenBudget("truncate", input_limit=200))
+    client = TestClient(main.app)
+
+    response = client.post("/train/", json={"user_input": SPEECH, "module": "storytelling"})
+
+    assert response.status_code == 200
+    sent = bodies[0]["messages"][-1]["content"]
+    assert count_tokens(sent, "gpt-4o-mini") <= 200 and "[...]" in sent
+    assert bodies[0]["max_tokens"] == 800
@@ -0,0 +1,217 @@
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from utils.transcription import TranscriptionFailed, split_wav, transcribe_in_segments
+
+RATE = 8000
+
+
+def make_wav(pattern, channels=1):
+    """Build a WAV from (seconds, loud) pairs: loud sections are a tone, quiet ones silence."""
+    parts = []
+    for seconds, loud in pattern:
+        t = np.arange(int(seconds * RATE)) / RATE
+        parts.append((np.sin(2 * np.pi * 220 * t) * 8000 if loud else np.zeros_like(t)).astype(np.int16))
+    samples = np.repeat(np.concatenate(parts)[:, None], channels, axis=1)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.tobytes())
+    return out.getvalue()
+
+def wav_seconds(audio):
+    with wave.open(io.BytesIO(audio) if isinstance(audio, bytes) else audio, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+class StubTranscriber:
+    """Reports each segment's length as one word; can fail a segment once."""
+
+    def __init__(self, fail_once_at=None, latency=0.0):
+        self.fail_once_at = fail_once_at
+        self.latency = latency
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, audio, filename):
+        seconds = wav_seconds(audio)
+        call_index = len(self.calls)
+        self.calls.append(round(seconds, 2))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            if call_index == self.fail_once_at:
+                raise RuntimeError("segment upload failed")
+            return {"text": f"segment of {seconds:.1f}s", "words": [{"word": "w", "start": 0.5, "end": 0.9}], "duration": seconds}
+        finally:
+            self.active -= 1
+
+
+def test_splits_at_silence_within_limit():
+    # Speech 0-8s, silence 8-9s, speech 9-17s, silence 17-18s, speech 18-24s
+    audio = make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)], channels=2)
+
+    segments = split_wav(audio, max_segment_seconds=10, search_seconds=4)
+
+    offsets = [offset for offset, _ in segments]
+    assert len(segments) == 3
+    assert 8.0 <= offsets[1] <= 9.0
+    assert 17.0 <= offsets[2] <= 18.0
+    assert all(wav_seconds(data) <= 10 for _, data in segments)
+    assert abs(sum(wav_seconds(data) for _, data in segments) - 24) < 0.01
+
+def test_short_and_non_wav_audio_is_one_segment():
+    assert split_wav(make_wav([(3, True)]), max_segment_seconds=10) == [(0.0, make_wav([(3, True)]))]
+    assert split_wav(b"ID3 not a wav", max_segment_seconds=10) == [(0.0, b"ID3 not a wav")]
+
+def test_stitches_text_and_timestamps_in_order():
+    audio = make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)])
+    transcriber = StubTranscriber()
+
+    result = asyncio.run(transcribe_in_segments(audio, transcriber, max_segment_seconds=10))
+
+    assert result["text"].count("segment of") == 3
+    starts = [w["start"] for w in result["words"]]
+    assert starts == sorted(starts)
+    assert starts[0] == 0.5 and 8.5 <= starts[1] <= 9.5
+    assert abs(result["duration"] - 24) < 0.01
+
+def test_failed_segment_is_retried_alone():
+    audio = make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)])
+    transcriber = StubTranscriber(fail_once_at=1)
+
+    result = asyncio.run(transcribe_in_segments(audio, transcriber, max_segment_seconds=10))
+
+    assert len(transcriber.calls) == 4  # three segments plus one retry
+    assert result["text"].count("segment of") == 3
+
+def test_concurrency_is_capped():
+    audio = make_wav([(4, True), (1, False)] * 12)
+    transcriber = StubTranscriber(latency=0.05)
+
+    asyncio.run(transcribe_in_segments(audio, transcriber, max_segment_seconds=6, max_concurrency=3))
+
+    assert len(transcriber.calls) >= 8
+    assert transcriber.max_active == 3
+
+def test_short_file_is_passed_through_without_copying():
+    audio_file = io.BytesIO(b"ID3 an mp3 upload")
+    received = []
+
+    async def transcriber(audio, filename):
+        received.append((audio, filename))
+        return {"text": "hello", "words": [], "duration": 1.0}
+
+    result = asyncio.run(transcribe_in_segments(audio_file, transcriber, filename="audio.mp3"))
+
+    assert received == [(audio_file, "audio.mp3")]
+    assert result["text"] == "hello"
+
+def test_segments_are_read_from_a_file_object():
+    audio_file = io.BytesIO(make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)]))
+    transcriber = StubTranscriber()
+
+    result = asyncio.run(transcribe_in_segments(audio_file, transcriber, max_segment_seconds=10))
+
+    assert len(transcriber.calls) == 3
+    assert abs(sum(transcriber.calls) - 24) < 0.05
+    assert abs(result["duration"] - 24) < 0.01
+
+def test_remaining_segments_are_cancelled_after_a_permanent_failure():
+    audio = make_wav([(4, True), (1, False)] * 12)
+    started = []
+
+    async def transcriber(audio, filename):
+        started.append(filename)
+        if filename == "segment_0.wav":
+            raise RuntimeError("segment upload failed")
+        await asyncio.sleep(0.2)
+        return {"text": "late", "words": [], "duration": 1.0}
+
+    async def run():
+        try:
+            await transcribe_in_segments(audio, transcriber, max_segment_seconds=6, max_concurrency=2, max_retries=0)
+        except RuntimeError:
+            pass
+        await asyncio.sleep(0.5)  # Anything left running would start more segments
+
+    asyncio.run(run())
+    # The failed segment's slot may go to one more before the rest are cancelled, but no further
+    assert len(started) <= 3
+
+def test_failed_transcription_raises_and_the_endpoints_report_it(monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+    from utils import model_generation, voice_pipeline
+
+    async def refuse(*args, **kwargs):
+        raise ValueError("unreadable audio")
+
+    monkeypatch.setattr(model_generation, "create_transcription", refuse)
+    with pytest.raises(TranscriptionFailed, match="Could not transcribe audio"):
+        asyncio.run(model_generation.transcribe_audio_with_timestamps(make_wav([(1, True)]), "talk.wav"))
+
+    async def failed(audio, filename):
+        raise TranscriptionFailed()
+
+    monkeypatch.setattr(voice_pipeline, "transcribe_audio_with_timestamps", failed)
+    upload = {"audio": ("talk.wav", make_wav([(1, True)]), "audio/wav")}
+    client = TestClient(main.app)
+    assert client.post("/assess/voice/", files=upload).json() == {"feedback": "Transcription failed. Please try again."}
+    assert client.post("/voice/", files=upload).json()["response"] == "Transcription failed. Please try again."
+
+def test_a_segment_out_of_retries_does_not_restart_the_others(monkeypatch):
+    import functools
+
+    import httpx
+    import openai
+
+    from utils import model_generation
+    from utils.helper_functions import safe_api_call
+    from utils.rate_limiter import RateLimitQueueFull
+
+    sent = []
+
+    async def create_transcription(file, **kwargs):
+        filename, _ = file
+        sent.append(filename)
+        if filename == "segment_1.wav":
+            response = httpx.Response(429, headers={"retry-after-ms": "1"}, request=httpx.Request("POST", "http://fake/v1/audio"))
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        await asyncio.sleep(0.05)  # Still running when segment 1 gives up
+        return type("Verbose", (), {"text": "ok", "words": [], "duration": 8.0})()
+
+    monkeypatch.setattr(model_generation, "create_transcription", create_transcription)
+    monkeypatch.setattr(model_generation, "transcribe_in_segments", functools.partial(transcribe_in_segments, max_segment_seconds=10))
+    audio = make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)])
+
+    with pytest.raises(RateLimitQueueFull):
+        asyncio.run(safe_api_call(model_generation.transcribe_audio_with_timestamps, audio, "talk.wav", initial_delay=0.001))
+    assert sent.count("segment_1.wav") == 3  # One try and two retries, then no restart from the top
+    assert sent.count("segment_0.wav") == 1
+
+def test_plain_text_transcription_is_segmented_too(monkeypatch):
+    import functools
+
+    from utils import model_generation
+
+    async def create_transcription(file, **kwargs):
+        filename, audio = file
+        return f"Text of {filename} ({wav_seconds(audio):.0f}s).\n"
+
+    monkeypatch.setattr(model_generation, "create_transcription", create_transcription)
+    monkeypatch.setattr(model_generation, "transcribe_in_segments", functools.partial(transcribe_in_segments, max_segment_seconds=10))
+    audio = make_wav([(8, True), (1, False), (8, True), (1, False), (6, True)])
+
+    text = asyncio.run(model_generation.transcribe_audio(audio, "talk.wav"))
+
+    assert text.startswith("Text of segment_0.wav") and text.count("Text of segment_") == 3
+    assert "\n" not in text
@@ -0,0 +1,95 @@
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.tts_cache import TTSCache, speech_api_synthesize
+
+
+class StubSynthesizer:
+    def __init__(self, size=100):
+        self.size = size
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, path, lang="en", tld="com", slow=False):
+        with self.lock:
+            self.calls += 1
+        with open(path, "wb") as f:
+            f.write(text.encode()[:1].ljust(self.size, b"\0"))
+
+
+def test_identical_text_is_synthesized_once(tmp_path):
+    synth = StubSynthesizer()
+    cache = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=synth)
+
+    first = cache.get_or_create("Great pacing.")
+    second = cache.get_or_create("Great pacing.")
+
+    assert first == second
+    assert synth.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_voice_settings_are_part_of_the_key(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesize=StubSynthesizer())
+
+    assert cache.get_or_create("Hello", lang="en") != cache.get_or_create("Hello", lang="fr")
+    assert cache.get_or_create("Hello", slow=True) != cache.get_or_create("Hello")
+
+def test_synthesizer_settings_are_part_of_the_key(tmp_path):
+    synth = StubSynthesizer()
+    gtts = TTSCache(str(tmp_path), synthesize=synth, backend="gtts")
+    speech = TTSCache(str(tmp_path), synthesize=synth, backend="speech:http://tts/v1:tts-1:alloy")
+    other_voice = TTSCache(str(tmp_path), synthesize=synth, backend="speech:http://tts/v1:tts-1:nova")
+
+    assert len({cache.get_or_create("Hello") for cache in (gtts, speech, other_voice)}) == 3
+    assert synth.calls == 3
+
+def test_speech_endpoint_rejects_other_languages(tmp_path):
+    with pytest.raises(ValueError, match="English only"):
+        speech_api_synthesize("Bonjour", str(tmp_path / "out.mp3"), lang="fr")
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=250, synthesize=StubSynthesizer(size=100))
+
+    a = cache.get_or_create("a")
+    b = cache.get_or_create("b")
+    cache.get_or_create("a")  # "b" is now least recently used
+    c = cache.get_or_create("c")
+
+    assert sorted(os.listdir(tmp_path)) == sorted([a, c])
+    assert b not in os.listdir(tmp_path)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+def test_existing_files_are_reused_after_restart(tmp_path):
+    synth = StubSynthesizer()
+    filename = TTSCache(str(tmp_path), synthesize=synth).get_or_create("Persisted")
+
+    restarted = TTSCache(str(tmp_path), synthesize=synth)
+
+    assert restarted.get_or_create("Persisted") == filename
+    assert synth.calls == 1
+    assert restarted.stats()["entries"] == 1
+
+def test_unmanaged_files_are_never_evicted(tmp_path):
+    (tmp_path / "test_audio.mp3").write_bytes(b"x" * 1000)
+    cache = TTSCache(str(tmp_path), max_bytes=150, synthesize=StubSynthesizer(size=100))
+
+    cache.get_or_create("a")
+    cache.get_or_create("b")
+
+    assert (tmp_path / "test_audio.mp3").exists()
+
+def test_cached_file_is_served_by_audio_endpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = TTSCache("audio_files", synthesize=StubSynthesizer())
+    filename = cache.get_or_create("Served")
+
+    response = TestClient(main.app).get(f"/audio/{filename}")
+
+    assert response.status_code == 200
+    assert response.content == (tmp_path / "audio_files" / filename).read_bytes()
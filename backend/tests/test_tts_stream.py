@@ -0,0 +1,78 @@
+import asyncio
+import functools
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.tts_stream import split_sentences, stream_speech
+from conftest import SAMPLE_WAV
+
+FEEDBACK = "Great opening. Your pacing was steady! Try fewer filler words? Finish with a clear call to action."
+
+
+class StubSynthesizer:
+    """Returns the chunk text as bytes; earlier chunks take longer than later ones."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05 if text.startswith("Great") else 0.01)
+        with self.lock:
+            self.active -= 1
+        return text.encode() + b"|"
+
+
+async def collect(generator):
+    return [chunk async for chunk in generator]
+
+
+def test_split_sentences():
+    assert split_sentences(FEEDBACK) == [
+        "Great opening.",
+        "Your pacing was steady!",
+        "Try fewer filler words?",
+        "Finish with a clear call to action.",
+    ]
+    assert split_sentences("First line\n\nSecond line") == ["First line", "Second line"]
+
+def test_split_sentences_breaks_long_sentences_at_clauses_then_words():
+    text = "one two three, four five six; " + "word " * 30
+    chunks = split_sentences(text, max_chars=20)
+
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_stream_keeps_order_and_bounds_concurrency():
+    synth = StubSynthesizer()
+
+    chunks = asyncio.run(collect(stream_speech(FEEDBACK, synthesize=synth, lookahead=2)))
+
+    assert b"".join(chunks) == b"|".join(s.encode() for s in split_sentences(FEEDBACK)) + b"|"
+    assert synth.max_active <= 2
+
+def test_voice_returns_stream_url_and_stream_is_served(fake_provider, monkeypatch):
+    monkeypatch.setattr(main, "stream_speech", functools.partial(stream_speech, synthesize=StubSynthesizer()))
+    client = TestClient(main.app)
+
+    response = client.post("/voice/?stream_audio=true", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+    assert response.status_code == 200
+    stream_url = response.json()["audio_stream"]
+
+    audio = client.get(stream_url)
+    assert audio.status_code == 200
+    assert audio.headers["content-type"] == "audio/mpeg"
+    assert audio.content == b"Fake feedback.|"
+
+def test_unknown_audio_stream():
+    client = TestClient(main.app)
+
+    assert client.get("/audio/stream/" + "0" * 32).status_code == 404
+    assert client.get("/audio/stream/not-a-stream").status_code == 400
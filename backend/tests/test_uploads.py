@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+import main
+from utils import voice_pipeline
+from utils.uploads import UploadLimitMiddleware, sniff_audio_format, spool_upload
+from conftest import SAMPLE_WAV
+
+LIMIT = 64 * 1024
+
+
+def limited_app():
+    """A small app with the same upload handling as main, but a low size limit."""
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload/": (LIMIT, "Audio file is too large.")})
+
+    @app.post("/upload/")
+    async def upload(audio: UploadFile = File(...)):
+        audio_file = await spool_upload(audio, max_bytes=LIMIT)
+        return {"format": audio.audio_format, "size": len(audio_file.read())}
+
+    return app
+
+
+@pytest.mark.parametrize("head, expected", [
+    (SAMPLE_WAV[:16], "wav"),
+    (b"ID3\x04\x00\x00\x00\x00\x00\x00", "mp3"),
+    (b"\xff\xfb\x90\x00", "mp3"),
+    (b"\x00\x00\x00\x20ftypM4A ", "mp4"),
+    (b"OggS\x00\x02", "ogg"),
+    (b"fLaC\x00\x00", "flac"),
+    (b"\x1a\x45\xdf\xa3\x01", "webm"),
+    (b"%PDF-1.7", None),
+    (b"", None),
+])
+def test_sniff_audio_format(head, expected):
+    assert sniff_audio_format(head) == expected
+
+def test_accepts_audio_within_limit():
+    response = TestClient(limited_app()).post("/upload/", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 200
+    assert response.json() == {"format": "wav", "size": len(SAMPLE_WAV)}
+
+def test_rejects_large_upload_by_content_length():
+    payload = SAMPLE_WAV + b"\x00" * (LIMIT * 2)
+
+    response = TestClient(limited_app()).post("/upload/", files={"audio": ("test.wav", payload, "audio/wav")})
+
+    assert response.status_code == 413
+
+def test_rejects_large_streamed_upload_without_content_length():
+    received = []
+
+    async def body():
+        # Chunked body with no Content-Length; the middleware has to count
+        yield b"--boundary\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"a.wav\"\r\n"
+        yield b"Content-Type: audio/wav\r\n\r\n" + SAMPLE_WAV
+        for _ in range(100):
+            received.append(1)
+            yield b"\x00" * 8192
+
+    async def send():
+        transport = httpx.ASGITransport(app=limited_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/upload/", content=body(),
+                                     headers={"content-type": "multipart/form-data; boundary=boundary"})
+
+    response = asyncio.run(send())
+
+    assert response.status_code == 413
+    assert len(received) < 100  # Cut off before the whole body was sent
+
+@pytest.mark.parametrize("filename, content, content_type", [
+    ("notes.txt", b"just some text", "text/plain"),
+    ("fake.wav", b"not really audio at all", "audio/wav"),
+])
+def test_rejects_non_audio(filename, content, content_type):
+    response = TestClient(limited_app()).post("/upload/", files={"audio": (filename, content, content_type)})
+
+    assert response.status_code == 415
+
+def test_voice_endpoint_passes_spooled_file_to_transcriber(monkeypatch):
+    received = []
+
+    async def transcribe(audio, filename):
+        received.append((audio, filename, audio.read()))
+        return {"text": "Hello there.", "words": [], "duration": 1.0}
+
+    monkeypatch.setattr(voice_pipeline, "transcribe_audio_with_timestamps", transcribe)
+
+    response = TestClient(main.app).post("/assess/voice/?mode=metrics", files={"audio": ("clip", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 200
+    audio, filename, data = received[0]
+    assert not isinstance(audio, bytes)
+    assert filename == "audio.wav"  # Named from the sniffed format, not the client's filename
+    assert data == SAMPLE_WAV
+
+def test_voice_endpoint_rejects_non_audio():
+    response = TestClient(main.app).post("/voice/", files={"audio": ("test.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 415
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import functools
+import io
+import json
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.tts_stream import SentenceBuffer
+from utils import voice_pipeline
+from utils.voice_pipeline import assess_voice, run_voice_pipeline, voice_feedback
+from conftest import SAMPLE_WAV
+
+TOKENS = ["Good ", "opening. ", "Slow ", "down. ", "Fewer ", "fillers."]
+
+
+async def fake_deltas(latency):
+    for token in TOKENS:
+        await asyncio.sleep(latency)
+        yield token
+
+def stub_synthesize(latency):
+    def synthesize(text):
+        time.sleep(latency)
+        return text.encode()
+    return synthesize
+
+async def collect(events):
+    start = time.perf_counter()
+    timed = []
+    async for event in events:
+        timed.append((time.perf_counter() - start, event))
+    return timed
+
+
+def test_sentence_buffer_releases_complete_sentences():
+    buffer = SentenceBuffer()
+
+    assert buffer.feed("Good open") == []
+    assert buffer.feed("ing. Slow") == ["Good opening."]
+    assert buffer.feed(" down!\n") == ["Slow down!"]
+    assert buffer.feed("No trailing stop") == []
+    assert buffer.flush() == ["No trailing stop"]
+
+def test_pipeline_emits_events_in_order():
+    timed = asyncio.run(collect(run_voice_pipeline("transcript", fake_deltas(0.01), stub_synthesize(0.01))))
+    events = [event for _, event in timed]
+
+    assert events[0] == {"type": "transcript", "text": "transcript"}
+    assert "".join(e["text"] for e in events if e["type"] == "delta") == "".join(TOKENS)
+    audio = [e for e in events if e["type"] == "audio"]
+    assert [e["index"] for e in audio] == [0, 1, 2]
+    assert [base64.b64decode(e["audio"]) for e in audio] == [b"Good opening.", b"Slow down.", b"Fewer fillers."]
+    assert events[-1] == {"type": "done", "response": "".join(TOKENS)}
+
+def test_synthesis_overlaps_generation():
+    token_latency, synth_latency = 0.1, 0.15
+    timed = asyncio.run(collect(run_voice_pipeline("t", fake_deltas(token_latency), stub_synthesize(synth_latency))))
+
+    elapsed = timed[-1][0]
+    sequential = len(TOKENS) * token_latency + 3 * synth_latency
+    first_audio = next(t for t, e in timed if e["type"] == "audio")
+    last_delta = max(t for t, e in timed if e["type"] == "delta")
+    assert first_audio < last_delta
+    assert elapsed < sequential - synth_latency
+
+def test_pipeline_reports_errors():
+    async def failing_deltas():
+        yield "Partial. "
+        raise RuntimeError("provider dropped the stream")
+
+    events = [e for _, e in asyncio.run(collect(run_voice_pipeline("t", failing_deltas(), stub_synthesize(0))))]
+
+    assert events[-1]["type"] == "error"
+
+def test_voice_stream_endpoint(fake_provider, monkeypatch):
+    monkeypatch.setattr(main, "run_voice_pipeline", functools.partial(run_voice_pipeline, synthesize=stub_synthesize(0)))
+    client = TestClient(main.app)
+
+    response = client.post("/voice/stream/", files={"audio": ("test.wav", SAMPLE_WAV, "audio/wav")})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0] == {"type": "transcript", "text": "This is a fake transcript."}
+    assert [e["text"] for e in events if e["type"] == "audio"] == ["Fake feedback."]
+    assert events[-1] == {"type": "done", "response": "Fake feedback."}
+
+def test_endpoints_and_jobs_share_one_pipeline_with_stage_reporting(monkeypatch):
+    async def transcribe(audio, filename):
+        return {"text": "So today, um, practice.", "words": [], "duration": 2.0}
+
+    monkeypatch.setattr(voice_pipeline, "transcribe_audio_with_timestamps", transcribe)
+    stages = []
+
+    @asynccontextmanager
+    async def stage(name):
+        stages.append(name)
+        yield
+
+    async def run():
+        direct = await assess_voice(io.BytesIO(SAMPLE_WAV), "wav", "metrics")
+        staged = await voice_feedback(io.BytesIO(SAMPLE_WAV), "wav", "metrics", stage)
+        return direct, staged
+
+    direct, staged = asyncio.run(run())
+    assert direct == staged == {"transcript": "So today, um, practice.", "metrics": direct["metrics"]}
+    assert stages == ["normalize", "transcribe"]
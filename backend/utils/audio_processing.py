@@ -0,0 +1,212 @@
+import tempfile
+import threading
+import wave
+import numpy as np
+from utils.constants import (
+    AUDIO_NORMALIZE, AUDIO_TARGET_SAMPLE_RATE, AUDIO_SILENCE_THRESHOLD_DB, AUDIO_SILENCE_PADDING_SECONDS
+)
+from utils.metrics import timed
+from config import logger
+
+FRAME_SECONDS = 0.02  # Energy is measured over 20 ms frames
+BLOCK_SECONDS = 10.0  # Audio is decoded in blocks of this length to bound memory
+SILENCE_FLOOR = 1e-3  # About -60 dBFS; quieter frames are always silence
+FILTER_TAPS = 63
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def read_wav_params(audio_file):
+    """Return the WAV parameters of a PCM WAV file object, or None if it is not a readable WAV."""
+    audio_file.seek(0)
+    try:
+        with wave.open(audio_file, "rb") as wav:
+            params = wav.getparams()
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        audio_file.seek(0)
+    if params.sampwidth not in (1, 2, 4) or params.nframes == 0:
+        return None
+    return params
+
+def pcm_to_mono(frames: bytes, params) -> np.ndarray:
+    """Decode PCM frames to mono float samples in [-1, 1], averaging the channels."""
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[params.sampwidth]
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if params.sampwidth == 1:
+        samples -= 128.0
+    samples /= float(2 ** (8 * params.sampwidth - 1))
+    return samples.reshape(-1, params.nchannels).mean(axis=1)
+
+def frame_energy(frames: bytes, params) -> np.ndarray:
+    """RMS energy of each analysis frame, computed over all channels at once."""
+    samples = pcm_to_mono(frames, params)
+    hop = max(int(params.framerate * FRAME_SECONDS), 1)
+    usable = len(samples) // hop * hop
+    if usable == 0:
+        return np.sqrt(np.mean(samples ** 2, keepdims=True))
+    return np.sqrt(np.mean(samples[:usable].reshape(-1, hop) ** 2, axis=1))
+
+def wav_energy(audio_file, params, block_seconds: float = BLOCK_SECONDS) -> np.ndarray:
+    """Frame energies of a whole WAV file, read in bounded blocks."""
+    hop = max(int(params.framerate * FRAME_SECONDS), 1)
+    block = hop * max(int(block_seconds / FRAME_SECONDS), 1)
+    energies = []
+    audio_file.seek(0)
+    with wave.open(audio_file, "rb") as wav:
+        while True:
+            frames = wav.readframes(block)
+            if not frames:
+                break
+            energies.append(frame_energy(frames, params))
+    audio_file.seek(0)
+    return np.concatenate(energies)
+
+def speech_bounds(energy: np.ndarray, threshold_db: float = AUDIO_SILENCE_THRESHOLD_DB,
+                  padding_frames: int = 0) -> tuple:
+    """
+    First and last (exclusive) analysis frame holding speech, padded on both sides.
+    Silence is anything `threshold_db` below the loud end of the recording.
+    Audio without any speech is kept whole.
+    """
+    reference = float(np.percentile(energy, 95))
+    threshold = max(reference * 10 ** (threshold_db / 20), SILENCE_FLOOR)
+    loud = np.flatnonzero(energy >= threshold)
+    if len(loud) == 0:
+        return 0, len(energy)
+    return max(int(loud[0]) - padding_frames, 0), min(int(loud[-1]) + 1 + padding_frames, len(energy))
+
+
+class Resampler:
+    """
+    Block-by-block sample-rate converter for mono float audio.
+    A windowed-sinc low-pass filter removes content above the new Nyquist
+    frequency, then output samples are linearly interpolated. Filter history
+    and the interpolation position carry over between blocks.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps: int = FILTER_TAPS):
+        self.step = in_rate / out_rate
+        cutoff = 0.45 / self.step  # Cycles per input sample, just under the new Nyquist
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._position = 0  # Global index of the next filtered input sample
+        self._last = None  # Last filtered sample of the previous block
+        self._next_output = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        padded = np.concatenate([self._history, samples])
+        filtered = np.convolve(padded, self.kernel, mode="valid")
+        self._history = padded[len(padded) - len(self._history):]
+
+        positions = np.arange(self._position, self._position + len(filtered), dtype=np.float64)
+        if self._last is not None:
+            positions = np.concatenate([[self._position - 1], positions])
+            filtered = np.concatenate([[self._last], filtered])
+        self._position += len(samples)
+        if len(filtered) == 0:
+            return np.zeros(0, dtype=np.float32)
+        self._last = filtered[-1]
+
+        last_output = int(np.floor(positions[-1] / self.step))
+        indices = np.arange(self._next_output, last_output + 1)
+        self._next_output = max(self._next_output, last_output + 1)
+        return np.interp(indices * self.step, positions, filtered).astype(np.float32)
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+def file_size(audio_file) -> int:
+    position = audio_file.tell()
+    size = audio_file.seek(0, 2)
+    audio_file.seek(position)
+    return size
+
+
+class AudioNormalizer:
+    """
+    Shrinks uploads before they are sent for transcription.
+
+    WAV audio is downmixed to mono, resampled to `target_rate` (never upsampled),
+    trimmed of leading and trailing silence and re-encoded as 16-bit PCM WAV.
+    Other containers cannot be decoded without an external codec and are passed
+    through under a filename matching their real format. Bytes received and
+    bytes sent are recorded for every request.
+    """
+
+    def __init__(self, target_rate: int = AUDIO_TARGET_SAMPLE_RATE, threshold_db: float = AUDIO_SILENCE_THRESHOLD_DB,
+                 padding_seconds: float = AUDIO_SILENCE_PADDING_SECONDS, enabled: bool = AUDIO_NORMALIZE):
+        self.target_rate = target_rate
+        self.threshold_db = threshold_db
+        self.padding_seconds = padding_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "normalized": 0, "bytes_in": 0, "bytes_sent": 0}
+
+    @timed("normalize")
+    def normalize(self, audio_file, audio_format: str) -> tuple:
+        """Return (file object, filename) to transcribe in place of `audio_file`."""
+        bytes_in = file_size(audio_file)
+        result = None
+        if self.enabled and audio_format == "wav":
+            try:
+                result = self._normalize_wav(audio_file)
+            except (wave.Error, EOFError, ValueError) as e:
+                logger.warning(f"Audio normalization failed, sending the original: {e}")
+        if result is None:
+            audio_file.seek(0)
+            result = (audio_file, f"audio.{audio_format}")
+
+        bytes_sent = file_size(result[0])
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["normalized"] += result[0] is not audio_file
+            self._stats["bytes_in"] += bytes_in
+            self._stats["bytes_sent"] += bytes_sent
+        logger.info("Audio for transcription: %s bytes in, %s bytes sent (%s)", bytes_in, bytes_sent, audio_format)
+        return result
+
+    def _normalize_wav(self, audio_file):
+        params = read_wav_params(audio_file)
+        if params is None:
+            return None
+        hop = max(int(params.framerate * FRAME_SECONDS), 1)
+        first, last = speech_bounds(wav_energy(audio_file, params), self.threshold_db,
+                                    int(self.padding_seconds / FRAME_SECONDS))
+        start, end = first * hop, min(last * hop, params.nframes)
+        out_rate = min(params.framerate, self.target_rate)
+        if (params.nchannels == 1 and params.sampwidth == 2 and out_rate == params.framerate
+                and end - start > 0.95 * params.nframes):
+            return None  # Already compact; a rewrite would save almost nothing
+
+        resampler = Resampler(params.framerate, out_rate) if out_rate != params.framerate else None
+        out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        block = int(params.framerate * BLOCK_SECONDS)
+        audio_file.seek(0)
+        with wave.open(audio_file, "rb") as wav, wave.open(out, "wb") as dst:
+            dst.setnchannels(1)
+            dst.setsampwidth(2)
+            dst.setframerate(out_rate)
+            wav.setpos(start)
+            remaining = end - start
+            while remaining > 0:
+                frames = wav.readframes(min(block, remaining))
+                if not frames:
+                    break
+                remaining -= len(frames) // (params.sampwidth * params.nchannels)
+                samples = pcm_to_mono(frames, params)
+                dst.writeframes(to_pcm16(resampler.process(samples) if resampler else samples))
+        out.seek(0)
+        return out, "audio.wav"
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_sent"]
+        stats["ratio"] = round(stats["bytes_sent"] / stats["bytes_in"], 3) if stats["bytes_in"] else None
+        return stats
+
+
+normalizer = AudioNormalizer()
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import secrets
+import threading
+import time
+from utils import database
+from utils.errors import error_detail
+from utils.evaluation import BATCH_EVALUATION_RESPONSE_FORMAT, SCORE_FIELDS, parser as evaluation_parser, scores_of
+from utils.helper_functions import evaluate_presentation, evaluation_cache_key, safe_api_call
+from utils.metrics import span, timed
+from utils.progress_writer import writer as progress_writer
+from utils.providers import create_chat_completion
+from utils.response_cache import response_cache
+from utils.token_budget import count_tokens
+from utils.constants import (
+    MODEL_NAME, BATCH_CONCURRENCY, BATCH_PACK_MAX_ITEMS, BATCH_PACK_ITEM_TOKENS, BATCH_PACK_REPORT_TOKENS
+)
+from prompts.assembly import BATCH_EVALUATION, prompt_usage
+from prompts.prompt_templates import PACKED_PRESENTATIONS_INPUT
+from config import logger
+
+
+def parse_jsonl(lines) -> list:
+    """
+    Batch items from a JSONL upload, read line by line from a binary file object:
+    one {"id": ..., "text": ...} object or JSON string per line. Raises ValueError
+    naming the bad line.
+    """
+    items = []
+    for number, raw in enumerate(lines, 1):
+        try:
+            line = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError(f"Line {number} is not UTF-8 text.")
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"Line {number} is not valid JSON.")
+        if isinstance(value, str):
+            value = {"text": value}
+        if not isinstance(value, dict) or not isinstance(value.get("text"), str):
+            raise ValueError(f'Line {number} has no "text".')
+        items.append({"id": value.get("id"), "text": value["text"]})
+    return items
+
+def pack_presentations(texts: list) -> tuple:
+    """
+    The user input of a packed evaluation and the ids it gives the presentations.
+    The texts go in a JSON array, so none can pose as a separator or another
+    presentation's header, and each gets a random id no submission can predict.
+    """
+    ids = [secrets.token_hex(4) for _ in texts]
+    presentations = json.dumps([{"id": id_, "text": text} for id_, text in zip(ids, texts)], ensure_ascii=False, indent=1)
+    return PACKED_PRESENTATIONS_INPUT.format(presentations=presentations), ids
+
+def unpack_evaluations(raw: str, ids: list) -> list:
+    """
+    Feedback per presentation from a packed reply, in the order of `ids`; None
+    for any the reply leaves out or scores incompletely. A reply naming an id it
+    was not sent, or one id twice, is not trusted at all.
+    """
+    results = [None] * len(ids)
+    try:
+        entries = json.loads(raw)["evaluations"]
+    except (json.JSONDecodeError, TypeError, KeyError):
+        return results
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return results
+    replied = [entry.get("id") for entry in entries]
+    if any(id_ not in ids for id_ in replied) or len(set(replied)) != len(replied):
+        logger.warning("Packed reply ids do not match the presentations sent; evaluating them one by one")
+        return results
+    for entry in entries:
+        feedback = evaluation_parser.parse(json.dumps({key: value for key, value in entry.items() if key != "id"}))
+        if all(field in feedback for field in SCORE_FIELDS):
+            results[ids.index(entry["id"])] = feedback
+    return results
+
+@timed("evaluate")
+async def evaluate_packed(texts: list) -> list:
+    """Evaluate several short text presentations in one completion; see unpack_evaluations for the result."""
+    user_input, ids = pack_presentations(texts)
+    response = await create_chat_completion(
+        BATCH_EVALUATION.messages(user_input), MODEL_NAME,
+        max_tokens=BATCH_PACK_REPORT_TOKENS * len(texts), response_format=BATCH_EVALUATION_RESPONSE_FORMAT
+    )
+    prompt_usage.record(BATCH_EVALUATION, response)
+    return unpack_evaluations(response.choices[0].message.content, ids)
+
+class BatchAssessor:
+    """
+    Assesses many text presentations for one request.
+
+    Cached submissions are answered at once. Short ones are packed up to
+    `pack_max_items` to a completion, and longer ones (or any a packed reply
+    leaves out) are evaluated on their own, with at most `concurrency`
+    completions in flight per batch. Results are yielded as they finish. The
+    assessments are written to the progress database in one transaction at the
+    end, instead of one write each; if the client leaves mid-batch, those made
+    so far go to the progress writer.
+    """
+
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY, pack_max_items: int = BATCH_PACK_MAX_ITEMS,
+                 pack_item_tokens: int = BATCH_PACK_ITEM_TOKENS):
+        self.concurrency = concurrency
+        self.pack_max_items = pack_max_items
+        self.pack_item_tokens = pack_item_tokens
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "failed_items": 0, "cached_items": 0, "packed_items": 0,
+                       "provider_calls": 0, "total_seconds": 0.0, "last_items_per_second": 0.0}
+
+    async def run(self, items: list, use_cache: bool = True, concurrency: int = None):
+        """
+        Yield a "result" or "error" event per item ({"id", "text"} dicts), in the
+        order they finish, then a "summary" with the batch's throughput.
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        counts = {"succeeded": 0, "failed": 0, "cached": 0, "packed": 0, "provider_calls": 0}
+        records = []
+        pending = set()
+
+        def result(index: int, feedback: dict, **flags) -> dict:
+            counts["succeeded"] += 1
+            text = items[index]["text"]
+            records.append({"type": "presentation", "input": text, "feedback": feedback.get("full_report", json.dumps(feedback)),
+                            "scores": scores_of(feedback)})
+            return {"type": "result", "index": index, "id": items[index].get("id"), "feedback": feedback, **flags}
+
+        def error(index: int, detail: str) -> dict:
+            counts["failed"] += 1
+            return {"type": "error", "index": index, "id": items[index].get("id"), "detail": detail}
+
+        async def single(index: int) -> list:
+            async with semaphore:
+                counts["provider_calls"] += 1
+                try:
+                    feedback = await safe_api_call(evaluate_presentation, items[index]["text"], "text", use_cache=use_cache, save=False)
+                except Exception as e:
+                    logger.warning("Batch item %s failed: %s", index, e)
+                    return [error(index, error_detail(e))]
+            return [result(index, feedback, packed=False, cached=False)]
+
+        async def pack(indexes: list) -> list:
+            texts = [items[index]["text"] for index in indexes]
+            async with semaphore:
+                counts["provider_calls"] += 1
+                try:
+                    evaluations = await safe_api_call(evaluate_packed, texts)
+                except Exception as e:
+                    logger.warning("Packed evaluation of %s items failed: %s", len(indexes), e)
+                    return [error(index, error_detail(e)) for index in indexes]
+            events = []
+            for index, text, feedback in zip(indexes, texts, evaluations):
+                if feedback is None:
+                    pending.add(asyncio.create_task(single(index)))  # Left out of the reply; evaluated on its own
+                    continue
+                counts["packed"] += 1
+                await response_cache.aset(evaluation_cache_key(text, "text", None), feedback)
+                events.append(result(index, feedback, packed=True, cached=False))
+            return events
+
+        ready, short = [], []
+        for index, item in enumerate(items):
+            text = item["text"]
+            if not text.strip():
+                ready.append(error(index, "The presentation text is empty."))
+                continue
+            cached = await response_cache.aget(evaluation_cache_key(text, "text", None), bypass=not use_cache)
+            if cached is not None:
+                counts["cached"] += 1
+                ready.append(result(index, cached, packed=False, cached=True))
+            elif self.pack_max_items > 1 and count_tokens(text, MODEL_NAME) <= self.pack_item_tokens:
+                short.append(index)
+            else:
+                pending.add(asyncio.create_task(single(index)))
+        for i in range(0, len(short), self.pack_max_items):
+            group = short[i:i + self.pack_max_items]
+            pending.add(asyncio.create_task(pack(group) if len(group) > 1 else single(group[0])))
+
+        try:
+            for event in ready:
+                yield event
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(finished)
+                for task in finished:
+                    for event in task.result():
+                        yield event
+            batch_records, records = records, []
+            await asyncio.to_thread(self._persist, batch_records)
+        finally:
+            for task in pending:
+                task.cancel()
+            for record in records:  # The client went away mid-batch; keep what was assessed, without blocking the loop
+                progress_writer.submit(record)
+            seconds = time.perf_counter() - start
+            self._record(len(items), counts, seconds)
+
+        yield {
+            "type": "summary",
+            "items": len(items),
+            **counts,
+            "seconds": round(seconds, 3),
+            "items_per_second": round(len(items) / seconds, 2) if seconds > 0 else 0.0,
+        }
+
+    def _persist(self, records: list):
+        if not records:
+            return
+        try:
+            with span("persist"):
+                database.save_records(records)
+            logger.info("Saved %s batch assessments", len(records))
+        except Exception as e:
+            logger.error(f"Error saving batch assessments: {e}")
+
+    def _record(self, items: int, counts: dict, seconds: float):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += items
+            self._stats["failed_items"] += counts["failed"]
+            self._stats["cached_items"] += counts["cached"]
+            self._stats["packed_items"] += counts["packed"]
+            self._stats["provider_calls"] += counts["provider_calls"]
+            self._stats["total_seconds"] += seconds
+            self._stats["last_items_per_second"] = round(items / seconds, 2) if seconds > 0 else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+batch_assessor = BatchAssessor()
@@ -10,6 +10,82 @@ OPENAI_PROJECT = os.getenv("OPENAI_PROJECT")
 
 XAI_API_KEY = os.getenv("XAI_API_KEY")
 
+# Provider endpoints and shared HTTP connection pool settings
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+XAI_BASE_URL = os.getenv("XAI_BASE_URL", "https://api.x.ai/v1")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+
+# Background progress writer
+PROGRESS_BATCH_SIZE = int(os.getenv("PROGRESS_BATCH_SIZE", "100"))
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "0.5"))  # seconds
+PROGRESS_QUEUE_SIZE = int(os.getenv("PROGRESS_QUEUE_SIZE", "10000"))
+
+# Text-to-speech cache
+TTS_CACHE_DIR = "audio_files"
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# When set, speech comes from an OpenAI-compatible /audio/speech endpoint at this URL instead of gTTS
+TTS_BASE_URL = os.getenv("TTS_BASE_URL")
+TTS_MODEL = os.getenv("TTS_MODEL", "tts-1")
+TTS_VOICE = os.getenv("TTS_VOICE", "alloy")
+
+# Sentence-chunked streaming TTS
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "200"))
+TTS_STREAM_WORKERS = int(os.getenv("TTS_STREAM_WORKERS", "4"))
+TTS_STREAM_TTL = float(os.getenv("TTS_STREAM_TTL", "600"))  # seconds a stream id stays valid
+TTS_STREAM_MAX_ENTRIES = 1000
+
+# Local speech-delivery analytics
+DEFAULT_FILLER_WORDS = "um,uh,er,ah,like,you know,basically,actually,literally,i mean,kind of,sort of"
+FILLER_WORDS = [w.strip() for w in os.getenv("FILLER_WORDS", DEFAULT_FILLER_WORDS).split(",") if w.strip()]
+WPM_WINDOW_SECONDS = 30.0
+WPM_WINDOW_STEP = 5.0
+PAUSE_THRESHOLD_SECONDS = 0.3
+DIVERSITY_WINDOW = 50  # words per MATTR window
+
+# Chunked transcription of long recordings
+TRANSCRIBE_SEGMENT_SECONDS = float(os.getenv("TRANSCRIBE_SEGMENT_SECONDS", "120"))
+TRANSCRIBE_SILENCE_SEARCH_SECONDS = 10.0  # Look this far back from the limit for a quiet cut point
+TRANSCRIBE_MAX_CONCURRENCY = int(os.getenv("TRANSCRIBE_MAX_CONCURRENCY", "4"))
+TRANSCRIBE_SEGMENT_RETRIES = 2
+
+# Client-side rate limiting per provider and model
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_DEFAULT_RPM = float(os.getenv("RATE_LIMIT_DEFAULT_RPM", "500"))  # Until the provider's headers say otherwise
+RATE_LIMIT_DEFAULT_TPM = float(os.getenv("RATE_LIMIT_DEFAULT_TPM", "200000"))
+RATE_LIMIT_MAX_WAITERS = int(os.getenv("RATE_LIMIT_MAX_WAITERS", "50"))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "20"))
+RATE_LIMIT_HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.9"))  # Fraction of the provider's limit to use
+COMPLETION_TOKENS_ESTIMATE = 512  # Assumed completion length when no max_tokens is set
+
+# Response cache for repeated coaching and assessment inputs
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "")  # Empty keeps the cache in memory only
+RESPONSE_CACHE_DISK_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Audio normalization before transcription
+AUDIO_NORMALIZE = os.getenv("AUDIO_NORMALIZE", "true").lower() == "true"
+AUDIO_TARGET_SAMPLE_RATE = int(os.getenv("AUDIO_TARGET_SAMPLE_RATE", "16000"))
+AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "-35"))
+AUDIO_SILENCE_PADDING_SECONDS = 0.3
+
+# Multi-turn coaching sessions
+SESSION_RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "4"))  # Exchanges sent verbatim; older ones are summarized
+SESSION_FOLD_BATCH = 4  # Older exchanges folded into the summary together, so it is rewritten every few turns
+SESSION_SUMMARY_MAX_TOKENS = 300
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(20 * 1024 * 1024)))  # Text held across all sessions
+SESSION_OVERHEAD_BYTES = 512  # Rough bookkeeping cost of one session
+
+# Uploads
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))  # Whisper's own file limit
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))  # JSON or JSONL batch bodies
+
 # # Supported AI Roles
 # SUPPORTED_ROLES = {
 #     "job_interviewer": "You are a professional job interviewer. Ask structured questions, assess responses, and give feedback on clarity and conciseness.",
@@ -28,6 +104,19 @@ OPENAI_MODELS = ["gpt-4o-mini","gpt-3.5-turbo", "gpt-4"]
 XAI_MODELS = ["grok-2-latest"]
 
 MODEL_NAME = "gpt-4o-mini" #Default model.
+
+# Latency-aware routing between providers, selected with model="auto"
+ROUTER_MODEL = "auto"
+ROUTER_MODELS = [m.strip() for m in os.getenv("ROUTER_MODELS", f"{MODEL_NAME},{XAI_MODELS[0]}").split(",") if m.strip()]
+ROUTER_HEDGE = os.getenv("ROUTER_HEDGE", "true").lower() == "true"
+ROUTER_HEDGE_PERCENTILE = 0.95  # Hedge once the primary is slower than this share of its recent calls
+ROUTER_HEDGE_MIN_DELAY = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.25"))  # seconds
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", "3"))  # Until a backend has ROUTER_MIN_SAMPLES
+ROUTER_WINDOW = 200  # Recent latencies kept per backend
+ROUTER_MIN_SAMPLES = 10
+ROUTER_ERROR_DECAY = 0.2  # Weight of the latest outcome in the moving error rate
+ROUTER_MAX_ERROR_RATE = 0.5
+ROUTER_COOLDOWN_SECONDS = float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30"))  # Before an unhealthy backend is tried again
 TEMPERATURE = 0.2
 MAX_TOKENS = 1024
 TOP_P = 0.95
@@ -35,4 +124,50 @@ FREQUENCY_PENALTY = 0.1
 PRESENCE_PENALTY = 0.1
 
 # Default AI Role
-DEFAULT_ROLE = "coach"
\ No newline at end of file
+DEFAULT_ROLE = "coach"
+
+# Token budgets for prompts and user input
+TOKEN_BUDGET_STRATEGY = os.getenv("TOKEN_BUDGET_STRATEGY", "truncate")  # reject, truncate or condense
+INPUT_TOKEN_LIMIT = int(os.getenv("INPUT_TOKEN_LIMIT", "6000"))  # Most input tokens sent per request, whatever the context size
+TRUNCATION_HEAD_SHARE = 2 / 3  # Share of the kept input taken from the start when truncating
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "grok-2-latest": 131072,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+MAX_TOKENS_BY_ROLE = {
+    "job_interviewer": 600,
+    "debate_partner": 600,
+    "speech_coach": 800,
+    "impromptu": 800,
+    "storytelling": 800,
+    "conflict_resolution": 800,
+    "evaluation": MAX_TOKENS,
+}
+
+# Background jobs for slow voice requests (?job=true)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "200"))  # Jobs waiting to run; more are refused with 503
+JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR", "job_audio")  # Uploaded audio is kept here until its job finishes
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds finished jobs stay in memory; older ones are read from the database
+JOB_DEFAULT_PRIORITY = 5
+JOB_MAX_PRIORITY = 9  # Priorities run from 0 to this, highest first
+JOB_POLL_INTERVAL = 0.25  # seconds between status checks for /jobs/{id}/events
+
+# Batch assessment (/assess/batch/)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # Submissions per batch; larger batches are refused with 413
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # Provider calls in flight per batch
+BATCH_PACK_MAX_ITEMS = int(os.getenv("BATCH_PACK_MAX_ITEMS", "5"))  # Short submissions evaluated together in one call; 1 disables packing
+BATCH_PACK_ITEM_TOKENS = int(os.getenv("BATCH_PACK_ITEM_TOKENS", "400"))  # Submissions up to this many tokens may be packed
+BATCH_PACK_REPORT_TOKENS = 400  # Completion tokens allowed per packed submission
+
+# Prometheus-style metrics at /metrics
+METRICS_PREFIX = "verbal_trainer"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+
+# Logging (the level is set by DEBUG or LOG_LEVEL, see config.py)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text or json
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "300"))  # Longer logged values (prompts, transcripts, responses) are cut
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))  # Share of each DEBUG message's records that are written
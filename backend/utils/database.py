@@ -1,47 +1,198 @@
 import json
 import os
+import sqlite3
+import threading
+import time
 from config import logger  # Import the logger
 
-DB_FILE = "progress.json"
+DB_FILE = os.getenv("DATABASE_FILE", "progress.db")
+LEGACY_DB_FILE = "progress.json"  # Pre-SQLite store, migrated once on first open
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    type TEXT NOT NULL,
+    module TEXT,
+    input TEXT,
+    feedback TEXT,
+    scores TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_progress_created_at ON progress (created_at);
+CREATE INDEX IF NOT EXISTS idx_progress_module ON progress (module, created_at);
+CREATE INDEX IF NOT EXISTS idx_progress_type ON progress (type, created_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    user TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+INSERT_SQL = "INSERT INTO progress (created_at, type, module, input, feedback, scores) VALUES (?, ?, ?, ?, ?, ?)"
+JOB_COLUMNS = ("id", "created_at", "updated_at", "kind", "user", "priority", "status")
+SAVE_JOB_SQL = f"INSERT OR REPLACE INTO jobs ({', '.join(JOB_COLUMNS)}, data) VALUES ({', '.join('?' * (len(JOB_COLUMNS) + 1))})"
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's connection to DB_FILE, creating the schema on first use."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(DB_FILE)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers and multiple uvicorn workers append without rewriting anything
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        add_missing_columns(conn)
+        migrate_legacy_json(conn)
+        connections[DB_FILE] = conn
+    return conn
+
+def add_missing_columns(conn: sqlite3.Connection):
+    """Bring a progress table created by an older version up to the current schema."""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(progress)")}
+    if "scores" not in columns:
+        try:
+            conn.execute("ALTER TABLE progress ADD COLUMN scores TEXT")
+            logger.info("Added scores column to the progress table")
+        except sqlite3.OperationalError as e:  # Another worker got there first
+            logger.debug("Could not add scores column: %s", e)
+
+def migrate_legacy_json(conn: sqlite3.Connection, legacy_file: str = None):
+    """One-time import of the old progress.json list into the progress table; a file that cannot be read is retried on later starts."""
+    legacy_file = legacy_file or os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), LEGACY_DB_FILE)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # Serialise workers racing to migrate
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            return
+        if os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+                now = time.time()
+                conn.executemany(INSERT_SQL, [_to_row(record, now) for record in records])
+                logger.info("Migrated %s records from %s", len(records), legacy_file)
+            except (ValueError, TypeError, AttributeError, OSError) as e:
+                # Undo any partial import and leave the flag unset, so the import is retried once the file is fixed
+                conn.rollback()
+                logger.error(f"Could not migrate {legacy_file}: {e}. Leaving it untouched; it will be retried on the next start.")
+                return
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('legacy_migrated', ?)", (legacy_file,))
+
+def _to_row(record: dict, created_at: float) -> tuple:
+    record_type = record.get("type", "training")
+    return (
+        record.get("timestamp", created_at),
+        record_type,
+        record.get("module"),
+        record.get("input"),
+        record.get("feedback"),
+        json.dumps(record["scores"]) if record.get("scores") else None
+    )
+
+def _to_record(row: sqlite3.Row) -> dict:
+    """Shape a row like the entries of the legacy progress.json list."""
+    if row["type"] == "training":
+        record = {"module": row["module"]}
+    else:
+        record = {"type": row["type"]}
+    record.update({"input": row["input"], "feedback": row["feedback"], "timestamp": row["created_at"]})
+    if row["scores"]:
+        record["scores"] = json.loads(row["scores"])
+    return record
+
+def _append(record: dict):
+    conn = get_connection()
+    with conn:
+        conn.execute(INSERT_SQL, _to_row(record, time.time()))
+
+def save_records(records: list):
+    """Append a batch of progress records in a single transaction."""
+    conn = get_connection()
+    now = time.time()
+    with conn:
+        conn.executemany(INSERT_SQL, [_to_row(record, now) for record in records])
 
 def save_user_progress(user_input: str, ai_feedback: str, module: str):
     """Save user responses and feedback for training modules."""
     try:
-        data = load_progress()
-        data.append({"module": module, "input": user_input, "feedback": ai_feedback})
-
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-        logger.info(f"Saved user progress for module: {module}")
+        _append({"module": module, "input": user_input, "feedback": ai_feedback})
+        logger.info("Saved user progress for module: %s", module)
     except Exception as e:
         logger.error(f"Error saving user progress: {e}")
 
-def save_presentation_feedback(presentation: str, feedback: str):
-    """Save presentation assessments."""
+def save_presentation_feedback(presentation: str, feedback: str, scores: dict = None):
+    """Save presentation assessments, with their structure/delivery/content scores when known."""
     try:
-        data = load_progress()
-        data.append({"type": "presentation", "input": presentation, "feedback": feedback})
-
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        _append({"type": "presentation", "input": presentation, "feedback": feedback, "scores": scores})
         logger.info("Saved presentation feedback")
     except Exception as e:
         logger.error(f"Error saving presentation feedback: {e}")
 
-def load_progress():
-    """Load progress tracking file."""
+def query_progress(module: str = None, record_type: str = None, since: float = None, until: float = None, limit: int = None) -> list:
+    """Look up progress records through the module/type/timestamp indexes, oldest first."""
+    clauses, params = [], []
+    if module is not None:
+        clauses.append("module = ?")
+        params.append(module)
+    if record_type is not None:
+        clauses.append("type = ?")
+        params.append(record_type)
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    sql = "SELECT * FROM progress"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY created_at, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
     try:
-        if not os.path.exists(DB_FILE):
-            return []
-
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.warning(f"Database file not found: {DB_FILE}")
-        return []
-    except json.JSONDecodeError:
-        logger.error(f"Error decoding JSON from {DB_FILE}.  Returning empty list.  Consider manual inspection/correction of the file.")
-        return []
+        return [_to_record(row) for row in get_connection().execute(sql, params)]
     except Exception as e:
         logger.error(f"Error loading progress: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def load_progress():
+    """Load every progress record."""
+    return query_progress()
+
+def save_job(record: dict):
+    """Insert or update a background job. Columns are indexed fields; everything else is kept as JSON in `data`."""
+    data = {key: value for key, value in record.items() if key not in JOB_COLUMNS}
+    conn = get_connection()
+    with conn:
+        conn.execute(SAVE_JOB_SQL, [record[column] for column in JOB_COLUMNS] + [json.dumps(data)])
+
+def _job_record(row: sqlite3.Row) -> dict:
+    record = {column: row[column] for column in JOB_COLUMNS}
+    record.update(json.loads(row["data"]))
+    return record
+
+def load_job(job_id: str):
+    """A background job by id, or None."""
+    row = get_connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_record(row) if row else None
+
+def load_jobs(statuses: tuple) -> list:
+    """Background jobs in any of `statuses`, oldest first."""
+    sql = f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(statuses))}) ORDER BY created_at"
+    return [_job_record(row) for row in get_connection().execute(sql, statuses)]
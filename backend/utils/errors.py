@@ -0,0 +1,34 @@
+import math
+from fastapi import HTTPException
+from openai import RateLimitError, AuthenticationError, BadRequestError, OpenAIError
+from utils.rate_limiter import RateLimitQueueFull
+from utils.token_budget import InputTooLong
+
+OPENAI_ERROR = "An error occurred with the OpenAI service. Please try again later."
+UNEXPECTED_ERROR = "An unexpected error occurred. Please try again later."
+
+# The status and message an error is answered with, by the endpoints, in job results and per batch item
+HTTP_ERRORS = (
+    (RateLimitQueueFull, 503, "The service is busy. Please try again shortly."),
+    (RateLimitError, 429, "Rate limit exceeded. Please try again later."),
+    (AuthenticationError, 401, "Authentication error. Please check your API key."),
+    (BadRequestError, 400, "Bad request. Please check your input."),
+    (OpenAIError, 500, OPENAI_ERROR),
+)
+
+
+def http_error(e: Exception) -> HTTPException:
+    """The HTTPException an error is answered with; HTTPExceptions are returned as they are."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, InputTooLong):
+        return HTTPException(status_code=413, detail=f"Input is too long ({e.tokens} tokens; the limit is {e.limit}). Please shorten it.")
+    for error_type, status_code, message in HTTP_ERRORS:
+        if isinstance(e, error_type):
+            headers = {"Retry-After": str(math.ceil(e.retry_after))} if isinstance(e, RateLimitQueueFull) else None
+            return HTTPException(status_code=status_code, detail=message, headers=headers)
+    return HTTPException(status_code=500, detail=UNEXPECTED_ERROR)
+
+def error_detail(e: Exception) -> str:
+    """The message a client is shown for an error reported in a body rather than a status (jobs, batch items)."""
+    return http_error(e).detail
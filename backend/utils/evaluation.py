@@ -0,0 +1,189 @@
+import ast
+import json
+import re
+import threading
+from pydantic import BaseModel, Field, ValidationError
+
+SCORE_FIELDS = ("structure_score", "delivery_score", "content_score")
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+# Scores in JSON, a Python-style dict or prose ("Structure: 8/10")
+LOOSE_SCORE = re.compile(r"""["'*]*\b(structure|delivery|content)(?:[_ ]score)?["'*]*\s*[:=]\s*["'*]*\s*(\d+(?:\.\d+)?)""", re.IGNORECASE)
+REPORT_STRING = re.compile(r'"full_report"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+# A score in streamed JSON, once its number is complete
+STREAM_SCORE = re.compile(r'"(structure_score|delivery_score|content_score)"\s*:\s*(\d+)\s*[,}\n]')
+STREAM_OVERLAP = 64  # Characters rescanned in case a score straddles two deltas
+
+
+class PresentationScores(BaseModel):
+    """The evaluation the model is asked to return."""
+
+    structure_score: int = Field(ge=0, le=10)
+    delivery_score: int = Field(ge=0, le=10)
+    content_score: int = Field(ge=0, le=10)
+    full_report: str
+
+
+# Schema-constrained output; strict mode requires every property and no others
+EVALUATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "presentation_evaluation",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                **{field: {"type": "integer", "description": "Score out of 10"} for field in SCORE_FIELDS},
+                "full_report": {"type": "string"},
+            },
+            "required": [*SCORE_FIELDS, "full_report"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Several evaluations in one reply, with the ids of the presentations they answer (see batch.py)
+BATCH_EVALUATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "presentation_evaluations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "evaluations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string", "description": "Id of the presentation"},
+                            **EVALUATION_RESPONSE_FORMAT["json_schema"]["schema"]["properties"],
+                        },
+                        "required": ["id", *SCORE_FIELDS, "full_report"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["evaluations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _score(value):
+    try:
+        score = round(float(value))
+    except (TypeError, ValueError):
+        return None
+    return score if 0 <= score <= 10 else None
+
+def _as_dict(text: str):
+    """The first {...} block of `text` as a dict, accepting JSON or a Python-style literal."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    block = text[start:end + 1]
+    for load in (json.loads, ast.literal_eval):
+        try:
+            value = load(block)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+def _report(raw: str, data: dict) -> str:
+    report = data.get("full_report") if data else None
+    if isinstance(report, str):
+        return report
+    if isinstance(report, dict):  # A report split by category
+        return "\n".join(f"{key.capitalize()}: {value}" for key, value in report.items())
+    match = REPORT_STRING.search(raw)
+    if match:  # Possibly cut short by max_tokens
+        try:
+            return json.loads(f'"{match.group(1)}"')
+        except json.JSONDecodeError:
+            return match.group(1)
+    return raw.strip()
+
+
+class EvaluationParser:
+    """
+    Turns a model's evaluation into a feedback dict with integer scores.
+
+    Schema-constrained output validates on the fast path. Anything else is
+    repaired where possible: code fences, single-quoted dicts, surrounding
+    prose, string or fractional scores, "Structure: 8/10", reports split by
+    category and output cut off after the scores. Scores that cannot be found
+    are left out, so a reply with no scores at all still yields
+    {"full_report": ...}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"valid": 0, "repaired": 0, "partial": 0, "failed": 0}
+
+    def parse(self, raw: str) -> dict:
+        try:
+            feedback = PresentationScores.model_validate_json(raw).model_dump()
+            self._count("valid")
+            return feedback
+        except ValidationError:
+            pass
+
+        text = CODE_FENCE.sub("", raw.strip())
+        data = _as_dict(text)
+        scores = {}
+        if data:
+            scores = {field: _score(data.get(field, data.get(field.split("_")[0]))) for field in SCORE_FIELDS}
+            scores = {field: score for field, score in scores.items() if score is not None}
+        for match in LOOSE_SCORE.finditer(text):
+            field = f"{match.group(1).lower()}_score"
+            if field not in scores and _score(match.group(2)) is not None:
+                scores[field] = _score(match.group(2))
+
+        feedback = {field: scores[field] for field in SCORE_FIELDS if field in scores}
+        feedback["full_report"] = _report(text, data)
+        self._count("repaired" if len(scores) == len(SCORE_FIELDS) else "partial" if scores else "failed")
+        return feedback
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats["failure_rate"] = round((stats["partial"] + stats["failed"]) / total, 3) if total else 0.0
+        return stats
+
+
+class ScoreStreamParser:
+    """Picks scores out of a streamed JSON evaluation as soon as each number is complete."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.scores = {}
+        self._scanned = 0
+
+    def feed(self, delta: str) -> dict:
+        """Add a delta; returns the scores that became known with it."""
+        self.buffer += delta
+        if len(self.scores) == len(SCORE_FIELDS):
+            return {}
+        found = {}
+        for match in STREAM_SCORE.finditer(self.buffer, max(0, self._scanned - STREAM_OVERLAP)):
+            field, score = match.group(1), _score(match.group(2))
+            if field not in self.scores and score is not None:
+                self.scores[field] = found[field] = score
+        self._scanned = len(self.buffer)
+        return found
+
+
+parser = EvaluationParser()
+
+def scores_of(feedback: dict) -> dict:
+    """The scores in a feedback dict, or None if it has none."""
+    scores = {field: feedback[field] for field in SCORE_FIELDS if field in feedback}
+    return scores or None
@@ -1,79 +1,169 @@
 from gtts import gTTS
 import os
+import copy
 import json
-import openai
 from openai import RateLimitError, OpenAIError
-from utils.constants import OPENAI_API_KEY, OPENAI_ORGANIZATION, OPENAI_PROJECT, XAI_API_KEY, MODEL_NAME
-from utils.database import save_presentation_feedback
-import time
+from utils.constants import MODEL_NAME
+from prompts.assembly import EVALUATION, prompt_usage
+from prompts.prompt_templates import PRESENTATION_INPUT, METRICS_INPUT
+from utils.metrics import provider_retries, timed
+from utils.evaluation import EVALUATION_RESPONSE_FORMAT, ScoreStreamParser, parser as evaluation_parser, scores_of
+from utils.progress_writer import queue_presentation_feedback
+from utils.providers import create_chat_completion
+from utils.rate_limiter import RateLimitQueueFull, backoff_delay, retry_after_seconds
+from utils.response_cache import response_cache
+from utils.single_flight import SingleFlight
+from utils.token_budget import token_budget
+from utils.tts_cache import tts_cache
+import asyncio
+import inspect
 from fastapi import HTTPException
 from config import logger
 
 
-# client = openai.OpenAI(
-#     api_key=OPENAI_API_KEY,
-#     organization=OPENAI_ORGANIZATION,
-#     project=OPENAI_PROJECT
-# )
+evaluation_flight = SingleFlight("evaluation")
 
-client = openai.OpenAI(
-    api_key=OPENAI_API_KEY
-)
+def evaluation_cache_key(presentation_text: str, method: str, metrics: dict) -> str:
+    return response_cache.key(
+        "evaluation", MODEL_NAME, EVALUATION.version, presentation_text,
+        method=method, metrics=metrics
+    )
 
-# client = openai.OpenAI(
-#     api_key=XAI_API_KEY,
-#     base_url="https://api.x.ai/v1"
-# )
+def evaluation_messages(presentation_text: str, method: str, metrics: dict) -> tuple:
+    """The evaluation messages and max_tokens; raises InputTooLong before anything is sent if the presentation is over budget."""
+    metrics_input = METRICS_INPUT.format(metrics=json.dumps(metrics)) if metrics else ""
+    # The template's wording and the metrics are sent in full, so only the presentation itself is shortened
+    fixed_input = PRESENTATION_INPUT.format(method=method, presentation_text="") + metrics_input
+    fitted_text, max_tokens = token_budget.fit(presentation_text, EVALUATION.system, MODEL_NAME, "evaluation", fixed_input)
+    user_input = PRESENTATION_INPUT.format(method=method, presentation_text=fitted_text) + metrics_input
+    return EVALUATION.messages(user_input), max_tokens
 
+def voice_feedback_prompt(transcript: str, metrics: dict = None) -> str:
+    # Modified prompt to include vocal delivery analysis
+    prompt = f"Analyze this speech transcription:\n{transcript}\nProvide feedback on vocal delivery, including pacing, filler words, and clarity. Also provide general feedback on the content."
+    if metrics:
+        prompt += f"\nBase the pacing and filler word feedback on these measured delivery metrics:\n{json.dumps(metrics)}"
+    return prompt
 
-def evaluate_presentation(presentation_text: str, method: str = "text") -> dict:
-    """Evaluate user's presentation and return structured feedback."""
-    prompt = f"Analyze this {method} presentation:\n{presentation_text}\nProvide feedback on structure, delivery, and content. Return a JSON object with scores out of 10 for each category, and a full report. Example: {{'structure_score': 8, 'delivery_score': 9, 'content_score': 7, 'full_report': '...'}}"
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[{"role": "user", "content": prompt}]
+def save_evaluation(presentation_text: str, feedback: dict):
+    queue_presentation_feedback(presentation_text, feedback.get("full_report", json.dumps(feedback)), scores_of(feedback))
+
+@timed("evaluate")
+async def evaluate_presentation(presentation_text: str, method: str = "text", metrics: dict = None, use_cache: bool = True,
+                                save: bool = True) -> dict:
+    """Evaluate user's presentation and return structured feedback.
+
+    `metrics` are locally measured delivery metrics (see speech_analytics.py) given to the model as facts.
+    The reply is constrained to the evaluation schema and parsed into integer scores (see evaluation.py).
+    Identical presentations are answered from the response cache unless `use_cache` is False.
+    The assessment is queued for the progress database unless `save` is False (batches write their own).
+    """
+    cache_key = evaluation_cache_key(presentation_text, method, metrics)
+    cached = await response_cache.aget(cache_key, bypass=not use_cache)
+    if cached is not None:
+        if save:
+            save_evaluation(presentation_text, cached)
+        return cached
+
+    messages, max_tokens = evaluation_messages(presentation_text, method, metrics)
+
+    async def evaluate():
+        response = await create_chat_completion(
+            messages, MODEL_NAME, max_tokens=max_tokens, response_format=EVALUATION_RESPONSE_FORMAT
         )
-        feedback_json = response.choices[0].message.content
-        try:
-          feedback = json.loads(feedback_json)
-        except json.JSONDecodeError:
-          feedback = {"full_report": feedback_json}
-        save_presentation_feedback(presentation_text, feedback.get("full_report", feedback_json))
+        prompt_usage.record(EVALUATION, response)
+        feedback = evaluation_parser.parse(response.choices[0].message.content)
+        await response_cache.aset(cache_key, feedback)
+        return feedback
+
+    try:
+        # Concurrent identical presentations share one evaluation; each caller gets its own copy
+        feedback = copy.deepcopy(await evaluation_flight.run(cache_key, evaluate))
+        if save:
+            save_evaluation(presentation_text, feedback)
         return feedback
+    except (RateLimitError, RateLimitQueueFull):
+        raise  # Let safe_api_call back off and retry, or the endpoint answer 503
     except Exception as e:
         logger.error(f"Error evaluating presentation: {e}")
         raise HTTPException(status_code=500, detail="Error evaluating presentation.")
 
+async def stream_evaluation(presentation_text: str, method: str = "text", metrics: dict = None, use_cache: bool = True):
+    """
+    Start a streamed evaluation and return an async iterator of events: a "score"
+    event as soon as each score is complete in the stream, then "done" with the
+    parsed feedback, or "error". Errors opening the stream are raised here.
+    """
+    cache_key = evaluation_cache_key(presentation_text, method, metrics)
+    cached = await response_cache.aget(cache_key, bypass=not use_cache)
+    if cached is not None:
+        async def replay():
+            for field, score in (scores_of(cached) or {}).items():
+                yield {"type": "score", "name": field, "value": score}
+            save_evaluation(presentation_text, cached)
+            yield {"type": "done", "feedback": cached}
+        return replay()
+
+    messages, max_tokens = evaluation_messages(presentation_text, method, metrics)
+    stream = await create_chat_completion(
+        messages, MODEL_NAME, max_tokens=max_tokens, response_format=EVALUATION_RESPONSE_FORMAT, stream=True
+    )
+
+    async def events():
+        scores = ScoreStreamParser()
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    for field, score in scores.feed(chunk.choices[0].delta.content).items():
+                        yield {"type": "score", "name": field, "value": score}
+        except Exception as e:
+            logger.error(f"Error while streaming evaluation: {e}")
+            yield {"type": "error", "detail": "The evaluation stream was interrupted. Please try again."}
+            return
+        feedback = evaluation_parser.parse(scores.buffer)
+        await response_cache.aset(cache_key, feedback)
+        save_evaluation(presentation_text, feedback)
+        yield {"type": "done", "feedback": feedback}
+
+    return events()
+
+@timed("tts")
 def text_to_speech(text: str, output_file: str = None):
     """Convert AI feedback to speech for audio feedback."""
     if output_file is None:
-        output_file = f"audio_files/output_{time.time()}.mp3"
-    os.makedirs("audio_files", exist_ok=True)
+        # Identical feedback is served from the content-addressed cache
+        return tts_cache.get_or_create(text, lang='en')
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
     tts = gTTS(text=text, lang='en')
     tts.save(output_file)
     return output_file.split("/")[-1]
 
-def safe_api_call(func, *args, max_retries=5, initial_delay=1, **kwargs):
-    """Retries OpenAI API calls with exponential backoff."""
+async def safe_api_call(func, *args, max_retries=5, initial_delay=1, **kwargs):
+    """Retries OpenAI API calls with jittered exponential backoff without blocking the event loop.
+
+    Coroutine functions are awaited directly; plain functions run in a worker thread.
+    A Retry-After hint from the provider takes precedence over the exponential delay.
+    """
     retries = 0
-    delay = initial_delay
 
     while retries < max_retries:
         try:
-            return func(*args, **kwargs)
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
         except RateLimitError as e:
             retries += 1
             if retries == max_retries:
                 logger.error(f"Max retries reached. OpenAI RateLimitError: {e}")
                 raise  # Re-raise the exception
-            logger.warning(f"RateLimitError: Retrying in {delay} seconds (attempt {retries}/{max_retries}).")
-            time.sleep(delay)
-            delay *= 2  # Exponential backoff
+            delay = backoff_delay(retries, initial_delay, retry_after_seconds(e.response.headers))
+            provider_retries.inc(getattr(func, "__name__", "call"))
+            logger.warning(f"RateLimitError: Retrying in {delay:.2f} seconds (attempt {retries}/{max_retries}).")
+            await asyncio.sleep(delay)
         except OpenAIError as e:
             logger.error(f"OpenAIError: {e}")
             raise e #re raise other openAI errors.
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             raise e
-    return None
\ No newline at end of file
+    return None
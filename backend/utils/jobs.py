@@ -0,0 +1,305 @@
+import asyncio
+import functools
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from utils import database
+from utils.errors import error_detail
+from utils.voice_pipeline import assess_voice, voice_feedback
+from utils.constants import JOB_WORKERS, JOB_QUEUE_MAX, JOB_AUDIO_DIR, JOB_RESULT_TTL, JOB_DEFAULT_PRIORITY
+from config import logger
+
+UNFINISHED = ("queued", "running")
+FINISHED = ("done", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while `max_queued` jobs are already waiting."""
+
+    def __init__(self, queued: int):
+        super().__init__(f"{queued} jobs are already queued")
+        self.queued = queued
+
+
+class Job:
+    """One queued voice request: its uploaded audio, per-stage progress and, once finished, its result or error."""
+
+    def __init__(self, kind: str, user: str, priority: int, params: dict, stages: tuple,
+                 job_id: str = None, created_at: float = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.user = user
+        self.priority = priority
+        self.params = params
+        self.audio_path = None
+        self.created_at = created_at or time.time()
+        self.updated_at = self.created_at
+        self.status = "queued"
+        self.stage = None
+        self.stages = {name: {"status": "pending"} for name in stages}
+        self.result = None
+        self.error = None
+
+    def to_record(self) -> dict:
+        return {
+            "id": self.id, "created_at": self.created_at, "updated_at": self.updated_at, "kind": self.kind,
+            "user": self.user, "priority": self.priority, "status": self.status, "stage": self.stage,
+            "stages": self.stages, "params": self.params, "audio_path": self.audio_path,
+            "result": self.result, "error": self.error,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Job":
+        job = cls(record["kind"], record["user"], record["priority"], record["params"], (), record["id"], record["created_at"])
+        for field in ("updated_at", "status", "stage", "stages", "audio_path", "result", "error"):
+            setattr(job, field, record[field])
+        return job
+
+    def view(self) -> dict:
+        """The job as clients see it."""
+        return {
+            "job_id": self.id, "kind": self.kind, "status": self.status, "stage": self.stage, "stages": self.stages,
+            "result": self.result, "error": self.error, "created_at": self.created_at, "updated_at": self.updated_at,
+        }
+
+
+class FairQueue:
+    """
+    Jobs waiting to run. Higher priorities go first; within a priority, users
+    take turns, so one user's batch of recordings cannot hold up everyone else.
+    """
+
+    def __init__(self):
+        self._levels = {}  # priority -> OrderedDict(user -> deque of jobs), next user first
+        self._size = 0
+
+    def push(self, job: Job):
+        users = self._levels.setdefault(job.priority, OrderedDict())
+        users.setdefault(job.user, deque()).append(job)
+        self._size += 1
+
+    def pop(self):
+        """The next job to run, or None if none are waiting."""
+        if not self._levels:
+            return None
+        priority = max(self._levels)
+        users = self._levels[priority]
+        user, jobs = next(iter(users.items()))
+        job = jobs.popleft()
+        if jobs:
+            users.move_to_end(user)
+        else:
+            del users[user]
+            if not users:
+                del self._levels[priority]
+        self._size -= 1
+        return job
+
+    def __len__(self) -> int:
+        return self._size
+
+
+async def run_pipeline(pipeline, job: Job, stage) -> dict:
+    """Run a voice pipeline (see voice_pipeline.py) on a job's stored audio, reporting each stage through `stage`."""
+    with open(job.audio_path, "rb") as audio_file:
+        return await pipeline(audio_file, job.params["audio_format"], job.params.get("mode", "full"), stage)
+
+# Job kind -> (stages, pipeline)
+PIPELINES = {
+    "assess_voice": (("normalize", "transcribe", "evaluate"), functools.partial(run_pipeline, assess_voice)),
+    "voice": (("normalize", "transcribe", "respond", "speech"), functools.partial(run_pipeline, voice_feedback)),
+}
+
+
+class JobQueue:
+    """
+    Runs queued voice requests on a fixed pool of `workers` asyncio tasks.
+
+    Every job is written to the database when it is submitted and at each stage,
+    and its audio is kept in `audio_dir` until it finishes, so jobs that were
+    queued or running when the server stopped are queued again on the next start.
+    Finished jobs stay in memory for `result_ttl` seconds and are read back from
+    the database after that.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_MAX, audio_dir: str = JOB_AUDIO_DIR,
+                 result_ttl: float = JOB_RESULT_TTL, pipelines: dict = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.audio_dir = audio_dir
+        self.result_ttl = result_ttl
+        self.pipelines = pipelines or PIPELINES
+        self._jobs = {}  # Unfinished and recently finished jobs by id
+        self._queue = FairQueue()
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+        self._recovered = False
+        self._running = 0
+        self._stats = {"submitted": 0, "recovered": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    async def start(self):
+        """Start the workers on the running loop, first queueing jobs a previous run left unfinished."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        if not self._recovered:
+            self._recovered = True
+            await self._recover()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        if len(self._queue):
+            self._wakeup.set()
+
+    async def stop(self):
+        """Cancel the workers. Jobs they were running go back to the queue."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, kind: str, audio_file, audio_format: str, params: dict = None,
+                     user: str = "anonymous", priority: int = JOB_DEFAULT_PRIORITY) -> Job:
+        """Keep the audio, record the job and queue it. Raises JobQueueFull if too many jobs are waiting."""
+        if len(self._queue) >= self.max_queued:
+            self._stats["rejected"] += 1
+            raise JobQueueFull(len(self._queue))
+        await self.start()
+        stages, _ = self.pipelines[kind]
+        job = Job(kind, user, priority, dict(params or {}, audio_format=audio_format), stages)
+        job.audio_path = os.path.join(self.audio_dir, f"{job.id}.{audio_format}")
+        await asyncio.to_thread(self._keep_audio, audio_file, job)
+        self._jobs[job.id] = job
+        self._queue.push(job)
+        self._stats["submitted"] += 1
+        self._wakeup.set()
+        logger.info("Queued %s job %s for %s at priority %s (%s waiting)", kind, job.id, user, priority, len(self._queue))
+        return job
+
+    def _keep_audio(self, audio_file, job: Job):
+        os.makedirs(self.audio_dir, exist_ok=True)
+        audio_file.seek(0)
+        with open(job.audio_path, "wb") as f:
+            shutil.copyfileobj(audio_file, f)
+        database.save_job(job.to_record())
+
+    async def get(self, job_id: str):
+        """A job's client view, from memory or else the database, or None."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            record = await asyncio.to_thread(database.load_job, job_id)
+            if record is None:
+                return None
+            job = Job.from_record(record)
+        return job.view()
+
+    async def _recover(self):
+        records = await asyncio.to_thread(database.load_jobs, UNFINISHED)
+        for record in records:
+            if record["id"] in self._jobs:
+                continue
+            job = Job.from_record(record)
+            self._requeue(job)
+            if not os.path.exists(job.audio_path or ""):
+                job.status, job.error = "failed", "The job's audio was lost. Please submit it again."
+                await self._save(job)
+                continue
+            self._jobs[job.id] = job
+            self._queue.push(job)
+            self._stats["recovered"] += 1
+        if self._stats["recovered"]:
+            logger.info("Recovered %s unfinished jobs", self._stats['recovered'])
+
+    @staticmethod
+    def _requeue(job: Job):
+        job.status, job.stage = "queued", None
+        for progress in job.stages.values():
+            if progress["status"] == "running":
+                progress.clear()
+                progress["status"] = "pending"
+
+    async def _save(self, job: Job):
+        job.updated_at = time.time()
+        await asyncio.to_thread(database.save_job, job.to_record())
+
+    async def _work(self):
+        while True:
+            job = self._queue.pop()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:  # Keep the worker alive for the next job
+                logger.exception(f"Worker could not finish job {job.id}: {e}")
+
+    async def _run(self, job: Job):
+        _, pipeline = self.pipelines[job.kind]
+        self._running += 1
+        try:
+            job.status = "running"
+            await self._save(job)
+            job.result = await pipeline(job, lambda name: self._stage(job, name))
+            job.status = "done"
+        except asyncio.CancelledError:
+            # Shutting down: run it again on the next start
+            self._requeue(job)
+            self._queue.push(job)
+            try:
+                await self._save(job)
+            except Exception as e:  # It is still in the database as running, so it is recovered either way
+                logger.error(f"Could not requeue job {job.id}: {e}")
+            raise
+        except Exception as e:
+            job.status, job.error = "failed", error_detail(e)
+            logger.error(f"Job {job.id} failed in stage {job.stage}: {e}")
+        finally:
+            self._running -= 1
+
+        try:
+            await self._finish(job)
+        except Exception as e:
+            logger.error(f"Could not record the end of job {job.id}: {e}")
+
+    async def _finish(self, job: Job):
+        job.stage = None
+        for progress in job.stages.values():
+            if progress["status"] == "pending":
+                progress["status"] = "skipped"
+        self._stats[job.status] += 1
+        await self._save(job)
+        logger.info("Job %s %s after %.2fs", job.id, job.status, job.updated_at - job.created_at)
+        try:
+            os.remove(job.audio_path)
+        except OSError as e:
+            logger.warning(f"Could not remove audio for job {job.id}: {e}")
+        self._prune()
+
+    @asynccontextmanager
+    async def _stage(self, job: Job, name: str):
+        job.stage = name
+        job.stages[name] = {"status": "running"}
+        await self._save(job)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            job.stages[name] = {"status": "failed", "seconds": round(time.perf_counter() - start, 3)}
+            raise
+        job.stages[name] = {"status": "done", "seconds": round(time.perf_counter() - start, 3)}
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED and job.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        return dict(self._stats, queued=len(self._queue), running=self._running, workers=len(self._tasks))
+
+
+job_queue = JobQueue()
@@ -0,0 +1,151 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from utils.constants import LOG_FORMAT, LOG_MAX_FIELD_CHARS, LOG_DEBUG_SAMPLE_RATE
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+MAX_SAMPLED_MESSAGES = 1000
+
+_listener = None
+_handler = None
+
+
+def clip(text: str, limit: int = LOG_MAX_FIELD_CHARS) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def parse_level(name: str):
+    """A logging level from its name ("warning") or number ("30"), or None if it is neither."""
+    name = name.strip()
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name.upper())
+    return level if isinstance(level, int) else None
+
+
+class TruncatingFilter(logging.Filter):
+    """Cuts long arguments (prompts, transcripts, responses) and long messages down to `limit` characters."""
+
+    def __init__(self, limit: int = LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.limit = limit
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.args and isinstance(record.args, tuple):
+            # Only strings are cut, so %d, %r and the like still get the objects they expect
+            record.args = tuple(clip(arg, self.limit) if isinstance(arg, str) else arg for arg in record.args)
+        elif isinstance(record.msg, str) and len(record.msg) > self.limit:
+            record.msg = clip(record.msg, self.limit)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes one in every 1/`rate` DEBUG records per message template, so a debug
+    line logged on every request costs a counter increment most of the time.
+    Records at INFO and above always pass.
+    """
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        key = (record.name, record.msg)
+        with self._lock:
+            if len(self._counts) >= MAX_SAMPLED_MESSAGES:
+                self._counts.clear()
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for the listener thread having only merged the message with its
+    arguments. Unlike QueueHandler it does not copy the record or format the
+    traceback here; both are left to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()  # Arguments may change once the caller moves on
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, any `extra=` fields and the traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: int, stream=None, log_format: str = LOG_FORMAT, sample_rate: float = LOG_DEBUG_SAMPLE_RATE,
+                      max_field_chars: int = LOG_MAX_FIELD_CHARS, queued: bool = True) -> logging.Handler:
+    """
+    Route the root logger through a queue to a listener thread that does the
+    formatting and the writes, so requests never wait on log I/O. Records below
+    `level` are discarded before any message is built; the rest are sampled
+    (DEBUG only) and truncated on the way in. Returns the handler on the root logger.
+    """
+    global _listener, _handler
+    # Skip per-record work the formats never show (see "Optimization" in the logging HOWTO)
+    logging._srcfile = None  # Caller file and line lookup
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    if queued:
+        handler = LazyQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = output
+    handler.addFilter(SamplingFilter(sample_rate))
+    handler.addFilter(TruncatingFilter(max_field_chars))
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    root.addHandler(handler)
+    root.setLevel(level)
+    _handler = handler
+    return handler
+
+def flush_logs():
+    """Write out everything queued so far and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(flush_logs)
@@ -0,0 +1,239 @@
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from utils.constants import METRICS_PREFIX, LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in values.items():
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets per label combination, as
+    Prometheus histograms are. Observing is a bisect and an increment under a lock.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        """Context manager (sync or async) observing the time spent inside it; the last label is its outcome."""
+        return Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            series = {label_values: list(counts) for label_values, counts in self._series.items()}
+        for label_values, counts in series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(counts[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class Timer:
+    """Times a block into a histogram, adding an "ok" or "error" outcome label."""
+
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "ok" if exc_type is None else "error"
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values, outcome)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class Registry:
+    """The metrics to expose, rendered in the Prometheus text format on demand."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, stats: dict = None) -> str:
+        """
+        Every registered metric, plus the numeric values of a /stats/-style dict as
+        `stat` gauges (cache sizes, queue depths and the like), which are read at
+        scrape time rather than tracked on the hot path.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        if stats is not None:
+            name = f"{METRICS_PREFIX}_stat"
+            lines.append(f"# HELP {name} Runtime counters and gauges reported by /stats/")
+            lines.append(f"# TYPE {name} gauge")
+            for section, key, value in _flatten(stats):
+                lines.append(f"{name}{_labels(('section', 'key'), (section, key))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: dict, section: str = None, prefix: str = ""):
+    """(section, dotted key, number) for every numeric leaf of a nested stats dict."""
+    for key, value in stats.items():
+        if section is None:
+            yield from _flatten(value, key) if isinstance(value, dict) else ()
+        elif isinstance(value, dict):
+            yield from _flatten(value, section, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):  # bools count as 0/1
+            yield section, f"{prefix}{key}", int(value) if isinstance(value, bool) else value
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route template and status, including streamed bodies",
+    ("method", "route", "status")
+))
+stage_seconds = registry.register(Histogram(
+    "stage_duration_seconds", "Time spent in each processing stage of a request", ("stage", "outcome")
+))
+provider_seconds = registry.register(Histogram(
+    "provider_request_duration_seconds", "Provider call latency, from after rate limiting until the response headers arrive",
+    ("provider", "model", "operation", "outcome")
+))
+provider_retries = registry.register(Counter(
+    "provider_retries_total", "Provider calls retried by safe_api_call after a rate-limit error", ("function",)
+))
+tokens = registry.register(Counter(
+    "tokens_total", "Tokens reported in completion usage, by kind (prompt, completion, cached)", ("provider", "model", "kind")
+))
+
+def span(stage: str) -> Timer:
+    """Time a stage: `with span("transcribe"): ...` or `async with span(...)`."""
+    return stage_seconds.time(stage)
+
+def timed(stage: str):
+    """Decorator timing every call of a function, sync or async, as `stage`."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage_seconds.time(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_seconds.time(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_usage(provider: str, model: str, usage):
+    """Count the prompt, completion and provider-cached tokens of a completion's usage."""
+    if usage is None:
+        return
+    tokens.inc(provider, model, "prompt", amount=usage.prompt_tokens or 0)
+    tokens.inc(provider, model, "completion", amount=usage.completion_tokens or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached:
+        tokens.inc(provider, model, "cached", amount=cached)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each request's duration by method, route template
+    (so /jobs/{job_id} is one series, not one per job) and status code.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start, scope["method"], getattr(route, "path", "unmatched"), str(status)
+            )
@@ -1,80 +1,242 @@
 import openai
-from utils.constants import MODEL_NAME, OPENAI_API_KEY
-from prompts.prompt_templates import PROMPTS
-from utils.database import save_user_progress
+from utils.constants import MODEL_NAME, OPENAI_API_KEY, ROUTER_MODEL, SESSION_SUMMARY_MAX_TOKENS
+from prompts.assembly import SUMMARY, get_prompt, prompt_usage
+from prompts.prompt_templates import SUMMARY_INPUT
+from utils.errors import OPENAI_ERROR, UNEXPECTED_ERROR
+from utils.metrics import timed
+from utils.progress_writer import queue_user_progress
+from utils.providers import create_chat_completion, create_transcription
+from utils.rate_limiter import RateLimitQueueFull
+from utils.response_cache import response_cache
+from utils.router import router
+from utils.sessions import Session, session_store
+from utils.single_flight import SingleFlight
+from utils.token_budget import token_budget
+from utils.transcription import TranscriptionFailed, transcribe_in_segments
 from config import logger
+import asyncio
+import hashlib
 import io
 
-# client = openai.OpenAI(
-#     api_key=OPENAI_API_KEY,
-#     organization=OPENAI_ORGANIZATION,
-#     project=OPENAI_PROJECT
-# )
+response_flight = SingleFlight("ai_response")
+transcription_flight = SingleFlight("transcription")
 
-client = openai.OpenAI(
-    api_key=OPENAI_API_KEY
-)
+def build_messages(user_input: str, role: str) -> list:
+    """The role's precompiled system message followed by the user's input."""
+    logger.debug("Using prompt %s for input: %s", role, user_input)
+    return get_prompt(role).messages(user_input)
 
-# client = openai.OpenAI(
-#     api_key=XAI_API_KEY,
-#     base_url="https://api.x.ai/v1"
-# )
+def response_cache_key(user_input: str, role: str, model_name: str) -> str:
+    """Cache key for a role's response, tied to the compiled prompt's version."""
+    return response_cache.key("response", model_name, get_prompt(role).version, user_input)
 
-def get_ai_response(user_input: str, role: str, api_key: str, model_name: str) -> str:
+async def request_completion(messages: list, model_name: str, api_key: str = None, **kwargs):
+    """A chat completion from `model_name`, or from the model the router picks for "auto"."""
+    if model_name == ROUTER_MODEL:
+        return await router.call(lambda model: create_chat_completion(messages, model, **kwargs))
+    return await create_chat_completion(messages, model_name, api_key=api_key, **kwargs)
+
+@timed("respond")
+async def get_ai_response(user_input: str, role: str, api_key: str, model_name: str, use_cache: bool = True) -> str:
     """
     Generate AI response based on the user's message and selected role.
-    The prompt is built using templates from prompt_templates.py.
+    The role's compiled system prompt precedes the input (see prompts/assembly.py).
+    Identical inputs are answered from the response cache unless `use_cache` is
+    False. With `model_name` "auto" the router picks the provider, and may hedge.
     """
 
     logger.info("Generating AI response")
+    cache_key = response_cache_key(user_input, role, model_name)
+    cached = await response_cache.aget(cache_key, bypass=not use_cache)
+    if cached is not None:
+        queue_user_progress(user_input, cached, role)
+        return cached
 
     # # Testing
     # logger.debug(f"Key: {OPENAI_API_KEY}")
     # logger.debug(f"client: {client}")
 
-    # Use the corresponding prompt template or default to 'speech_coach'
-    prompt_template = PROMPTS.get(role, PROMPTS.get("speech_coach"))
-    prompt = f"{prompt_template}\nUser: {user_input}\nAI:"
-    logger.debug(f"Using prompt: {prompt}")
+    # Raises InputTooLong before anything is sent if the input is over budget
+    fitted_input, max_tokens = token_budget.fit(user_input, get_prompt(role).system, model_name, role)
+    messages = build_messages(fitted_input, role)
+
+    async def complete():
+        response = await request_completion(messages, model_name, api_key, max_tokens=max_tokens)
+        prompt_usage.record(get_prompt(role), response)
+        ai_response = response.choices[0].message.content
+        logger.debug("Received ai_response: %s", ai_response)
+        await response_cache.aset(cache_key, ai_response)
+        return ai_response
 
     try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": prompt}]
+        # Concurrent identical requests share one completion
+        ai_response = await response_flight.run(cache_key, complete)
+        # Hand progress to the background writer so disk I/O stays off the request path
+        queue_user_progress(user_input, ai_response, role)
+        return ai_response
+    except (openai.RateLimitError, RateLimitQueueFull):
+        raise  # Let safe_api_call back off and retry, or the endpoint answer 503
+    except openai.OpenAIError as e:
+        logger.error(f"OpenAI error: {e}")
+        return OPENAI_ERROR
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        return UNEXPECTED_ERROR
+
+async def stream_ai_response(user_input: str, role: str, api_key: str, model_name: str, use_cache: bool = True):
+    """
+    Start a streamed completion and return an async iterator over its text deltas.
+    Provider errors while opening the stream, and InputTooLong, are raised here, so
+    callers can still map them to HTTP errors; progress is saved once the stream completes.
+    A cached response is replayed as a single delta. With `model_name` "auto"
+    the router picks the provider, failing over but not hedging.
+    """
+    logger.info("Streaming AI response")
+    cache_key = response_cache_key(user_input, role, model_name)
+    cached = await response_cache.aget(cache_key, bypass=not use_cache)
+    if cached is not None:
+        async def replay():
+            yield cached
+            queue_user_progress(user_input, cached, role)
+        return replay()
+
+    fitted_input, max_tokens = token_budget.fit(user_input, get_prompt(role).system, model_name, role)
+    messages = build_messages(fitted_input, role)
+    if model_name == ROUTER_MODEL:
+        stream = await router.call(
+            lambda model: create_chat_completion(messages, model, max_tokens=max_tokens, stream=True), hedge=False, timed=False
         )
+    else:
+        stream = await create_chat_completion(messages, model_name, api_key=api_key, max_tokens=max_tokens, stream=True)
 
-        ai_response = response.choices[0].message.content
-        logger.debug(f"Received ai_response: {ai_response}")
-        # Save progress in our local storage (JSON/SQLite)
-        save_user_progress(role, user_input, ai_response)
-        return ai_response
+    async def deltas():
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        ai_response = "".join(parts)
+        logger.debug("Streamed ai_response: %s", ai_response)
+        await response_cache.aset(cache_key, ai_response)
+        queue_user_progress(user_input, ai_response, role)
+
+    return deltas()
+
+async def summarize_turns(summary: str, turns: list, api_key: str, model_name: str) -> str:
+    """Fold exchanges into a session's rolling summary."""
+    exchanges = "\n".join(f"User: {user}\nCoach: {assistant}" for user, assistant in turns)
+    messages = SUMMARY.messages(SUMMARY_INPUT.format(summary=summary or "(none yet)", exchanges=exchanges))
+    response = await request_completion(messages, model_name, api_key, max_tokens=SESSION_SUMMARY_MAX_TOKENS)
+    prompt_usage.record(SUMMARY, response)
+    return response.choices[0].message.content.strip()
+
+@timed("respond")
+async def get_session_response(session: Session, user_input: str, api_key: str, model_name: str) -> str:
+    """
+    Answer the next message of a multi-turn session. The role's system prompt is
+    followed by the session's rolling summary and recent exchanges. Once enough
+    older exchanges have built up they are folded into the summary first, so
+    the prompt stays bounded. Replies depend on the history, so the response
+    cache and request coalescing are not used. Errors are raised, and the
+    exchange is only recorded once answered.
+    """
+    logger.info("Generating session response (%s earlier turns)", session.total_turns)
+    older = session.turns_to_fold()
+    if older:
+        try:
+            summary = await summarize_turns(session.summary, older, api_key, model_name)
+            session_store.fold(session, summary, len(older))
+        except (openai.RateLimitError, RateLimitQueueFull):
+            raise
+        except Exception as e:
+            logger.error(f"Could not update the session summary; keeping the turns verbatim: {e}")
+
+    prompt = get_prompt(session.role)
+    history = session.history()
+    context = prompt.system + "".join(message["content"] for message in history)
+    fitted_input, max_tokens = token_budget.fit(user_input, context, model_name, session.role)
+    response = await request_completion(prompt.messages(fitted_input, history), model_name, api_key, max_tokens=max_tokens)
+    prompt_usage.record(prompt, response)
+    ai_response = response.choices[0].message.content
+    session_store.add_turn(session, fitted_input, ai_response)
+    queue_user_progress(user_input, ai_response, session.role)
+    return ai_response
+
+def audio_digest(audio_file, filename: str) -> str:
+    """Content hash of an audio file object, read in blocks, for coalescing identical uploads."""
+    digest = hashlib.sha256(filename.encode("utf-8"))
+    audio_file.seek(0)
+    for block in iter(lambda: audio_file.read(64 * 1024), b""):
+        digest.update(block)
+    audio_file.seek(0)
+    return digest.hexdigest()
+
+@timed("transcribe")
+async def transcribe_audio(audio, filename: str = "audio.mp3") -> str:
+    """
+    Transcribe audio (bytes or a file object) to text using Whisper API. Long WAV
+    recordings are split at silences and transcribed concurrently, like
+    transcribe_audio_with_timestamps. Raises TranscriptionFailed on failure.
+    """
+
+    try:
+        # Whisper needs a filename to recognise the container
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+
+        # Identical recordings submitted at the same time share one transcription
+        key = await asyncio.to_thread(audio_digest, audio, filename)
+        transcription = await transcription_flight.run(
+            ("text", key), lambda: transcribe_in_segments(audio, transcribe_text_segment, filename)
+        )
+        logger.debug("transcribe audio response: %s", transcription["text"])
+        return transcription["text"]
+    except RateLimitQueueFull:
+        raise  # Segments were already retried one by one; the endpoint answers 503
     except openai.OpenAIError as e:
         logger.error(f"OpenAI error: {e}")
-        return "An error occurred with the OpenAI service. Please try again later."
+        raise TranscriptionFailed() from e
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
-        return "An unexpected error occurred. Please try again later."
+        raise TranscriptionFailed() from e
 
-def transcribe_audio(audio_data: bytes) -> str:
-    """Transcribe audio using Whisper API."""
+async def transcribe_text_segment(audio, filename: str = "audio.mp3") -> dict:
+    """Transcribe one piece of audio (bytes or a file object) to plain text, without timestamps. Raises on failure."""
+    text = await create_transcription((filename, audio))
+    return {"text": text, "words": [], "duration": None}
+
+async def transcribe_segment(audio, filename: str = "audio.mp3") -> dict:
+    """Transcribe one piece of audio (bytes or a file object) with word-level timestamps. Raises on failure."""
+    response = await create_transcription(
+        (filename, audio),
+        response_format="verbose_json",
+        timestamp_granularities=["word"]
+    )
+    words = [{"word": w.word, "start": w.start, "end": w.end} for w in (response.words or [])]
+    return {"text": response.text, "words": words, "duration": response.duration}
+
+@timed("transcribe")
+async def transcribe_audio_with_timestamps(audio, filename: str = "audio.mp3") -> dict:
+    """
+    Transcribe audio with word-level timestamps for local delivery analytics.
+    Long WAV recordings are split at silences and transcribed concurrently.
+    Raises TranscriptionFailed on failure.
+    """
 
     try:
-        # Create a BytesIO object from the audio bytes
-        audio_file = io.BytesIO(audio_data)
-        audio_file.name = "audio.mp3"  # Set a filename (important for Whisper)
-        audio_file.seek(0)  # Reset the file pointer to the beginning
-
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="text"
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+        key = await asyncio.to_thread(audio_digest, audio, filename)
+        transcription = await transcription_flight.run(
+            ("timestamps", key), lambda: transcribe_in_segments(audio, transcribe_segment, filename)
         )
-        logger.debug(f"transcribe audio response: {response}")
-        return response
+        logger.debug("transcribe audio response: %s (%s timed words)", transcription['text'], len(transcription['words']))
+        return transcription
+    except RateLimitQueueFull:
+        raise  # Segments were already retried one by one; the endpoint answers 503
     except openai.OpenAIError as e:
         logger.error(f"OpenAI error: {e}")
-        return "Could not transcribe audio. Please try again later."
+        raise TranscriptionFailed() from e
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
-        return "Could not transcribe audio. Please try again later."
\ No newline at end of file
+        raise TranscriptionFailed() from e
@@ -0,0 +1,139 @@
+import atexit
+import queue
+import threading
+import time
+from utils import database
+from utils.metrics import stage_seconds
+from utils.constants import PROGRESS_BATCH_SIZE, PROGRESS_FLUSH_INTERVAL, PROGRESS_QUEUE_SIZE
+from config import logger
+
+_STOP = object()
+
+
+class ProgressWriter:
+    """
+    Write-behind queue for progress records.
+    Requests only enqueue; a background thread flushes batches to the database
+    once `batch_size` records are waiting or `flush_interval` seconds have passed.
+    """
+
+    def __init__(self, batch_size: int = PROGRESS_BATCH_SIZE, flush_interval: float = PROGRESS_FLUSH_INTERVAL, max_queue: int = PROGRESS_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "failed_batches": 0,
+                       "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+
+    def start(self):
+        """Start the background thread if it is not already running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record: dict) -> bool:
+        """Queue a record without blocking. Returns False if the queue is full and the record was dropped."""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        record.setdefault("timestamp", time.time())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._stats["dropped"] += 1
+            logger.error("Progress queue is full. Dropping record.")
+            return False
+
+    def flush(self):
+        """Block until every record queued so far has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue and stop the background thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Progress writer did not drain in time.")
+
+    def stats(self) -> dict:
+        """Queue depth and flush latency figures."""
+        batches = self._stats["batches"]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self._stats["written"],
+            "dropped": self._stats["dropped"],
+            "batches": batches,
+            "failed_batches": self._stats["failed_batches"],
+            "last_flush_ms": round(self._stats["last_flush_ms"], 3),
+            "max_flush_ms": round(self._stats["max_flush_ms"], 3),
+            "avg_flush_ms": round(self._stats["total_flush_ms"] / batches, 3) if batches else 0.0,
+        }
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    # Drain whatever is already waiting without sleeping
+                    while len(batch) < self.batch_size:
+                        item = self._queue.get_nowait()
+                        if item is _STOP:
+                            stopping = True
+                            self._queue.task_done()
+                            break
+                        batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+                deadline = None
+
+    def _write(self, batch: list):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            database.save_records(batch)
+            self._stats["written"] += len(batch)
+            logger.info("Flushed %s progress records", len(batch))
+        except Exception as e:
+            outcome = "error"
+            self._stats["failed_batches"] += 1
+            logger.error(f"Error flushing progress records: {e}")
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, "persist", outcome)
+        elapsed_ms = elapsed * 1000
+        self._stats["batches"] += 1
+        self._stats["last_flush_ms"] = elapsed_ms
+        self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+        self._stats["total_flush_ms"] += elapsed_ms
+
+
+writer = ProgressWriter()
+atexit.register(writer.stop)
+
+def queue_user_progress(user_input: str, ai_feedback: str, module: str):
+    """Queue a training-module record for the background writer."""
+    writer.submit({"module": module, "input": user_input, "feedback": ai_feedback})
+
+def queue_presentation_feedback(presentation: str, feedback: str, scores: dict = None):
+    """Queue a presentation assessment, with its scores when known, for the background writer."""
+    writer.submit({"type": "presentation", "input": presentation, "feedback": feedback, "scores": scores})
@@ -0,0 +1,164 @@
+import time
+import httpx
+import openai
+from utils.constants import (
+    OPENAI_API_KEY, XAI_API_KEY, OPENAI_BASE_URL, XAI_BASE_URL, XAI_MODELS,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+)
+from utils.rate_limiter import rate_limiter, estimate_tokens, retry_after_seconds
+from utils.metrics import provider_seconds, record_usage
+from config import logger
+
+PROVIDERS = {
+    "openai": {"base_url": OPENAI_BASE_URL, "api_key": OPENAI_API_KEY},
+    "xai": {"base_url": XAI_BASE_URL, "api_key": XAI_API_KEY},
+}
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that counts new connections and TLS handshakes versus requests sent."""
+
+    def __init__(self, stats: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.stats["connections_opened"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self.stats["tls_handshakes"] += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats["requests"] += 1
+        request.extensions["trace"] = self._trace
+        return await super().handle_async_request(request)
+
+
+class ClientRegistry:
+    """
+    Long-lived provider clients sharing one keep-alive connection pool per provider.
+    Clients for different API keys of the same provider reuse that provider's pool.
+    """
+
+    def __init__(self, providers: dict = None, transport: httpx.AsyncBaseTransport = None):
+        self.providers = providers or PROVIDERS
+        self.transport = transport
+        self._http_clients = {}
+        self._clients = {}
+        self._stats = {}
+
+    def _http_client(self, provider: str) -> httpx.AsyncClient:
+        if provider not in self._http_clients:
+            stats = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+            transport = self.transport or CountingTransport(stats, limits=limits)
+            self._stats[provider] = stats
+            self._http_clients[provider] = httpx.AsyncClient(
+                transport=transport,
+                limits=limits,
+                timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            )
+            logger.info("Created connection pool for provider: %s", provider)
+        return self._http_clients[provider]
+
+    def get(self, provider: str = "openai", api_key: str = None) -> openai.AsyncOpenAI:
+        """Return the shared client for a provider, creating it on first use."""
+        if provider not in self.providers:
+            raise ValueError(f"Unknown provider: {provider}")
+        settings = self.providers[provider]
+        api_key = api_key or settings["api_key"]
+        key = (provider, api_key)
+        if key not in self._clients:
+            self._clients[key] = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=settings["base_url"],
+                http_client=self._http_client(provider)
+            )
+        return self._clients[key]
+
+    def stats(self) -> dict:
+        """Connection-reuse counters per provider."""
+        result = {}
+        for provider, stats in self._stats.items():
+            reused = max(stats["requests"] - stats["connections_opened"], 0)
+            result[provider] = dict(stats, reused_connections=reused)
+        return result
+
+    async def aclose(self):
+        """Close every pooled connection."""
+        for http_client in self._http_clients.values():
+            await http_client.aclose()
+        self._http_clients.clear()
+        self._clients.clear()
+
+
+registry = ClientRegistry()
+
+def provider_for_model(model_name: str) -> str:
+    """Map a model name to the provider that serves it."""
+    return "xai" if model_name in XAI_MODELS else "openai"
+
+def get_client(provider: str = "openai", api_key: str = None) -> openai.AsyncOpenAI:
+    """Return the pooled asyncio-native client for a provider."""
+    return registry.get(provider, api_key)
+
+async def create_chat_completion(messages: list, model_name: str, api_key: str = None, **kwargs):
+    """
+    Run a chat completion without blocking the event loop.
+    The call waits for the client-side rate limiter first, and the provider's
+    rate-limit headers are fed back into it.
+    """
+    provider = provider_for_model(model_name)
+    client = get_client(provider, api_key)
+    reserved = await rate_limiter.acquire(provider, model_name, estimate_tokens(messages, kwargs.get("max_tokens")))
+    logger.debug("Requesting chat completion from model: %s", model_name)
+    start = time.perf_counter()
+    try:
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model_name,
+            messages=messages,
+            **kwargs
+        )
+    except openai.RateLimitError as e:
+        provider_seconds.observe(time.perf_counter() - start, provider, model_name, "chat", "rate_limited")
+        rate_limiter.penalize(provider, model_name, retry_after_seconds(e.response.headers))
+        raise
+    except Exception:
+        provider_seconds.observe(time.perf_counter() - start, provider, model_name, "chat", "error")
+        raise
+    provider_seconds.observe(time.perf_counter() - start, provider, model_name, "chat", "ok")
+    rate_limiter.observe(provider, model_name, raw.headers)
+    response = raw.parse()
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        rate_limiter.settle(provider, model_name, reserved, usage.total_tokens)
+        record_usage(provider, model_name, usage)
+    return response
+
+async def create_transcription(audio_file, model_name: str = "whisper-1", api_key: str = None, **kwargs):
+    """Transcribe an audio file-like object without blocking the event loop."""
+    client = get_client("openai", api_key)
+    await rate_limiter.acquire("openai", model_name)
+    start = time.perf_counter()
+    try:
+        raw = await client.audio.transcriptions.with_raw_response.create(
+            model=model_name,
+            file=audio_file,
+            response_format=kwargs.pop("response_format", "text"),
+            **kwargs
+        )
+    except openai.RateLimitError as e:
+        provider_seconds.observe(time.perf_counter() - start, "openai", model_name, "transcription", "rate_limited")
+        rate_limiter.penalize("openai", model_name, retry_after_seconds(e.response.headers))
+        raise
+    except Exception:
+        provider_seconds.observe(time.perf_counter() - start, "openai", model_name, "transcription", "error")
+        raise
+    provider_seconds.observe(time.perf_counter() - start, "openai", model_name, "transcription", "ok")
+    rate_limiter.observe("openai", model_name, raw.headers)
+    return raw.parse()
@@ -0,0 +1,226 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from utils.constants import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_DEFAULT_RPM, RATE_LIMIT_DEFAULT_TPM,
+    RATE_LIMIT_MAX_WAITERS, RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMIT_HEADROOM, COMPLETION_TOKENS_ESTIMATE
+)
+from config import logger
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class RateLimitQueueFull(Exception):
+    """Raised instead of queueing when a provider's limit would keep the caller waiting too long."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit wait queue is full; retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_duration(value: str):
+    """Parse rate-limit reset values such as "1s", "6m0s" or "20ms" into seconds."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+def retry_after_seconds(headers) -> float:
+    """How long the provider asked us to wait, from Retry-After or the rate-limit reset headers."""
+    if headers is None:
+        return None
+    for name in ("retry-after-ms", "retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = parse_duration(headers.get(name))
+        if seconds is not None:
+            return seconds / 1000 if name == "retry-after-ms" else seconds
+    return None
+
+def backoff_delay(attempt: int, initial_delay: float = 1.0, retry_after: float = None) -> float:
+    """
+    Jittered delay before retry number `attempt` (1-based). Without a hint from the
+    provider this is "full jitter" exponential backoff, so callers that failed together
+    do not retry together; with one, the hint is honoured plus a little jitter.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, initial_delay)
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, initial_delay * 2 ** (attempt - 1)))
+
+def estimate_tokens(messages: list, max_tokens: int = None) -> int:
+    """Rough token cost of a completion: about four characters per prompt token plus the completion budget."""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // 4 + (max_tokens or COMPLETION_TOKENS_ESTIMATE)
+
+
+class TokenBucket:
+    """
+    Refills continuously up to `capacity` over `period` seconds. The level may go
+    negative: callers reserve capacity up front and then wait out the deficit, so
+    waiting callers are served in arrival order.
+    """
+
+    def __init__(self, capacity: float, period: float):
+        self.period = period
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        return max(amount - self.level, 0.0) / self.rate
+
+    def sync(self, limit: float, remaining: float, now: float):
+        """Adopt the provider's view of the limit and of what is left."""
+        self.refill(now)
+        if limit and limit != self.capacity:
+            self.capacity = limit
+            self.rate = limit / self.period
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+
+class _Limit:
+    def __init__(self, requests_per_period: float, tokens_per_period: float, period: float):
+        self.requests = TokenBucket(requests_per_period, period)
+        self.tokens = TokenBucket(tokens_per_period, period)
+        self.waiting = 0
+        self.stats = {"admitted": 0, "delayed": 0, "rejected": 0, "penalties": 0, "wait_seconds": 0.0}
+
+
+class RateLimiter:
+    """
+    Client-side request and token budgets per (provider, model).
+
+    Callers reserve one request and an estimated token count before calling the
+    provider and sleep until both buckets cover the reservation. Bucket sizes
+    start at the configured defaults and follow the provider's x-ratelimit-*
+    response headers, less a `headroom` margin: the provider counts a request
+    when it arrives, which can be a little later than when it was admitted here.
+    When a caller would have to wait longer than `max_wait` or more than
+    `max_waiters` are already waiting, RateLimitQueueFull is raised at once so
+    the request can be refused instead of tying up a worker.
+    """
+
+    def __init__(self, requests_per_minute: float = RATE_LIMIT_DEFAULT_RPM, tokens_per_minute: float = RATE_LIMIT_DEFAULT_TPM,
+                 max_waiters: int = RATE_LIMIT_MAX_WAITERS, max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS,
+                 period: float = 60.0, headroom: float = RATE_LIMIT_HEADROOM, enabled: bool = RATE_LIMIT_ENABLED):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.headroom = headroom
+        self.max_waiters = max_waiters
+        self.max_wait = max_wait
+        self.period = period
+        self.enabled = enabled
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def _limit(self, provider: str, model: str) -> _Limit:
+        key = (provider, model)
+        if key not in self._limits:
+            self._limits[key] = _Limit(self.requests_per_minute * self.headroom, self.tokens_per_minute * self.headroom, self.period)
+        return self._limits[key]
+
+    async def acquire(self, provider: str, model: str, tokens: int = 0) -> int:
+        """Wait until a request costing `tokens` fits the budget; returns the tokens reserved."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            limit = self._limit(provider, model)
+            now = time.monotonic()
+            limit.requests.refill(now)
+            limit.tokens.refill(now)
+            tokens = min(tokens, limit.tokens.capacity)  # An oversized request must still be possible
+            wait = max(limit.requests.wait_time(1), limit.tokens.wait_time(tokens))
+            if wait > 0 and (limit.waiting >= self.max_waiters or wait > self.max_wait):
+                limit.stats["rejected"] += 1
+                raise RateLimitQueueFull(wait)
+            limit.requests.level -= 1
+            limit.tokens.level -= tokens
+            limit.stats["admitted"] += 1
+            if wait > 0:
+                limit.waiting += 1
+                limit.stats["delayed"] += 1
+                limit.stats["wait_seconds"] += wait
+        if wait > 0:
+            logger.debug("Rate limiter delaying %s/%s request by %.2fs", provider, model, wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.settle(provider, model, tokens, 0, requests=1)  # Hand the reservation back
+                raise
+            finally:
+                with self._lock:
+                    limit.waiting -= 1
+        return tokens
+
+    def settle(self, provider: str, model: str, reserved: int, used: int, requests: int = 0):
+        """Return the difference between reserved and actual usage to the buckets."""
+        if not self.enabled:
+            return
+        with self._lock:
+            limit = self._limit(provider, model)
+            limit.tokens.level = min(limit.tokens.capacity, limit.tokens.level + reserved - used)
+            limit.requests.level = min(limit.requests.capacity, limit.requests.level + requests)
+
+    def observe(self, provider: str, model: str, headers):
+        """Follow the provider's x-ratelimit-* headers from any response."""
+        if not self.enabled or headers is None:
+            return
+
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._lock:
+            limit = self._limit(provider, model)
+            now = time.monotonic()
+            limit.requests.sync(self._scaled(number("x-ratelimit-limit-requests")), number("x-ratelimit-remaining-requests"), now)
+            limit.tokens.sync(self._scaled(number("x-ratelimit-limit-tokens")), number("x-ratelimit-remaining-tokens"), now)
+
+    def _scaled(self, value):
+        return value * self.headroom if value else None
+
+    def penalize(self, provider: str, model: str, retry_after: float = None):
+        """After a 429, hold everyone back until the provider's reset time has passed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            limit = self._limit(provider, model)
+            now = time.monotonic()
+            limit.requests.refill(now)
+            limit.tokens.refill(now)
+            hold = retry_after if retry_after is not None else 1.0
+            limit.requests.level = min(limit.requests.level, -limit.requests.rate * hold)
+            limit.stats["penalties"] += 1
+        logger.warning(f"Provider rate limit hit for {provider}/{model}; holding requests for {hold:.1f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                f"{provider}/{model}": dict(
+                    limit.stats,
+                    wait_seconds=round(limit.stats["wait_seconds"], 3),
+                    waiting=limit.waiting,
+                    requests_per_minute=round(limit.requests.capacity * 60 / self.period, 1),
+                    tokens_per_minute=round(limit.tokens.capacity * 60 / self.period, 1),
+                )
+                for (provider, model), limit in self._limits.items()
+            }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,284 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.constants import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_DIR, RESPONSE_CACHE_DISK_MAX_BYTES
+)
+from utils.errors import OPENAI_ERROR, UNEXPECTED_ERROR
+from config import logger
+
+CACHE_PREFIX = "rc_"
+
+# Fallback replies get_ai_response returns instead of raising; never cached
+ERROR_RESPONSES = (OPENAI_ERROR, UNEXPECTED_ERROR)
+
+
+def normalize_input(text: str) -> str:
+    """Case- and whitespace-insensitive form of user text, so trivially different submissions share an entry."""
+    return " ".join(text.split()).casefold()
+
+def is_cacheable(value) -> bool:
+    """Anything but an empty value or, compared exactly, one of the fallback replies."""
+    if isinstance(value, str):
+        return bool(value.strip()) and value not in ERROR_RESPONSES
+    return bool(value)
+
+
+class MemoryTier:
+    """In-process LRU tier holding up to `max_entries` responses."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskTier:
+    """
+    Optional on-disk tier: one JSON file per response in `directory`, surviving
+    restarts. Least-recently-used files are deleted beyond `max_bytes`.
+    """
+
+    name = "disk"
+    blocking = True  # File I/O; coroutines use it through aget/aset, in a worker thread
+
+    def __init__(self, directory: str, max_bytes: int = RESPONSE_CACHE_DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = None  # filename -> size, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.startswith(CACHE_PREFIX) and name.endswith(".json"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._total_bytes = sum(self._entries.values())
+
+    def _remove(self, filename: str):
+        self._total_bytes -= self._entries.pop(filename, 0)
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str):
+        filename = f"{CACHE_PREFIX}{key}.json"
+        path = os.path.join(self.directory, filename)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if filename not in self._entries:
+                return None
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Dropping unreadable response cache file {filename}: {e}")
+                self._remove(filename)
+                return None
+            if entry["expires_at"] < time.time():
+                self._remove(filename)
+                return None
+            self._entries.move_to_end(filename)
+            os.utime(path)  # Keep recency across restarts
+            return entry["expires_at"], entry["value"]
+
+    def set(self, key: str, value, expires_at: float):
+        filename = f"{CACHE_PREFIX}{key}.json"
+        path = os.path.join(self.directory, filename)
+        payload = json.dumps({"expires_at": expires_at, "value": value}).encode("utf-8")
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._total_bytes += len(payload) - self._entries.get(filename, 0)
+            self._entries[filename] = len(payload)
+            self._entries.move_to_end(filename)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            for filename in list(self._entries):
+                self._remove(filename)
+
+    def __len__(self):
+        return len(self._entries or ())
+
+
+class ResponseCache:
+    """
+    Cache of model responses for deterministic inputs, checked tier by tier.
+
+    Tiers are searched in order (memory first, then the optional disk tier) and a
+    hit in a slower tier is copied into the faster ones. Entries expire after
+    `ttl` seconds. Error fallbacks and empty responses are never stored.
+    """
+
+    def __init__(self, tiers: list = None, ttl: float = RESPONSE_CACHE_TTL, enabled: bool = RESPONSE_CACHE_ENABLED):
+        if tiers is None:
+            tiers = [MemoryTier()]
+            if RESPONSE_CACHE_DIR:
+                tiers.append(DiskTier(RESPONSE_CACHE_DIR))
+        self.tiers = tiers
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "rejected": 0}
+        self._tier_hits = {tier.name: 0 for tier in tiers}
+
+    @staticmethod
+    def key(namespace: str, model: str, version: str, text: str, **extra) -> str:
+        """Key on the normalized input plus everything else that shapes the response."""
+        payload = json.dumps([namespace, model, version, normalize_input(text), extra], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def get(self, key: str, bypass: bool = False):
+        """Return the cached response for `key`, or None. `bypass` skips the lookup for this request."""
+        if not self._lookup_allowed(bypass):
+            return None
+        return self._found(key, *self._search(key, 0, len(self.tiers)))
+
+    async def aget(self, key: str, bypass: bool = False):
+        """get() for coroutines: in-memory tiers are read inline, tiers that block (disk) in a worker thread."""
+        if not self._lookup_allowed(bypass):
+            return None
+        first_blocking = self._first_blocking()
+        index, entry = self._search(key, 0, first_blocking)
+        if entry is None and first_blocking < len(self.tiers):
+            index, entry = await asyncio.to_thread(self._search, key, first_blocking, len(self.tiers))
+        return self._found(key, index, entry)
+
+    def set(self, key: str, value):
+        """Store a successful response in every tier."""
+        expires_at = self._expiry(value)
+        if expires_at is not None:
+            for tier in self.tiers:
+                tier.set(key, value, expires_at)
+
+    async def aset(self, key: str, value):
+        """set() for coroutines: tiers that block are written in a worker thread."""
+        expires_at = self._expiry(value)
+        if expires_at is None:
+            return
+        def store(blocking: bool):
+            for tier in self.tiers:
+                if tier.blocking == blocking:
+                    tier.set(key, value, expires_at)
+
+        store(blocking=False)
+        if any(tier.blocking for tier in self.tiers):
+            await asyncio.to_thread(store, True)
+
+    def _lookup_allowed(self, bypass: bool) -> bool:
+        if not self.enabled:
+            return False
+        if bypass:
+            self._count("bypassed")
+            return False
+        return True
+
+    def _first_blocking(self) -> int:
+        return next((index for index, tier in enumerate(self.tiers) if tier.blocking), len(self.tiers))
+
+    def _search(self, key: str, start: int, stop: int) -> tuple:
+        """The first tier in tiers[start:stop] holding `key`, as (index, (expires_at, value)), or (None, None)."""
+        for index in range(start, stop):
+            entry = self.tiers[index].get(key)
+            if entry is not None:
+                return index, entry
+        return None, None
+
+    def _found(self, key: str, index, entry):
+        if entry is None:
+            self._count("misses")
+            return None
+        expires_at, value = entry
+        tier = self.tiers[index]
+        for faster in self.tiers[:index]:  # Faster tiers come first and do not block
+            faster.set(key, value, expires_at)
+        with self._lock:
+            self._stats["hits"] += 1
+            self._tier_hits[tier.name] += 1
+        logger.debug("Response cache hit (%s): %s", tier.name, key)
+        return copy.deepcopy(value)  # Callers may add fields to cached feedback
+
+    def _expiry(self, value):
+        """When a new entry for `value` expires, or None if it must not be stored."""
+        if not self.enabled:
+            return None
+        if not is_cacheable(value):
+            self._count("rejected")
+            return None
+        self._count("stores")
+        return time.time() + self.ttl
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tier_hits"] = dict(self._tier_hits)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats["entries"] = {tier.name: len(tier) for tier in self.tiers}
+        stats["evictions"] = {tier.name: tier.evictions for tier in self.tiers}
+        return stats
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from collections import deque
+import openai
+from utils.constants import (
+    ROUTER_MODELS, ROUTER_HEDGE, ROUTER_HEDGE_PERCENTILE, ROUTER_HEDGE_MIN_DELAY, ROUTER_HEDGE_DEFAULT_DELAY,
+    ROUTER_WINDOW, ROUTER_MIN_SAMPLES, ROUTER_ERROR_DECAY, ROUTER_MAX_ERROR_RATE, ROUTER_COOLDOWN_SECONDS
+)
+from config import logger
+
+# The request itself is at fault, so another backend would refuse it too
+NO_FAILOVER_ERRORS = (openai.BadRequestError,)
+
+
+class BackendStats:
+    """Recent latencies and a moving error rate for one backend."""
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.last_error = None
+        self.counts = {"requests": 0, "wins": 0, "errors": 0, "hedges": 0, "cancelled": 0}
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def record(self, latency: float = None, failed: bool = False):
+        self.error_rate += ROUTER_ERROR_DECAY * ((1.0 if failed else 0.0) - self.error_rate)
+        if failed:
+            self.counts["errors"] += 1
+            self.last_error = time.monotonic()
+        elif latency is not None:
+            self.latencies.append(latency)
+
+
+class Router:
+    """
+    Sends each call to the backend (model) that has been fastest recently.
+
+    Backends whose moving error rate is above `max_error_rate` are skipped until
+    `cooldown` seconds after their last failure. If the chosen backend fails, the
+    next one is tried. With hedging, a second backend is also started when the
+    first has not answered within its own p95 latency; whichever finishes first
+    wins and the other call is cancelled, which trims the latency tail at the
+    cost of a few duplicate requests.
+    """
+
+    def __init__(self, models: list = None, hedge: bool = ROUTER_HEDGE, min_samples: int = ROUTER_MIN_SAMPLES,
+                 hedge_min_delay: float = ROUTER_HEDGE_MIN_DELAY, hedge_default_delay: float = ROUTER_HEDGE_DEFAULT_DELAY,
+                 max_error_rate: float = ROUTER_MAX_ERROR_RATE, cooldown: float = ROUTER_COOLDOWN_SECONDS):
+        self.models = list(models or ROUTER_MODELS)
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every backend's history."""
+        with self._lock:
+            self._stats = {model: BackendStats() for model in self.models}
+
+    def healthy(self, model: str) -> bool:
+        stats = self._stats[model]
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        return time.monotonic() - stats.last_error >= self.cooldown  # Let one call probe it again
+
+    def ranked(self) -> list:
+        """Healthy backends, fastest median first; backends without enough samples are tried first."""
+        with self._lock:
+            candidates = [model for model in self.models if self.healthy(model)] or list(self.models)
+
+            def score(model):
+                stats = self._stats[model]
+                if len(stats.latencies) < self.min_samples:
+                    return (0, len(stats.latencies))
+                return (1, stats.percentile(0.5))
+
+            return sorted(candidates, key=score)
+
+    def hedge_delay(self, model: str) -> float:
+        """How long to wait for `model` before starting a hedged call elsewhere."""
+        with self._lock:
+            stats = self._stats[model]
+            if len(stats.latencies) < self.min_samples:
+                return self.hedge_default_delay
+            return max(self.hedge_min_delay, stats.percentile(ROUTER_HEDGE_PERCENTILE))
+
+    async def _attempt(self, model: str, fn, timed: bool):
+        start = time.perf_counter()
+        with self._lock:
+            self._stats[model].counts["requests"] += 1
+        try:
+            result = await fn(model)
+        except NO_FAILOVER_ERRORS:
+            raise
+        except Exception:
+            with self._lock:
+                self._stats[model].record(failed=True)
+            raise
+        with self._lock:
+            self._stats[model].record(time.perf_counter() - start if timed else None)
+        return result
+
+    async def call(self, fn, hedge: bool = None, timed: bool = True):
+        """
+        Await `fn(model)` on the best backend, failing over and hedging as configured.
+        Pass `timed=False` when the call's duration says little about the backend,
+        e.g. opening a stream. If every backend fails the last error is raised.
+        """
+        hedge = self.hedge if hedge is None else hedge
+        models = iter(self.ranked())
+        pending = {}
+        last_error = None
+
+        def start(model: str):
+            task = asyncio.ensure_future(self._attempt(model, fn, timed))
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())  # Losers' errors are expected
+            pending[task] = model
+            return model
+
+        primary = start(next(models))
+        delay = self.hedge_delay(primary) if hedge else None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                delay = None
+                if not done:
+                    model = next(models, None)
+                    if model is not None:
+                        logger.debug("Hedging %s with %s", primary, model)
+                        with self._lock:
+                            self._stats[model].counts["hedges"] += 1
+                        start(model)
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except NO_FAILOVER_ERRORS:
+                        raise
+                    except Exception as e:
+                        logger.warning(f"Backend {model} failed: {e}")
+                        last_error = e
+                        continue
+                    with self._lock:
+                        self._stats[model].counts["wins"] += 1
+                    return result
+                if not pending:
+                    model = next(models, None)
+                    if model is not None:
+                        logger.info("Failing over to %s", model)
+                        start(model)
+        finally:
+            for task, model in pending.items():
+                task.cancel()
+                with self._lock:
+                    self._stats[model].counts["cancelled"] += 1
+        raise last_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for model, stats in self._stats.items():
+                p50, p95, p99 = (stats.percentile(q) for q in (0.5, 0.95, 0.99))
+                result[model] = dict(
+                    stats.counts,
+                    error_rate=round(stats.error_rate, 3),
+                    healthy=self.healthy(model),
+                    p50_seconds=round(p50, 3) if p50 is not None else None,
+                    p95_seconds=round(p95, 3) if p95 is not None else None,
+                    p99_seconds=round(p99, 3) if p99 is not None else None,
+                )
+            return result
+
+
+router = Router()
@@ -0,0 +1,128 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from utils.constants import (
+    SESSION_RECENT_TURNS, SESSION_FOLD_BATCH, SESSION_IDLE_SECONDS, SESSION_MAX_BYTES, SESSION_OVERHEAD_BYTES
+)
+from config import logger
+
+
+class Session:
+    """
+    One multi-turn conversation: a rolling summary of older exchanges plus the
+    recent exchanges verbatim. Folded exchanges are dropped, so a session's size
+    stays bounded however long it runs.
+    """
+
+    def __init__(self, session_id: str, role: str, model: str):
+        self.id = session_id
+        self.role = role
+        self.model = model
+        self.summary = ""
+        self.turns = []  # (user, assistant) pairs not yet folded into the summary
+        self.total_turns = 0
+        self.busy = False
+        self.last_used = time.monotonic()
+        self.size = SESSION_OVERHEAD_BYTES
+
+    def measure(self) -> int:
+        return SESSION_OVERHEAD_BYTES + len(self.summary) + sum(len(user) + len(assistant) for user, assistant in self.turns)
+
+    def turns_to_fold(self, recent: int = SESSION_RECENT_TURNS, batch: int = SESSION_FOLD_BATCH) -> list:
+        """Older exchanges due to be folded into the summary; empty until a whole batch has built up."""
+        if len(self.turns) < recent + batch:
+            return []
+        return self.turns[:len(self.turns) - recent]
+
+    def history(self) -> list:
+        """The summary and recent exchanges as chat messages, to go between the system prompt and the new input."""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        for user, assistant in self.turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        return messages
+
+
+class SessionStore:
+    """
+    Sessions by id, least recently used first. Sessions idle for longer than
+    `idle_ttl` expire, and the least recently used are evicted while the text
+    held across all sessions exceeds `max_bytes`.
+    """
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_SECONDS, max_bytes: int = SESSION_MAX_BYTES):
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> Session
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0, "folds": 0}
+
+    def create(self, role: str, model: str) -> Session:
+        session = Session(uuid.uuid4().hex, role, model)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._bytes += session.size
+            self._stats["created"] += 1
+            self._evict()
+        return session
+
+    def get(self, session_id: str):
+        """The live session for an id, marked as just used, or None."""
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.size
+        return session is not None
+
+    def add_turn(self, session: Session, user: str, assistant: str):
+        with self._lock:
+            session.turns.append((user, assistant))
+            session.total_turns += 1
+            self._resize(session)
+
+    def fold(self, session: Session, summary: str, count: int):
+        """Replace the oldest `count` exchanges with an updated summary."""
+        with self._lock:
+            session.summary = summary
+            del session.turns[:count]
+            self._stats["folds"] += 1
+            self._resize(session)
+
+    def _resize(self, session: Session):
+        size = session.measure()
+        if session.id in self._sessions:
+            self._bytes += size - session.size
+        session.size = size
+        self._evict()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff and self._bytes <= self.max_bytes:
+                break
+            expired = session.last_used < cutoff
+            del self._sessions[session_id]
+            self._bytes -= session.size
+            self._stats["expired" if expired else "evicted"] += 1
+            logger.debug("%s session: %s", 'Expired' if expired else 'Evicted', session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, sessions=len(self._sessions), bytes=self._bytes)
+
+
+session_store = SessionStore()
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+_flights = {}
+
+
+class _ThreadCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller for a key originates the call; anyone arriving while it is
+    in flight waits for the same result, or has the same exception raised.
+    Nothing is kept once the call finishes, so this only merges overlapping
+    requests; use the response cache for repeats over time. `run` is for
+    coroutines on the event loop, `call` for blocking functions in threads.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._tasks = {}  # key -> asyncio.Task
+        self._thread_calls = {}  # key -> _ThreadCall
+        self._stats = {"originated": 0, "coalesced": 0}
+        _flights[name] = self
+
+    async def run(self, key, fn):
+        """Await `fn()` once for all concurrent callers with the same key."""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            # A separate task, so a cancelled caller does not cancel the call for the others
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self._count("originated")
+        else:
+            self._count("coalesced")
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+    def call(self, key, fn):
+        """Call blocking `fn()` once for all threads concurrently asking for the same key."""
+        with self._lock:
+            call = self._thread_calls.get(key)
+            originate = call is None
+            if originate:
+                call = self._thread_calls[key] = _ThreadCall()
+            self._stats["originated" if originate else "coalesced"] += 1
+
+        if not originate:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._thread_calls[key]
+            call.done.set()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._tasks) + len(self._thread_calls)
+        return stats
+
+
+def flight_stats() -> dict:
+    """Counters of every SingleFlight, by name."""
+    return {name: flight.stats() for name, flight in _flights.items()}
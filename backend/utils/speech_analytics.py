@@ -0,0 +1,123 @@
+import re
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.constants import (
+    FILLER_WORDS, WPM_WINDOW_SECONDS, WPM_WINDOW_STEP, PAUSE_THRESHOLD_SECONDS, DIVERSITY_WINDOW
+)
+
+TOKEN_CLEAN = re.compile(r"[^\w']+")
+PAUSE_BUCKETS = [("short", 0.0, 0.7), ("medium", 0.7, 1.5), ("long", 1.5, np.inf)]
+
+
+def normalize_tokens(words: list) -> np.ndarray:
+    """Lower-case the words and strip punctuation, dropping empty tokens."""
+    tokens = [TOKEN_CLEAN.sub("", word.lower()) for word in words]
+    return np.array([token for token in tokens if token], dtype=object)
+
+def filler_counts(tokens: np.ndarray, lexicon: list = FILLER_WORDS) -> dict:
+    """Count single- and multi-word fillers from the lexicon."""
+    counts = {}
+    for filler in lexicon:
+        parts = filler.lower().split()
+        n = len(parts)
+        if n == 0 or len(tokens) < n:
+            counts[filler] = 0
+            continue
+        # Compare every n-gram position against the filler at once
+        matches = np.ones(len(tokens) - n + 1, dtype=bool)
+        for offset, part in enumerate(parts):
+            matches &= tokens[offset:len(tokens) - n + 1 + offset] == part
+        counts[filler] = int(matches.sum())
+    return counts
+
+def repetition_stats(tokens: np.ndarray) -> dict:
+    """Immediate word repeats ("I I think") and repeated bigrams."""
+    if len(tokens) < 2:
+        return {"immediate_repeats": 0, "repeated_bigrams": 0}
+    immediate = int((tokens[1:] == tokens[:-1]).sum())
+    bigrams = tokens[:-1] + " " + tokens[1:]
+    _, counts = np.unique(bigrams.astype(str), return_counts=True)
+    return {"immediate_repeats": immediate, "repeated_bigrams": int((counts - 1)[counts > 1].sum())}
+
+def lexical_diversity(tokens: np.ndarray, window: int = DIVERSITY_WINDOW) -> dict:
+    """Type-token ratio and moving-average type-token ratio (MATTR)."""
+    if len(tokens) == 0:
+        return {"type_token_ratio": 0.0, "mattr": 0.0, "unique_words": 0}
+    _, ids = np.unique(tokens.astype(str), return_inverse=True)
+    ttr = len(np.unique(ids)) / len(ids)
+    if len(ids) <= window:
+        mattr = ttr
+    else:
+        windows = np.sort(sliding_window_view(ids, window), axis=1)
+        unique_per_window = (np.diff(windows, axis=1) != 0).sum(axis=1) + 1
+        mattr = float(unique_per_window.mean() / window)
+    return {"type_token_ratio": round(float(ttr), 4), "mattr": round(float(mattr), 4), "unique_words": int(ids.max() + 1)}
+
+def pacing_stats(starts: np.ndarray, ends: np.ndarray, duration: float = None,
+                 window: float = WPM_WINDOW_SECONDS, step: float = WPM_WINDOW_STEP) -> dict:
+    """Overall and sliding-window words per minute from word start times."""
+    if len(starts) == 0:
+        return {"wpm": 0.0, "wpm_windows": [], "wpm_min": 0.0, "wpm_max": 0.0, "wpm_stddev": 0.0}
+    speaking_time = float(duration or ends[-1]) or 1e-9
+    total_wpm = len(starts) * 60.0 / speaking_time
+    window_starts = np.arange(0.0, max(speaking_time - window, 0.0) + step, step)
+    window_ends = np.minimum(window_starts + window, speaking_time)
+    counts = np.searchsorted(starts, window_ends, side="left") - np.searchsorted(starts, window_starts, side="left")
+    lengths = np.maximum(window_ends - window_starts, 1e-9)
+    wpm = counts * 60.0 / lengths
+    return {
+        "wpm": round(total_wpm, 1),
+        "wpm_windows": [{"start": round(float(s), 2), "wpm": round(float(w), 1)} for s, w in zip(window_starts, wpm)],
+        "wpm_min": round(float(wpm.min()), 1),
+        "wpm_max": round(float(wpm.max()), 1),
+        "wpm_stddev": round(float(wpm.std()), 1),
+    }
+
+def pause_stats(starts: np.ndarray, ends: np.ndarray, threshold: float = PAUSE_THRESHOLD_SECONDS) -> dict:
+    """Distribution of silent gaps between consecutive words."""
+    gaps = starts[1:] - ends[:-1] if len(starts) > 1 else np.array([])
+    pauses = gaps[gaps >= threshold]
+    stats = {"count": int(len(pauses))}
+    if len(pauses):
+        stats.update({
+            "mean": round(float(pauses.mean()), 3),
+            "median": round(float(np.median(pauses)), 3),
+            "p90": round(float(np.percentile(pauses, 90)), 3),
+            "max": round(float(pauses.max()), 3),
+            "total_seconds": round(float(pauses.sum()), 3),
+        })
+    stats["buckets"] = {name: int(((pauses >= low) & (pauses < high)).sum()) for name, low, high in PAUSE_BUCKETS}
+    return stats
+
+def _content_metrics(tokens: np.ndarray, minutes: float = None, lexicon: list = FILLER_WORDS) -> dict:
+    fillers = filler_counts(tokens, lexicon)
+    total = sum(fillers.values())
+    metrics = {
+        "word_count": int(len(tokens)),
+        "filler_words": {"total": total, "counts": {k: v for k, v in fillers.items() if v}},
+        "repetition": repetition_stats(tokens),
+        "lexical_diversity": lexical_diversity(tokens),
+    }
+    if minutes:
+        metrics["filler_words"]["per_minute"] = round(total / minutes, 2)
+    return metrics
+
+def analyze_delivery(words: list, duration: float = None, lexicon: list = FILLER_WORDS) -> dict:
+    """
+    Delivery metrics from word-level timestamps.
+    `words` is a list of {"word", "start", "end"} dicts as returned by verbose transcription.
+    """
+    timed = [w for w in words if TOKEN_CLEAN.sub("", w["word"])]
+    starts = np.array([w["start"] for w in timed], dtype=float)
+    ends = np.array([w["end"] for w in timed], dtype=float)
+    tokens = normalize_tokens([w["word"] for w in timed])
+    speaking_time = float(duration or (ends[-1] if len(ends) else 0.0))
+    metrics = _content_metrics(tokens, speaking_time / 60.0 if speaking_time else None, lexicon)
+    metrics["duration_seconds"] = round(speaking_time, 2)
+    metrics["pacing"] = pacing_stats(starts, ends, duration)
+    metrics["pauses"] = pause_stats(starts, ends)
+    return metrics
+
+def analyze_text(text: str, lexicon: list = FILLER_WORDS) -> dict:
+    """Filler, repetition and diversity metrics for text without timing data."""
+    return _content_metrics(normalize_tokens(text.split()), lexicon=lexicon)
@@ -0,0 +1,167 @@
+import functools
+import math
+import re
+import threading
+from collections import Counter
+from utils.constants import (
+    TOKEN_BUDGET_STRATEGY, INPUT_TOKEN_LIMIT, TRUNCATION_HEAD_SHARE, MODEL_CONTEXT_TOKENS, DEFAULT_CONTEXT_TOKENS,
+    MAX_TOKENS_BY_ROLE, MAX_TOKENS, ROUTER_MODEL, ROUTER_MODELS, MODEL_NAME, XAI_MODELS
+)
+from config import logger
+
+try:
+    import tiktoken
+except ImportError:  # Counts fall back to the characters-per-token estimate
+    tiktoken = None
+
+STRATEGIES = ("reject", "truncate", "condense")
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat format adds per message
+TRUNCATION_MARKER = "\n[...]\n"
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"[a-z']+")
+
+
+class InputTooLong(Exception):
+    """Raised when user input does not fit the token budget and the strategy is to reject it."""
+
+    def __init__(self, tokens: int, limit: int):
+        super().__init__(f"Input is {tokens} tokens; the limit is {limit}")
+        self.tokens = tokens
+        self.limit = limit
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model_name: str):
+    """The model's tokenizer, or None. Cached, including failures, so a missing BPE file is not fetched again per request."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")  # Close enough for other providers' models
+    except Exception as e:  # tiktoken downloads its BPE files on first use, which fails offline
+        logger.warning("No tokenizer for %s (%s); estimating %s characters per token", model_name, e, CHARS_PER_TOKEN)
+        return None
+
+def load_tokenizers():
+    """Load the tokenizers of every configured model, so a first use never blocks a request (call in a worker thread at startup)."""
+    for model_name in {MODEL_NAME, *XAI_MODELS, *ROUTER_MODELS, *MODEL_CONTEXT_TOKENS}:
+        _encoding(model_name)
+
+def count_tokens(text: str, model_name: str) -> int:
+    """Tokens in `text` for a model, or an estimate when no tokenizer is available."""
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def context_tokens(model_name: str) -> int:
+    """Context window of a model; for "auto", the smallest among the models it routes to."""
+    if model_name == ROUTER_MODEL:
+        return min(context_tokens(model) for model in ROUTER_MODELS)
+    return MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+
+def max_tokens_for(role: str) -> int:
+    return MAX_TOKENS_BY_ROLE.get(role, MAX_TOKENS)
+
+def truncate(text: str, limit: int, model_name: str, tokens: int = None) -> str:
+    """Keep the start and the end of `text`, dropping the middle, within `limit` tokens."""
+    tokens = tokens or count_tokens(text, model_name)
+    keep = len(text) * limit // max(tokens, 1)
+    while keep > 0:
+        head = int(keep * TRUNCATION_HEAD_SHARE)
+        candidate = text[:head].rsplit(" ", 1)[0] + TRUNCATION_MARKER + text[len(text) - (keep - head):].split(" ", 1)[-1]
+        if count_tokens(candidate, model_name) <= limit:
+            return candidate
+        keep = int(keep * 0.9)
+    return ""
+
+def condense(text: str, limit: int, model_name: str, tokens: int = None) -> str:
+    """
+    Extractive condensation: keep the first and last sentences and then the
+    sentences richest in the text's recurring words, in their original order.
+    """
+    sentences = [s for s in SENTENCE_END.split(text.strip()) if s]
+    if len(sentences) < 3:
+        return truncate(text, limit, model_name, tokens)
+    frequency = Counter(word for word in WORD.findall(text.lower()) if len(word) > 3)
+
+    def score(index):
+        words = [word for word in WORD.findall(sentences[index].lower()) if len(word) > 3]
+        return sum(frequency[word] for word in words) / (len(words) or 1)
+
+    ends = (0, len(sentences) - 1)
+    order = sorted(range(len(sentences)), key=lambda i: (i not in ends, -score(i)))
+    chosen = set()
+    used = 0
+    for index in order:
+        cost = count_tokens(sentences[index], model_name) + 1
+        if used + cost <= limit:
+            chosen.add(index)
+            used += cost
+    if not chosen:
+        return truncate(text, limit, model_name, tokens)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class TokenBudget:
+    """
+    Fits user input into a model's budget before any provider call.
+
+    The input may use whatever the context window leaves after the system prompt
+    and the role's completion allowance, capped at `input_limit` tokens to bound
+    cost. Oversized input is rejected, truncated (head and tail) or condensed
+    (extractive), depending on `strategy`.
+    """
+
+    def __init__(self, strategy: str = TOKEN_BUDGET_STRATEGY, input_limit: int = INPUT_TOKEN_LIMIT):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown token budget strategy: {strategy}")
+        self.strategy = strategy
+        self.input_limit = input_limit
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "input_tokens": 0, "rejected": 0, "truncated": 0, "condensed": 0, "tokens_removed": 0}
+
+    def fit(self, user_input: str, system_prompt: str, model_name: str, role: str, fixed_input: str = "") -> tuple:
+        """
+        Return the input to send and the `max_tokens` to request, or raise InputTooLong.
+        `fixed_input` is sent with the input but never shortened (a template's
+        wording, measured metrics), so it uses up part of the input limit first.
+        """
+        max_tokens = max_tokens_for(role)
+        fixed_tokens = count_tokens(fixed_input, model_name) if fixed_input else 0
+        prompt_tokens = count_tokens(system_prompt, model_name) + 2 * MESSAGE_OVERHEAD_TOKENS + fixed_tokens
+        limit = min(self.input_limit - fixed_tokens, context_tokens(model_name) - prompt_tokens - max_tokens)
+        input_tokens = count_tokens(user_input, model_name)
+        fitted, sent_tokens, outcome = user_input, input_tokens, None
+        if input_tokens > limit:
+            if self.strategy == "reject":
+                outcome = "rejected"
+            else:
+                fitted = (condense if self.strategy == "condense" else truncate)(user_input, limit, model_name, input_tokens)
+                sent_tokens = count_tokens(fitted, model_name)
+                outcome = "condensed" if self.strategy == "condense" else "truncated"
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["input_tokens"] += input_tokens
+            if outcome:
+                self._stats[outcome] += 1
+                self._stats["tokens_removed"] += input_tokens - sent_tokens
+        logger.info(
+            "Token budget for %s/%s: prompt %s + input %s tokens (limit %s), max_tokens %s%s",
+            model_name, role, prompt_tokens, input_tokens, limit, max_tokens,
+            f"; input {outcome} to {sent_tokens} tokens" if fitted is not user_input else ""
+        )
+        if outcome == "rejected":
+            raise InputTooLong(input_tokens, limit)
+        return fitted, max_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, strategy=self.strategy, tokenizer="tiktoken" if tiktoken else "estimate")
+
+
+token_budget = TokenBudget()
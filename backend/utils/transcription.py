@@ -0,0 +1,170 @@
+import asyncio
+import io
+import threading
+import wave
+import numpy as np
+from openai import RateLimitError
+from utils.constants import (
+    TRANSCRIBE_SEGMENT_SECONDS, TRANSCRIBE_SILENCE_SEARCH_SECONDS,
+    TRANSCRIBE_MAX_CONCURRENCY, TRANSCRIBE_SEGMENT_RETRIES
+)
+from utils.audio_processing import FRAME_SECONDS, read_wav_params, wav_energy
+from utils.rate_limiter import RateLimitQueueFull, backoff_delay, retry_after_seconds
+from config import logger
+
+TRANSCRIPTION_FAILED = "Could not transcribe audio. Please try again later."
+
+
+class TranscriptionFailed(Exception):
+    """Raised when audio could not be transcribed (other than for rate limits, which callers retry)."""
+
+    def __init__(self, message: str = TRANSCRIPTION_FAILED):
+        super().__init__(message)
+
+
+def find_split_points(energy: np.ndarray, max_segment_frames: int, search_frames: int) -> list:
+    """
+    Choose segment boundaries (as analysis-frame indices) no more than
+    `max_segment_frames` apart, each placed at the quietest frame within the
+    last `search_frames` before the limit.
+    """
+    points = []
+    start = 0
+    total = len(energy)
+    while total - start > max_segment_frames:
+        limit = start + max_segment_frames
+        # Never search the first half, so every segment carries real work
+        window_start = max(limit - search_frames, start + max_segment_frames // 2, start + 1)
+        window = energy[window_start:limit]
+        # Latest of the quietest frames, so a silence is cut at its end, not its start
+        cut = limit - 1 - int(np.argmin(window[::-1]))
+        points.append(cut)
+        start = cut
+    return points
+
+def plan_segments(audio_file, max_segment_seconds: float = TRANSCRIBE_SEGMENT_SECONDS,
+                  search_seconds: float = TRANSCRIBE_SILENCE_SEARCH_SECONDS) -> list:
+    """
+    Plan how to split WAV audio at silence into segments of at most `max_segment_seconds`.
+    Returns a list of (offset_seconds, start_frame, end_frame), or None when the audio
+    is not a readable WAV or is short enough to send in one piece.
+    """
+    params = read_wav_params(audio_file)
+    if params is None or params.nframes / params.framerate <= max_segment_seconds:
+        return None
+
+    energy = wav_energy(audio_file, params)
+    hop = max(int(params.framerate * FRAME_SECONDS), 1)
+    points = find_split_points(energy, int(max_segment_seconds / FRAME_SECONDS), int(search_seconds / FRAME_SECONDS))
+    bounds = [0] + [p * hop for p in points] + [params.nframes]
+    return [(begin / params.framerate, begin, end) for begin, end in zip(bounds[:-1], bounds[1:])]
+
+def read_segment(audio_file, start_frame: int, end_frame: int) -> bytes:
+    """Copy one planned segment out of a WAV file object as standalone WAV bytes."""
+    audio_file.seek(0)
+    with wave.open(audio_file, "rb") as wav:
+        params = wav.getparams()
+        wav.setpos(start_frame)
+        frames = wav.readframes(end_frame - start_frame)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as segment:
+        segment.setnchannels(params.nchannels)
+        segment.setsampwidth(params.sampwidth)
+        segment.setframerate(params.framerate)
+        segment.writeframes(frames)
+    return out.getvalue()
+
+def split_wav(audio_data: bytes, max_segment_seconds: float = TRANSCRIBE_SEGMENT_SECONDS,
+              search_seconds: float = TRANSCRIBE_SILENCE_SEARCH_SECONDS) -> list:
+    """
+    Split WAV data at silence into segments of at most `max_segment_seconds`.
+    Returns a list of (offset_seconds, wav_bytes); non-WAV or short audio is one segment.
+    """
+    audio_file = io.BytesIO(audio_data)
+    plan = plan_segments(audio_file, max_segment_seconds, search_seconds)
+    if plan is None:
+        return [(0.0, audio_data)]
+    return [(offset, read_segment(audio_file, begin, end)) for offset, begin, end in plan]
+
+async def _transcribe_with_retries(index: int, load_segment, filename: str, transcribe_segment, semaphore, max_retries: int) -> dict:
+    attempt = 0
+    while True:
+        async with semaphore:
+            try:
+                # Segments are materialised only while they hold a slot, bounding memory, and read off the event loop
+                return await transcribe_segment(await asyncio.to_thread(load_segment), filename)
+            except RateLimitQueueFull:
+                raise  # The limiter has already decided there is no room; retrying would not help
+            except Exception as e:
+                rate_limited = isinstance(e, RateLimitError)
+                retry_after = retry_after_seconds(e.response.headers) if rate_limited else None
+                attempt += 1
+                if attempt > max_retries:
+                    logger.error(f"Segment {index} failed after {attempt} attempts: {e}")
+                    if rate_limited:
+                        # Final: a RateLimitError would make safe_api_call start every segment over again
+                        raise RateLimitQueueFull(retry_after if retry_after is not None else backoff_delay(attempt, 0.5)) from e
+                    raise
+                logger.warning(f"Segment {index} failed ({e}); retrying (attempt {attempt}/{max_retries}).")
+        # Back off outside the semaphore so other segments keep the slot busy
+        await asyncio.sleep(backoff_delay(attempt, 0.5, retry_after) if rate_limited else 0)
+
+def _rewound(audio_file):
+    audio_file.seek(0)
+    return audio_file
+
+async def transcribe_in_segments(audio, transcribe_segment, filename: str = "audio.mp3",
+                                 max_segment_seconds: float = TRANSCRIBE_SEGMENT_SECONDS,
+                                 max_concurrency: int = TRANSCRIBE_MAX_CONCURRENCY,
+                                 max_retries: int = TRANSCRIBE_SEGMENT_RETRIES) -> dict:
+    """
+    Transcribe long audio as concurrent segments and stitch the results in order.
+
+    `audio` is bytes or a seekable file object. `transcribe_segment(audio, filename)`
+    returns {"text", "words", "duration"} for one piece and raises on failure; a
+    failed segment is retried on its own. A segment still rate limited after its
+    retries raises RateLimitQueueFull, which callers answer (503 with Retry-After)
+    rather than retry, so finished segments are never sent again. Audio that
+    cannot be split is sent whole.
+    """
+    audio_file = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    plan = await asyncio.to_thread(plan_segments, audio_file, max_segment_seconds)
+    if plan is None:
+        segments = [(0.0, lambda: _rewound(audio_file), filename)]
+    else:
+        logger.info("Transcribing %s segments with concurrency %s", len(plan), max_concurrency)
+        file_lock = threading.Lock()  # Segments share one file position, and are read in worker threads
+
+        def load(begin: int, end: int) -> bytes:
+            with file_lock:
+                return read_segment(audio_file, begin, end)
+
+        segments = [
+            (offset, lambda begin=begin, end=end: load(begin, end), f"segment_{i}.wav")
+            for i, (offset, begin, end) in enumerate(plan)
+        ]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        asyncio.create_task(_transcribe_with_retries(i, load_segment, name, transcribe_segment, semaphore, max_retries))
+        for i, (_, load_segment, name) in enumerate(segments)
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # One segment failed for good (or the caller gave up): stop paying for the others
+        for task in tasks:
+            task.cancel()
+        raise
+
+    texts, words = [], []
+    for (offset, _, _), result in zip(segments, results):
+        if result["text"].strip():
+            texts.append(result["text"].strip())
+        words.extend(
+            {"word": w["word"], "start": w["start"] + offset, "end": w["end"] + offset}
+            for w in result["words"]
+        )
+    duration = results[-1]["duration"]
+    if duration is not None:
+        duration += segments[-1][0]
+    return {"text": " ".join(texts), "words": words, "duration": duration}
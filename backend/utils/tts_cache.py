@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import requests
+from gtts import gTTS
+from utils.constants import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_BASE_URL, TTS_MODEL, TTS_VOICE, OPENAI_API_KEY, HTTP_READ_TIMEOUT
+from utils.single_flight import SingleFlight
+from config import logger
+
+CACHE_PREFIX = "tts_"
+
+synthesis_flight = SingleFlight("tts")
+
+
+def gtts_synthesize(text: str, path: str, lang: str = "en", tld: str = "com", slow: bool = False):
+    """Synthesize speech with gTTS into `path`."""
+    gTTS(text=text, lang=lang, tld=tld, slow=slow).save(path)
+
+def speech_api_synthesize(text: str, path: str, lang: str = "en", tld: str = "com", slow: bool = False):
+    """Synthesize English speech into `path` with the OpenAI-compatible speech endpoint at TTS_BASE_URL, in TTS_VOICE."""
+    if lang != "en":
+        raise ValueError(f"The speech endpoint is configured for English only (TTS_VOICE={TTS_VOICE}); got lang={lang!r}")
+    response = requests.post(
+        f"{TTS_BASE_URL.rstrip('/')}/audio/speech",
+        json={"model": TTS_MODEL, "voice": TTS_VOICE, "input": text, "response_format": "mp3", "speed": 0.75 if slow else 1.0},
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        timeout=HTTP_READ_TIMEOUT,
+    )
+    response.raise_for_status()
+    with open(path, "wb") as f:
+        f.write(response.content)
+
+
+def default_backend() -> str:
+    """Identifies the default synthesizer and its settings, so audio from another voice or service is never reused."""
+    return f"speech:{TTS_BASE_URL}:{TTS_MODEL}:{TTS_VOICE}" if TTS_BASE_URL else "gtts"
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio files.
+    Files are named after a hash of the text and voice settings, so identical
+    feedback is synthesized once. Least-recently-used entries are deleted once
+    the directory holds more than `max_bytes` of cached audio.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES, synthesize=None, backend: str = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.synthesize = synthesize or (speech_api_synthesize if TTS_BASE_URL else gtts_synthesize)
+        # Part of every key: switching synthesizer, model or voice must not serve audio made by another
+        self.backend = backend or (default_backend() if synthesize is None else getattr(synthesize, "__qualname__", type(synthesize).__qualname__))
+        self._lock = threading.Lock()
+        self._entries = None  # filename -> size, least recently used first
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def key(self, text: str, lang: str = "en", tld: str = "com", slow: bool = False) -> str:
+        payload = "\x1f".join([self.backend, lang, tld, str(slow), text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        """Index cached files already on disk, oldest modification time first."""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.startswith(CACHE_PREFIX) and name.endswith(".mp3"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._total_bytes = sum(self._entries.values())
+
+    def get_or_create(self, text: str, lang: str = "en", tld: str = "com", slow: bool = False) -> str:
+        """Return the filename of the cached audio for `text`, synthesizing it on a miss."""
+        filename = f"{CACHE_PREFIX}{self.key(text, lang, tld, slow)[:32]}.mp3"
+        path = os.path.join(self.directory, filename)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if filename in self._entries and os.path.exists(path):
+                self._entries.move_to_end(filename)
+                self._stats["hits"] += 1
+                os.utime(path)  # Keep recency across restarts
+                return filename
+            self._stats["misses"] += 1
+
+        # Concurrent misses for the same text share one synthesis
+        return synthesis_flight.call((self.directory, filename), lambda: self._create(text, filename, lang, tld, slow))
+
+    def _create(self, text: str, filename: str, lang: str, tld: str, slow: bool) -> str:
+        path = os.path.join(self.directory, filename)
+        # Synthesize outside the lock into a private temp file, then publish atomically
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            self.synthesize(text, tmp_path, lang=lang, tld=tld, slow=slow)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            size = os.path.getsize(path)
+            self._total_bytes += size - self._entries.get(filename, 0)
+            self._entries[filename] = size
+            self._entries.move_to_end(filename)
+            self._evict(keep=filename)
+        return filename
+
+    def _evict(self, keep: str):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            filename, size = next(iter(self._entries.items()))
+            if filename == keep:
+                break
+            del self._entries[filename]
+            self._total_bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+            logger.info("Evicted cached audio: %s", filename)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=len(self._entries or {}),
+                bytes=self._total_bytes,
+                max_bytes=self.max_bytes,
+                hit_ratio=round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            )
+
+
+tts_cache = TTSCache()
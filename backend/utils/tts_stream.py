@@ -0,0 +1,137 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils.constants import TTS_CHUNK_MAX_CHARS, TTS_STREAM_WORKERS, TTS_STREAM_TTL, TTS_STREAM_MAX_ENTRIES
+from utils.tts_cache import tts_cache
+from config import logger
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+# Shared across requests so total synthesis concurrency stays bounded
+executor = ThreadPoolExecutor(max_workers=TTS_STREAM_WORKERS, thread_name_prefix="tts")
+
+
+def _split_long(text: str, max_chars: int) -> list:
+    """Split an over-long sentence at clause boundaries, then at word boundaries."""
+    chunks, current = [], ""
+    for part in CLAUSE_END.split(text):
+        words = part.split() if len(part) > max_chars else [part]
+        for word in words:
+            candidate = f"{current} {word}" if current else word
+            if len(candidate) <= max_chars or not current:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = word
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_MAX_CHARS) -> list:
+    """Split text into sentence chunks of at most `max_chars` characters where possible."""
+    chunks = []
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+        else:
+            chunks.extend(_split_long(sentence, max_chars))
+    return chunks
+
+class SentenceBuffer:
+    """Collects streamed text and releases each sentence as soon as it is complete."""
+
+    def __init__(self, max_chars: int = TTS_CHUNK_MAX_CHARS):
+        self.max_chars = max_chars
+        self._pending = ""
+
+    def feed(self, delta: str) -> list:
+        """Add a text delta and return the sentences it completed."""
+        self._pending += delta
+        parts = SENTENCE_END.split(self._pending)
+        # The last part may still be growing; keep it unless it is already too long
+        self._pending = parts.pop()
+        if len(self._pending) > self.max_chars * 2:
+            parts.append(self._pending)
+            self._pending = ""
+        chunks = []
+        for part in parts:
+            chunks.extend(split_sentences(part, self.max_chars))
+        return chunks
+
+    def flush(self) -> list:
+        """Return whatever text is left once the stream has ended."""
+        chunks = split_sentences(self._pending, self.max_chars)
+        self._pending = ""
+        return chunks
+
+def synthesize_chunk(text: str) -> bytes:
+    """Synthesize one chunk through the TTS cache and return its mp3 bytes."""
+    filename = tts_cache.get_or_create(text, lang="en")
+    with open(os.path.join(tts_cache.directory, filename), "rb") as f:
+        return f.read()
+
+async def stream_speech(text: str, synthesize=synthesize_chunk, lookahead: int = TTS_STREAM_WORKERS):
+    """
+    Yield synthesized audio for each chunk of `text`, in order.
+    Up to `lookahead` chunks are synthesized ahead of the one being sent, so the
+    first chunk is playable while later ones are still being produced.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = split_sentences(text)
+    pending = []
+    try:
+        for index in range(len(chunks)):
+            while len(pending) < lookahead and index + len(pending) < len(chunks):
+                chunk = chunks[index + len(pending)]
+                pending.append(loop.run_in_executor(executor, synthesize, chunk))
+            audio = await pending.pop(0)
+            yield audio
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class SpeechStreams:
+    """Texts waiting to be streamed as audio, addressed by an opaque stream id."""
+
+    def __init__(self, ttl: float = TTS_STREAM_TTL, max_entries: int = TTS_STREAM_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # stream_id -> (created, text)
+        self._lock = threading.Lock()
+
+    def register(self, text: str) -> str:
+        stream_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._entries[stream_id] = (time.monotonic(), text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stream_id
+
+    def get(self, stream_id: str):
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(stream_id)
+        return entry[1] if entry else None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            stream_id, (created, _) = next(iter(self._entries.items()))
+            if created >= cutoff:
+                break
+            del self._entries[stream_id]
+            logger.debug("Expired speech stream: %s", stream_id)
+
+
+speech_streams = SpeechStreams()
@@ -0,0 +1,132 @@
+import json
+import time
+from fastapi import HTTPException, UploadFile
+from utils.constants import MAX_UPLOAD_BYTES, BATCH_MAX_UPLOAD_BYTES
+from utils.metrics import stage_seconds
+from config import logger
+
+SNIFF_BYTES = 16
+ALLOWED_CONTENT_TYPES = ("audio/", "video/mp4", "video/webm", "application/octet-stream")
+AUDIO_TOO_LARGE = "Audio file is too large."
+# Path prefix -> (largest accepted body, detail of the 413)
+UPLOAD_LIMITS = {
+    "/voice/": (MAX_UPLOAD_BYTES, AUDIO_TOO_LARGE),
+    "/assess/voice/": (MAX_UPLOAD_BYTES, AUDIO_TOO_LARGE),
+    "/assess/batch/": (BATCH_MAX_UPLOAD_BYTES, "The batch is too large."),
+}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def sniff_audio_format(head: bytes):
+    """Identify the audio container from its leading magic bytes, or return None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return None
+
+async def spool_upload(audio: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Validate an uploaded audio file and return its spooled file object, rewound.
+
+    The multipart parser has already streamed the body into a SpooledTemporaryFile
+    (in memory up to 1 MB, on disk beyond that), so the file is handed on without
+    reading it into memory again. The container is recorded on `audio.audio_format`.
+    """
+    content_type = (audio.content_type or "").lower()
+    if content_type and not content_type.startswith(ALLOWED_CONTENT_TYPES):
+        raise HTTPException(status_code=415, detail="Unsupported media type. Please upload an audio file.")
+    if audio.size is not None and audio.size > max_bytes:
+        raise HTTPException(status_code=413, detail=AUDIO_TOO_LARGE)
+
+    await audio.seek(0)
+    head = await audio.read(SNIFF_BYTES)
+    audio_format = sniff_audio_format(head)
+    if audio_format is None:
+        logger.warning(f"Rejected upload with unrecognised audio header: {head[:8]!r}")
+        raise HTTPException(status_code=415, detail="Unsupported media type. Please upload an audio file.")
+    await audio.seek(0)
+    audio.audio_format = audio_format
+    return audio.file
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized uploads with 413 before they are parsed.
+    A too-large Content-Length is refused without reading the body; bodies without
+    one are counted as they stream in and cut off at the limit. The time taken to
+    receive the body is recorded as the "upload" stage.
+    """
+
+    def __init__(self, app, limits: dict = None):
+        self.app = app
+        self.limits = dict(UPLOAD_LIMITS if limits is None else limits)
+
+    def limit_for(self, path: str):
+        """The (max_bytes, detail) of the longest matching path prefix, or None."""
+        matches = [prefix for prefix in self.limits if path.startswith(prefix)]
+        return self.limits[max(matches, key=len)] if matches else None
+
+    async def __call__(self, scope, receive, send):
+        path_limit = self.limit_for(scope["path"]) if scope["type"] == "http" else None
+        if path_limit is None:
+            return await self.app(scope, receive, send)
+
+        max_bytes, detail = path_limit
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        # Multipart framing adds a little overhead on top of the file itself
+        limit = max_bytes + 64 * 1024
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            return await self._reject(send, detail)
+
+        received = 0
+        too_large = False
+        started = None
+
+        async def limited_receive():
+            nonlocal received, too_large, started
+            if started is None:
+                started = time.perf_counter()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    stage_seconds.observe(time.perf_counter() - started, "upload", "error")
+                    raise UploadTooLarge()
+                if not message.get("more_body", False):
+                    stage_seconds.observe(time.perf_counter() - started, "upload", "ok")
+            return message
+
+        async def guarded_send(message):
+            # Once the limit is hit, whatever error the app reports is replaced by a 413
+            if not too_large:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        if too_large:
+            await self._reject(send, detail)
+
+    async def _reject(self, send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
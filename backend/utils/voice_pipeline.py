@@ -0,0 +1,136 @@
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+from utils.audio_processing import normalizer
+from utils.helper_functions import evaluate_presentation, safe_api_call, text_to_speech, voice_feedback_prompt
+from utils.model_generation import get_ai_response, transcribe_audio_with_timestamps
+from utils.speech_analytics import analyze_delivery
+from utils.transcription import TranscriptionFailed
+from utils.tts_stream import SentenceBuffer, executor, speech_streams, synthesize_chunk
+from utils.constants import MODEL_NAME, OPENAI_API_KEY
+from config import logger
+
+_END = object()
+TRANSCRIPTION_FAILED_REPLY = "Transcription failed. Please try again."
+
+
+@asynccontextmanager
+async def no_stage(name: str):
+    """The stage callback for requests answered directly; jobs pass one that records progress."""
+    yield
+
+async def transcribe_for_analysis(audio_file, audio_format: str, stage) -> dict:
+    async with stage("normalize"):
+        audio, filename = await asyncio.to_thread(normalizer.normalize, audio_file, audio_format)
+    async with stage("transcribe"):
+        transcription = await safe_api_call(transcribe_audio_with_timestamps, audio, filename)
+    logger.debug("Transcribed text: %s", transcription["text"])
+    return transcription
+
+async def assess_voice(audio_file, audio_format: str, mode: str = "full", stage=no_stage) -> dict:
+    """
+    The /assess/voice/ pipeline, for the endpoint and for jobs: normalize,
+    transcribe, measure delivery, then evaluate unless `mode` is "metrics".
+    """
+    try:
+        transcription = await transcribe_for_analysis(audio_file, audio_format, stage)
+    except TranscriptionFailed:
+        logger.error("Transcription failed.")
+        return {"feedback": TRANSCRIPTION_FAILED_REPLY}
+    presentation_text = transcription["text"]
+    delivery = analyze_delivery(transcription["words"], transcription["duration"])
+    if mode == "metrics":
+        return {"transcript": presentation_text, "metrics": delivery}
+    async with stage("evaluate"):
+        feedback = await safe_api_call(evaluate_presentation, presentation_text, "voice", delivery)
+    logger.info("Presentation evaluation completed")
+    return {"feedback": feedback, "metrics": delivery}
+
+async def voice_feedback(audio_file, audio_format: str, mode: str = "full", stage=no_stage, stream_audio: bool = False) -> dict:
+    """
+    The /voice/ pipeline, for the endpoint and for jobs: normalize, transcribe,
+    measure delivery, then respond and synthesize the response unless `mode` is
+    "metrics". With `stream_audio` the speech is left to /audio/stream/ instead.
+    """
+    try:
+        transcription = await transcribe_for_analysis(audio_file, audio_format, stage)
+    except TranscriptionFailed as e:
+        logger.error("Transcription failed.")
+        return {"transcript": str(e), "response": TRANSCRIPTION_FAILED_REPLY}
+    transcript = transcription["text"]
+    delivery = analyze_delivery(transcription["words"], transcription["duration"])
+    if mode == "metrics":
+        # Pacing and filler metrics are computed locally; no completion needed
+        return {"transcript": transcript, "metrics": delivery}
+    async with stage("respond"):
+        prompt = voice_feedback_prompt(transcript, delivery)
+        ai_response = await safe_api_call(get_ai_response, prompt, "speech_coach", OPENAI_API_KEY, MODEL_NAME)
+    logger.debug("Voice AI Response: %s", ai_response)
+    if stream_audio:
+        # Synthesis happens sentence by sentence when the client fetches the stream
+        stream_id = speech_streams.register(ai_response)
+        return {"transcript": transcript, "response": ai_response, "metrics": delivery, "audio_stream": f"/audio/stream/{stream_id}"}
+    async with stage("speech"):
+        speech_file = await asyncio.to_thread(text_to_speech, ai_response)
+    return {"transcript": transcript, "response": ai_response, "metrics": delivery, "audio_feedback": speech_file}
+
+
+async def run_voice_pipeline(transcript: str, deltas, synthesize=synthesize_chunk):
+    """
+    Overlap response generation with speech synthesis.
+
+    Yields event dicts as soon as each piece is ready: the transcript, every
+    text delta from the streaming response, and the audio for each completed
+    sentence (in sentence order) while generation continues. The last event
+    is "done" with the full response, or "error" if a stage failed.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    audio_tasks = []
+
+    async def emit_audio(index: int, sentence: str, previous):
+        audio = await loop.run_in_executor(executor, synthesize, sentence)
+        if previous is not None:
+            await previous  # Keep audio events in sentence order
+        await events.put({
+            "type": "audio",
+            "index": index,
+            "text": sentence,
+            "audio": base64.b64encode(audio).decode("ascii")
+        })
+
+    def schedule(sentences: list):
+        for sentence in sentences:
+            previous = audio_tasks[-1] if audio_tasks else None
+            audio_tasks.append(asyncio.create_task(emit_audio(len(audio_tasks), sentence, previous)))
+
+    async def produce():
+        buffer = SentenceBuffer()
+        parts = []
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                await events.put({"type": "delta", "text": delta})
+                schedule(buffer.feed(delta))
+            schedule(buffer.flush())
+            await asyncio.gather(*audio_tasks)
+            await events.put({"type": "done", "response": "".join(parts)})
+        except Exception as e:
+            logger.error(f"Voice pipeline failed: {e}")
+            await events.put({"type": "error", "detail": "The voice pipeline was interrupted. Please try again."})
+        finally:
+            await events.put(_END)
+
+    yield {"type": "transcript", "text": transcript}
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            event = await events.get()
+            if event is _END:
+                break
+            yield event
+    finally:
+        # Stop generating and synthesizing if the client goes away
+        producer.cancel()
+        for task in audio_tasks:
+            task.cancel()
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import os
 from dotenv import load_dotenv
 
@@ -30,6 +31,27 @@ def make_api_request(endpoint, method="POST", data=None, files=None):
         st.error(f"Error: {e}")
         return None
 
+def stream_api_request(endpoint, data):
+    """Yield text deltas from a server-sent-events endpoint as they arrive."""
+    try:
+        with requests.post(f"{API_URL}{endpoint}", json=data, stream=True) as response:
+            response.raise_for_status()
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    payload = json.loads(line[len("data: "):])
+                    if event == "error":
+                        st.error(f"Error: {payload['detail']}")
+                        return
+                    if event == "message":
+                        yield payload["delta"]
+                elif not line:
+                    event = "message"
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error: {e}")
+
 # -----------------------------------------------------------------------------
 # Model Selection
 # -----------------------------------------------------------------------------
@@ -48,9 +70,8 @@ chat_role = st.selectbox("Select role:", ["speech_coach", "job_interviewer", "de
 if st.button("Send Chat"):
     if chat_message:
         data = {"message": chat_message, "role": chat_role, "model": selected_model}
-        result = make_api_request("/chat/", data=data)
-        if result:
-            st.write(f"Response: {result['response']}")
+        st.write("Response:")
+        st.write_stream(stream_api_request("/chat/stream/", data))
     else:
         st.warning("Please enter a message.")
 
@@ -64,12 +85,15 @@ uploaded_audio = st.file_uploader("Upload audio file", type=["wav", "mp3", "mp4"
 if st.button("Process Voice"):
     if uploaded_audio:
         files = {"audio": (uploaded_audio.name, uploaded_audio, uploaded_audio.type)}
-        result = make_api_request("/voice/", files=files)
+        result = make_api_request("/voice/?stream_audio=true", files=files)
         if result:
             st.write(f"Transcript: {result['transcript']}")
             st.write(f"Response: {result['response']}")
-            if 'audio_feedback' in result:
-                st.audio(result['audio_feedback'], format="audio/mpeg")  # Assuming audio_feedback is an audio file path
+            if 'audio_stream' in result:
+                # The browser starts playing the first sentence while the rest is synthesized
+                st.audio(f"{API_URL}{result['audio_stream']}", format="audio/mpeg")
+            elif 'audio_feedback' in result:
+                st.audio(f"{API_URL}/audio/{result['audio_feedback']}", format="audio/mpeg")
     else:
         st.warning("Please upload an audio file.")
 
@@ -84,10 +108,9 @@ training_input = st.text_area("Enter your training input:")
 if st.button("Start Training"):
     if training_input:
         data = {"user_input": training_input, "module": training_module, "model": selected_model}
-        result = make_api_request("/train/", data=data)
-        if result:
-            st.write(f"Feedback: {result['feedback']}")
-            st.write(f"Message: {result['message']}")
+        st.write("Feedback:")
+        st.write_stream(stream_api_request("/train/stream/", data))
+        st.write(f"Message: Feedback for {training_module} training.")
     else:
         st.warning("Please enter training input.")
         